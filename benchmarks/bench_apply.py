@@ -0,0 +1,77 @@
+"""
+Benchmark of applying a dictionary to an OMOP csv extract.
+
+Writes an observation extract of a million rows, some with suppressed
+concepts and some with generalized answers of the newest checked in
+dictionary file, and applies the dictionary to it with one and two
+worker processes.
+
+Usage:  PYTHONPATH=. python benchmarks/bench_apply.py
+"""
+# Python imports
+import csv
+import io
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+# Third party imports
+
+# Project imports
+from benchmarks import dictionary_data
+from cdr_data_dictionary import apply_dictionary
+from cdr_data_dictionary import query
+
+ROWS = 1000 * 1000
+WORKERS = [1, 2]
+HEADER = ['observation_id', 'person_id', 'observation_concept_id', 'observation_date',
+          'observation_source_concept_id', 'observation_source_value',
+          'value_source_concept_id', 'value_source_value', 'value_as_string']
+
+
+def write_extract(dictionary, path, rows, seed=0):
+    """ Write an observation extract with suppressed and generalized concepts. """
+    generator = random.Random(seed)
+    suppressed = sorted(dictionary.suppressed_concepts)
+    scoped = sorted(dictionary.scoped_outputs)
+    with io.open(path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file, lineterminator='\n')
+        writer.writerow(HEADER)
+        for row_id in range(rows):
+            kind = generator.random()
+            if kind < 0.1:
+                question, answer = generator.choice(suppressed), generator.randint(1, 45000000)
+            elif kind < 0.3:
+                question, answer = generator.choice(scoped)
+            else:
+                question, answer = generator.randint(1, 45000000), generator.randint(1, 45000000)
+            writer.writerow([row_id, row_id % 1000, 0, '2019-01-01', question, 'Question_Code',
+                             answer, 'Answer_Code', ''])
+
+
+def main():
+    """ Run the benchmark on the newest checked in dictionary file. """
+    filepath = dictionary_data.dictionary_files()[-1]
+    dictionary = query.load(filepath)
+    temp_dir = tempfile.mkdtemp()
+    try:
+        input_dir = os.path.join(temp_dir, 'in')
+        os.makedirs(input_dir)
+        write_extract(dictionary, os.path.join(input_dir, 'observation.csv'), ROWS)
+        print('{}:  {} cpus'.format(os.path.basename(filepath), multiprocessing.cpu_count()))
+        for workers in WORKERS:
+            start = time.time()
+            report = apply_dictionary.apply_directory(
+                dictionary, input_dir, os.path.join(temp_dir, 'out'), workers=workers)[0]
+            seconds = time.time() - start
+            print('  {} workers:  {} dropped, {} generalized, {:.2f}s  {:.0f} rows/s'.format(
+                workers, report.dropped, report.generalized, seconds, ROWS / seconds))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
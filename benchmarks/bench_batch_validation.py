@@ -0,0 +1,60 @@
+"""
+Benchmark of validating every checked in dictionary file.
+
+Compares validating the files one at a time with yamale, as validator.py
+did, to validating their sections with the compiled schema in this process
+and in pools of 2 and 4 worker processes.  Speed ups of the pools are
+limited by the number of CPUs available.
+
+Usage:  PYTHONPATH=. python benchmarks/bench_batch_validation.py
+"""
+# Python imports
+import multiprocessing
+import os
+import time
+
+# Third party imports
+
+# Project imports
+from benchmarks import dictionary_data
+from cdr_data_dictionary import compiled_schema
+from cdr_data_dictionary import validator
+
+SCHEMA_FILE = os.path.join('cdr_data_dictionary', 'schema.yaml')
+WORKERS = [1, 2, 4]
+
+
+def yamale_errors(dict_paths):
+    """ Validate each file with yamale.  Returns the number of invalid files. """
+    invalid = 0
+    for dict_path in dict_paths:
+        try:
+            validator.validate(SCHEMA_FILE, dict_path)
+        except ValueError:
+            invalid += 1
+    return invalid
+
+
+def main():
+    """ Run the benchmark on every checked in dictionary file. """
+    dict_paths = dictionary_data.dictionary_files()
+    size = sum(os.path.getsize(dict_path) for dict_path in dict_paths)
+    print('{} files, {:.1f} MB, {} cpus'.format(
+        len(dict_paths), size / 1024.0 / 1024.0, multiprocessing.cpu_count()))
+
+    start = time.time()
+    invalid = yamale_errors(dict_paths)
+    yamale_time = time.time() - start
+    print('  yamale, one file at a time:  {:.2f}s  {} invalid'.format(yamale_time, invalid))
+
+    for workers in WORKERS:
+        start = time.time()
+        results = compiled_schema.validate_files(SCHEMA_FILE, dict_paths, workers)
+        elapsed = time.time() - start
+        invalid = sum(1 for _, errors in results if errors)
+        print('  compiled, {} workers:         {:.2f}s  {:.2f}x  {} invalid'.format(
+            workers, elapsed, yamale_time / elapsed, invalid))
+
+
+if __name__ == '__main__':
+    main()
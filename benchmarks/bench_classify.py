@@ -0,0 +1,93 @@
+"""
+Benchmark of classifying ten million concept ids at once.
+
+Classifies concept ids drawn from the suppressed concepts, the generalized
+input concepts, and other concept ids of the newest checked in dictionary
+file.  Compares the vectorized classify call to looking up each id in the
+dictionaries of the query module.  Requires numpy.
+
+Usage:  PYTHONPATH=. python benchmarks/bench_classify.py
+"""
+# Python imports
+import os
+import time
+
+# Third party imports
+import numpy as np
+
+# Project imports
+from benchmarks import dictionary_data
+from cdr_data_dictionary import classify
+from cdr_data_dictionary import query
+
+IDS = 10 * 1000 * 1000
+# Dictionary lookups are slow, so fewer ids are looked up
+LOOKUP_IDS = 1000 * 1000
+SUPPRESSED_SHARE = 0.2
+GENERALIZED_SHARE = 0.05
+
+
+def concept_sample(dictionary, size, seed=0):
+    """ Draw concept ids, some suppressed and some generalized. """
+    random = np.random.RandomState(seed)
+    suppressed = np.array(sorted(dictionary.suppressed_concepts), dtype=np.int64)
+    inputs = np.array(sorted(dictionary.generalized_outputs), dtype=np.int64)
+    ids = random.randint(1, 45000000, size=size).astype(np.int64)
+    kinds = random.random_sample(size)
+    chosen = kinds < SUPPRESSED_SHARE
+    ids[chosen] = suppressed[random.randint(0, len(suppressed), size=chosen.sum())]
+    chosen = (kinds >= SUPPRESSED_SHARE) & (kinds < SUPPRESSED_SHARE + GENERALIZED_SHARE)
+    ids[chosen] = inputs[random.randint(0, len(inputs), size=chosen.sum())]
+    return ids
+
+
+def lookup_each(dictionary, ids):
+    """ Classify each id with dictionary lookups. """
+    status = []
+    outputs = []
+    for concept_id in ids:
+        if dictionary.is_suppressed(concept_id):
+            status.append(classify.SUPPRESSED)
+            outputs.append(classify.NO_CONCEPT)
+        else:
+            output_id = dictionary.generalized_output(concept_id)
+            if output_id is None:
+                status.append(classify.UNTOUCHED)
+                outputs.append(classify.NO_CONCEPT)
+            else:
+                status.append(classify.GENERALIZED)
+                outputs.append(output_id)
+    return status, outputs
+
+
+def main():
+    """ Run the benchmark on the newest checked in dictionary file. """
+    filepath = dictionary_data.dictionary_files()[-1]
+    dictionary = query.load(filepath)
+
+    start = time.time()
+    classifier = classify.ConceptClassifier.from_dictionary(dictionary)
+    build_time = time.time() - start
+
+    ids = concept_sample(dictionary, IDS)
+    start = time.time()
+    status, outputs = classifier.classify(ids)
+    classify_time = time.time() - start
+
+    sample = ids[:LOOKUP_IDS].tolist()
+    start = time.time()
+    expected_status, expected_outputs = lookup_each(dictionary, sample)
+    lookup_time = (time.time() - start) * IDS / LOOKUP_IDS
+
+    same = (status[:LOOKUP_IDS].tolist() == expected_status and
+            outputs[:LOOKUP_IDS].tolist() == expected_outputs)
+    print('{}:  build arrays {:.4f}s'.format(os.path.basename(filepath), build_time))
+    print('  {} ids:  {}'.format(IDS, classifier.counts(status)))
+    print('  vectorized:        {:.2f}s  {:.1f}M ids/s'.format(
+        classify_time, IDS / classify_time / 1e6))
+    print('  lookups (scaled):  {:.2f}s  {:.1f}M ids/s  {:.1f}x  identical: {}'.format(
+        lookup_time, IDS / lookup_time / 1e6, lookup_time / classify_time, same))
+
+
+if __name__ == '__main__':
+    main()
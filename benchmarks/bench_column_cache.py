@@ -0,0 +1,77 @@
+"""
+Benchmark of per-column interning and memoization on the suppressions tab.
+
+Measures the CPU time to write the Concept (Row) Suppressions tab, and the
+peak memory of holding its processed rows, with and without the column caches.
+
+Usage:  PYTHONPATH=. python benchmarks/bench_column_cache.py
+"""
+# Python imports
+import io
+import json
+import time
+import tracemalloc
+
+# Third party imports
+
+# Project imports
+from benchmarks import dictionary_data
+from cdr_data_dictionary import constants as consts
+from cdr_data_dictionary import generate_yaml as gen
+from cdr_data_dictionary import yaml_serializer as ser
+
+
+def _decoded_rows(encoded):
+    """ Decode one row at a time, like rows arriving from the api. """
+    for line in encoded:
+        yield json.loads(line)
+
+
+def hold_rows(encoded, cache_size):
+    """ Process and keep every row.  Returns the peak traced memory. """
+    tracemalloc.start()
+    fields = gen._process_field_names(json.loads(encoded[0]))
+    rows = list(gen.iter_tab_contents(fields, _decoded_rows(encoded[1:]),
+                                      consts.INIT_ROW_SUPPRESSIONS, cache_size))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return peak
+
+
+def write_rows(fields, rows, cache_size):
+    """ Format every row.  Returns the CPU seconds used. """
+    start = time.process_time()
+    plan = ser.TabPlan(fields, 3, gen._process_value, cache_size)
+    output = io.StringIO()
+    for row in rows:
+        output.write(plan.format_item(row))
+    return time.process_time() - start, plan.cache_stats(), output.getvalue()
+
+
+def main():
+    """ Run the benchmark on the newest checked in dictionary file. """
+    filepath = dictionary_data.dictionary_files()[-1]
+    _, tabs = dictionary_data.tab_values(filepath)
+    values = dict(tabs)[consts.CONCEPT_SUPPRESSIONS_TAB_NAME]
+    encoded = [json.dumps(row) for row in values]
+
+    fields, rows = gen.sequentially_process_tab_contents(values, consts.INIT_ROW_SUPPRESSIONS)
+    uncached_time, _, uncached = write_rows(fields, rows, 0)
+    cached_time, stats, cached = write_rows(fields, rows, 10000)
+    lookups, hits, distinct = stats
+
+    uncached_peak = hold_rows(encoded, 0)
+    cached_peak = hold_rows(encoded, 10000)
+
+    print('{}: {} rows, {} cells, {} distinct column values, identical output: {}'.format(
+        consts.CONCEPT_SUPPRESSIONS_TAB_NAME, len(rows), lookups, distinct,
+        uncached == cached))
+    print('  write cpu:   {:.3f}s uncached  {:.3f}s cached  {:.2f}x  ({:.1f}% hits)'.format(
+        uncached_time, cached_time, uncached_time / cached_time, 100.0 * hits / lookups))
+    print('  peak memory: {:,} bytes uncached  {:,} bytes interned  {:.2f}x'.format(
+        uncached_peak, cached_peak, float(uncached_peak) / cached_peak))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark of merging values and formulas.
+
+Builds values and formulas from the newest checked in dictionary file.  Cells
+holding links become HYPERLINK formulas and numeric cells become numbers, as
+they are read from the spreadsheet.  Compares the nested scan, regex on every
+cell merge with the indexed, prefix checked merge.
+
+Usage:  PYTHONPATH=. python benchmarks/bench_merge.py
+"""
+# Python imports
+import copy
+import re
+import time
+
+# Third party imports
+
+# Project imports
+from benchmarks import dictionary_data
+from cdr_data_dictionary import constants as consts
+from cdr_data_dictionary import generate_yaml as gen
+
+REPEATS = 20
+
+
+def legacy_merge(values, formulas):
+    """ Merge as the values and formulas were previously merged. """
+    final_values = []
+    for val_tup in values:
+        for for_tup in formulas:
+            if val_tup[0] == for_tup[0]:
+                pattern = re.compile(consts.HYPERLINK_REGEX, re.UNICODE)
+                val_list = val_tup[1]
+                for list_index, formula_list in enumerate(for_tup[1]):
+                    for item_index, item in enumerate(formula_list):
+                        try:
+                            match = pattern.match(item)
+                            if match:
+                                link = match.group('link').strip()
+                                if link.startswith('http'):
+                                    val_list[list_index][item_index] = link
+                        except TypeError:
+                            pass
+                final_values.append((val_tup[0], val_list))
+    return final_values
+
+
+def spreadsheet_payloads(tabs):
+    """ Create the values and formulas read for the tabs of a dictionary. """
+    values = []
+    formulas = []
+    links = 0
+    for tab_name, rows in tabs:
+        value_rows = []
+        formula_rows = []
+        for row in rows:
+            value_row = list(row)
+            formula_row = list(row)
+            for index, cell in enumerate(row):
+                if isinstance(cell, str) and cell.startswith('http'):
+                    value_row[index] = 'link text'
+                    formula_row[index] = '=HYPERLINK("{}","link text")'.format(cell)
+                    links += 1
+                elif isinstance(cell, str) and cell.isdigit():
+                    # numbers are read as numbers when reading formulas
+                    formula_row[index] = int(cell)
+            value_rows.append(value_row)
+            formula_rows.append(formula_row)
+        values.append((tab_name, value_rows))
+        # formulas are not always returned in the same order as values
+        formulas.insert(0, (tab_name, formula_rows))
+    return values, formulas, links
+
+
+def timed(merge, values, formulas):
+    """ Merge fresh copies of the payloads.  Returns the best time and result. """
+    best = None
+    result = None
+    for _ in range(REPEATS):
+        fresh = copy.deepcopy(values)
+        start = time.process_time()
+        result = merge(fresh, formulas)
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    """ Run the benchmark on the newest checked in dictionary file. """
+    filepath = dictionary_data.dictionary_files()[-1]
+    _, tabs = dictionary_data.tab_values(filepath)
+    values, formulas, links = spreadsheet_payloads(tabs)
+    cells = sum(len(row) for _, rows in formulas for row in rows)
+
+    legacy_time, legacy = timed(legacy_merge, values, formulas)
+    indexed_time, indexed = timed(gen.merge_values_and_formulas, values, formulas)
+
+    print('{} tabs, {} cells, {} hyperlinks, identical result: {}'.format(
+        len(values), cells, links, legacy == indexed))
+    print('  merge cpu: {:.4f}s regex scan  {:.4f}s indexed  {:.2f}x'.format(
+        legacy_time, indexed_time, legacy_time / indexed_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark of writing a dictionary file with the staged pipeline.
+
+Reads the tabs of the newest checked in dictionary file from a simulated
+spreadsheet, which waits before returning each tab as a request would.
+Compares reading every tab before writing the file with reading, processing,
+formatting, and writing tabs in a pipeline.
+
+Usage:  PYTHONPATH=. python benchmarks/bench_pipeline.py
+"""
+# Python imports
+from argparse import Namespace
+import copy
+import os
+import tempfile
+import time
+
+# Third party imports
+
+# Project imports
+from benchmarks import dictionary_data
+from cdr_data_dictionary import generate_yaml as gen
+
+# Simulated request latency.  Each tab is read with two requests.
+REQUEST_SECONDS = 0.005
+ROW_SECONDS = 0.00001
+DEPTHS = [1, 2]
+
+
+def simulated_tabs(tabs):
+    """ Generator returning copies of the tabs, waiting as reading them would. """
+    for tab_name, rows in tabs:
+        time.sleep(2 * (REQUEST_SECONDS + ROW_SECONDS * len(rows)))
+        yield (tab_name, copy.deepcopy(rows), [])
+
+
+def sequential(settings, tabs, meta_data):
+    """ Read every tab, then write the file. """
+    read = list(simulated_tabs(tabs))
+    values = [(tab_name, rows) for tab_name, rows, _ in read]
+    formulas = [(tab_name, rows) for tab_name, _, rows in read]
+    gen.create_yaml_file(settings, gen.iter_merged_values(values, formulas, release=True),
+                         meta_data)
+
+
+def pipelined(settings, tabs, meta_data):
+    """ Read, process, format, and write tabs in a pipeline. """
+    gen.write_pipelined_yaml_file(settings, simulated_tabs(tabs), meta_data)
+
+
+def timed(write, settings, tabs, meta_data):
+    """ Run a write.  Returns the wall clock seconds and the file contents. """
+    start = time.time()
+    write(settings, tabs, meta_data)
+    elapsed = time.time() - start
+    with open(settings.output_file, 'rb') as yaml_file:
+        return elapsed, yaml_file.read()
+
+
+def main():
+    """ Run the benchmark on the newest checked in dictionary file. """
+    filepath = dictionary_data.dictionary_files()[-1]
+    meta_data, tabs = dictionary_data.tab_values(filepath)
+    output_dir = tempfile.mkdtemp()
+    rows = sum(len(tab_rows) for _, tab_rows in tabs)
+
+    settings = Namespace(column_id=None, incremental=False, pipeline_depth=None,
+                         output_file=os.path.join(output_dir, 'sequential.yaml'))
+    read_time = sum(2 * (REQUEST_SECONDS + ROW_SECONDS * len(tab_rows))
+                    for _, tab_rows in tabs)
+    start = time.time()
+    gen.create_yaml_file(settings, copy.deepcopy(tabs), meta_data)
+    write_time = time.time() - start
+
+    sequential_time, expected = timed(sequential, settings, tabs, meta_data)
+
+    print('{}: {} tabs, {} rows'.format(os.path.basename(filepath), len(tabs), rows))
+    print('  simulated read {:.2f}s, process and write {:.2f}s'.format(read_time, write_time))
+    print('  sequential:         {:.2f}s'.format(sequential_time))
+    for depth in DEPTHS:
+        settings = Namespace(column_id=None, incremental=False, pipeline_depth=depth,
+                             output_file=os.path.join(output_dir, 'pipelined.yaml'))
+        pipelined_time, contents = timed(pipelined, settings, tabs, meta_data)
+        print('  pipeline depth {}:   {:.2f}s  {:.2f}x  identical: {}'.format(
+            depth, pipelined_time, sequential_time / pipelined_time, contents == expected))
+
+
+if __name__ == '__main__':
+    main()
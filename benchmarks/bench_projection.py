@@ -0,0 +1,75 @@
+"""
+Benchmark of generating a dictionary file with a column projection.
+
+Generates the newest checked in dictionary file with every column, and with
+only the columns a typical downstream job needs.  Measures the size of the
+tab payloads that would be read, the CPU time to write the file, and the
+size of the written file.
+
+Usage:  PYTHONPATH=. python benchmarks/bench_projection.py
+"""
+# Python imports
+from argparse import Namespace
+import json
+import os
+import tempfile
+import time
+
+# Third party imports
+
+# Project imports
+from benchmarks import dictionary_data
+from cdr_data_dictionary import generate_yaml as gen
+from cdr_data_dictionary import projection
+
+COLUMNS = [(None, ['relevant_omop_table', 'field_name', 'concept_id',
+                   'generalized_output_concept_id'])]
+
+
+def payload_size(settings, tabs):
+    """ The json size of the rows read for the tabs, with the projection applied. """
+    size = 0
+    for tab_name, rows in tabs:
+        kept = projection.projected_fields(settings.columns, tab_name)
+        if kept is not None:
+            init_fields, group_by = gen._get_tab_defaults(settings, tab_name)
+            rows, _, _ = gen._project_tab(rows, init_fields, group_by, kept)
+        size += len(json.dumps(list(rows)))
+    return size
+
+
+def generate(settings, tabs, meta_data):
+    """ Write the file.  Returns the CPU seconds used and the file size. """
+    start = time.process_time()
+    gen.create_yaml_file(settings, [(name, list(rows)) for name, rows in tabs], meta_data)
+    elapsed = time.process_time() - start
+    return elapsed, os.path.getsize(settings.output_file)
+
+
+def main():
+    """ Run the benchmark on the newest checked in dictionary file. """
+    filepath = dictionary_data.dictionary_files()[-1]
+    meta_data, tabs = dictionary_data.tab_values(filepath)
+    output_dir = tempfile.mkdtemp()
+
+    full = Namespace(column_id=None, columns=None,
+                     output_file=os.path.join(output_dir, 'full.yaml'))
+    projected = Namespace(column_id=None, columns=COLUMNS,
+                          output_file=os.path.join(output_dir, 'projected.yaml'))
+
+    full_payload = payload_size(full, tabs)
+    projected_payload = payload_size(projected, tabs)
+    full_time, full_size = generate(full, tabs, meta_data)
+    projected_time, projected_size = generate(projected, tabs, meta_data)
+
+    print('{}: projecting onto {}'.format(os.path.basename(filepath), ', '.join(COLUMNS[0][1])))
+    print('  payload:    {:,} bytes full  {:,} bytes projected  {:.2f}x'.format(
+        full_payload, projected_payload, float(full_payload) / projected_payload))
+    print('  write cpu:  {:.3f}s full  {:.3f}s projected  {:.2f}x'.format(
+        full_time, projected_time, full_time / projected_time))
+    print('  file size:  {:,} bytes full  {:,} bytes projected  {:.2f}x'.format(
+        full_size, projected_size, float(full_size) / projected_size))
+
+
+if __name__ == '__main__':
+    main()
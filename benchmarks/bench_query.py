@@ -0,0 +1,84 @@
+"""
+Benchmark of the indexed lookups of the query module.
+
+For each checked in dictionary file, times loading the file, building the
+indexes, and looking up every suppressed and generalized concept, every
+table and field, and every change number.  Compares the lookups to scanning
+the items of the sections, as the cleaning jobs did.
+
+Usage:  PYTHONPATH=. python benchmarks/bench_query.py
+"""
+# Python imports
+import io
+import os
+import time
+
+# Third party imports
+import yaml
+
+# Project imports
+from benchmarks import dictionary_data
+from cdr_data_dictionary import compiled_schema
+from cdr_data_dictionary import query
+
+# Each lookup is repeated to measure short latencies
+REPEATS = 100
+# Scans are slow, so fewer keys are scanned
+SCAN_KEYS = 50
+
+
+def scan_suppressed(dictionary, concept_id):
+    """ Find the suppression of a concept by scanning the section. """
+    for item in dictionary.sections.get(query.CONCEPT_SUPPRESSIONS, []):
+        if concept_id in query.concept_ids(item.get('concept_id')):
+            return True
+    return False
+
+
+def per_lookup(lookup, keys, repeats):
+    """ The mean seconds of a lookup of each key. """
+    if not keys:
+        return 0.0
+    start = time.time()
+    for _ in range(repeats):
+        for key in keys:
+            lookup(key)
+    return (time.time() - start) / (repeats * len(keys))
+
+
+def main():
+    """ Run the benchmark on every checked in dictionary file. """
+    for filepath in dictionary_data.dictionary_files():
+        start = time.time()
+        with io.open(filepath, 'rb') as dict_file:
+            document = yaml.load(dict_file, Loader=compiled_schema.SAFE_LOADER)
+        load_time = time.time() - start
+
+        start = time.time()
+        dictionary = query.DataDictionary(document)
+        index_time = time.time() - start
+
+        suppressed = list(dictionary.suppressed_concepts)
+        inputs = list(dictionary.generalized_outputs)
+        fields = list(dictionary.fields)
+        changes = list(dictionary.changes)
+
+        print('{}:  load {:.3f}s  index {:.4f}s'.format(
+            os.path.basename(filepath), load_time, index_time))
+        print('  {} suppressed, {} generalized inputs, {} fields, {} changes'.format(
+            len(suppressed), len(inputs), len(fields), len(changes)))
+        lookups = [
+            ('is_suppressed', dictionary.is_suppressed, suppressed),
+            ('generalized_output', dictionary.generalized_output, inputs),
+            ('field', lambda key: dictionary.field(*key), fields),
+            ('change', dictionary.change, changes),
+        ]
+        for name, lookup, keys in lookups:
+            print('  {:20s} {:.3f} us'.format(name, per_lookup(lookup, keys, REPEATS) * 1e6))
+        scan = per_lookup(lambda key: scan_suppressed(dictionary, key),
+                          suppressed[-SCAN_KEYS:], 1)
+        print('  {:20s} {:.3f} us'.format('scan suppressions', scan * 1e6))
+
+
+if __name__ == '__main__':
+    main()
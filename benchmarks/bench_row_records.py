@@ -0,0 +1,81 @@
+"""
+Benchmark of compact row records against row dictionaries.
+
+Holds the processed rows of the Concept (Row) Suppressions tab, repeated to
+about 60,000 rows, as dictionaries of single value lists and as records.
+Measures the peak memory of each, and the CPU time to write them.
+
+Usage:  PYTHONPATH=. python benchmarks/bench_row_records.py
+"""
+# Python imports
+import copy
+import io
+import time
+import tracemalloc
+
+# Third party imports
+
+# Project imports
+from benchmarks import dictionary_data
+from cdr_data_dictionary import constants as consts
+from cdr_data_dictionary import generate_yaml as gen
+from cdr_data_dictionary import value_cache
+from cdr_data_dictionary import yaml_serializer as ser
+
+TARGET_ROWS = 60000
+
+
+def dict_rows(fields, rows, init_fields):
+    """ Process rows into dictionaries, as the rows were previously stored. """
+    interned = [value_cache.BoundedMemo().intern for _ in fields]
+    for row in rows:
+        new_dict = copy.copy(init_fields)
+        for index, val in enumerate(row):
+            new_dict[fields[index]] = [interned[index](val)]
+        yield new_dict
+
+
+def hold_rows(process, fields, rows):
+    """ Process and keep every row.  Returns the rows and peak traced memory. """
+    tracemalloc.start()
+    held = list(process(fields, rows, consts.INIT_ROW_SUPPRESSIONS))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, peak
+
+
+def write_rows(fields, rows):
+    """ Format every row.  Returns the CPU seconds used and the text. """
+    start = time.process_time()
+    plan = ser.TabPlan(fields, 3, gen._process_value)
+    output = io.StringIO()
+    for row in rows:
+        output.write(plan.format_item(row))
+    return time.process_time() - start, output.getvalue()
+
+
+def main():
+    """ Run the benchmark on the newest checked in dictionary file. """
+    filepath = dictionary_data.dictionary_files()[-1]
+    _, tabs = dictionary_data.tab_values(filepath)
+    values = dict(tabs)[consts.CONCEPT_SUPPRESSIONS_TAB_NAME]
+    fields = gen._process_field_names(values[0])
+    repeats = max(1, TARGET_ROWS // len(values[1:]))
+    rows = values[1:] * repeats
+
+    dicts, dict_peak = hold_rows(dict_rows, fields, rows)
+    dict_time, dict_text = write_rows(fields, dicts)
+    del dicts
+
+    records, record_peak = hold_rows(gen.iter_tab_contents, fields, rows)
+    record_time, record_text = write_rows(fields, records)
+
+    print('{}: {} rows, identical output: {}'.format(
+        consts.CONCEPT_SUPPRESSIONS_TAB_NAME, len(rows), dict_text == record_text))
+    print('  peak memory: {:,} bytes dicts  {:,} bytes records  {:.2f}x'.format(
+        dict_peak, record_peak, float(dict_peak) / record_peak))
+    print('  write cpu:   {:.3f}s dicts  {:.3f}s records'.format(dict_time, record_time))
+
+
+if __name__ == '__main__':
+    main()
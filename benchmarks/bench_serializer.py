@@ -0,0 +1,115 @@
+"""
+Micro-benchmark of the yaml serializer on the checked in dictionary files.
+
+Compares writing each item fragment separately to a codecs stream writer,
+which encodes on every call, with writing whole items to the chunked writer,
+formatted either value by value or by a compiled tab plan.
+
+Usage:  PYTHONPATH=. python benchmarks/bench_serializer.py
+"""
+# Python imports
+from argparse import Namespace
+import codecs
+import os
+import tempfile
+import timeit
+
+# Third party imports
+
+# Project imports
+from benchmarks import dictionary_data
+from cdr_data_dictionary import generate_yaml as gen
+from cdr_data_dictionary import yaml_serializer as ser
+
+
+def _prepare(filepath):
+    """ Process every tab so only serialization is timed. """
+    _, tabs = dictionary_data.tab_values(filepath)
+    prepared = []
+    for tab_name, rows in tabs:
+        _, fields, values, index = gen._create_yaml_file(Namespace(column_id=None),
+                                                         tab_name, rows)
+        prepared.append((fields, list(values), index))
+    return prepared
+
+
+def write_fragments(filepath, prepared):
+    """ Write each fragment with its own call, encoding on every write. """
+    writes = 0
+    with codecs.open(filepath, 'w', encoding='utf-8') as yaml:
+        for fields, values, index in prepared:
+            for value_dict in values:
+                for part in ser.item_parts(fields, value_dict, index, gen._process_value):
+                    yaml.write(part)
+                    writes += 1
+    return writes
+
+
+def write_chunked(filepath, prepared):
+    """ Write whole items to the chunked writer. """
+    writes = 0
+    with ser.open_writer(filepath) as yaml:
+        for fields, values, index in prepared:
+            for value_dict in values:
+                yaml.write(ser.format_item(fields, value_dict, index, gen._process_value))
+                writes += 1
+    return writes
+
+
+def write_planned(filepath, prepared):
+    """ Write whole items formatted by a compiled tab plan to the chunked writer. """
+    writes = 0
+    with ser.open_writer(filepath) as yaml:
+        for fields, values, index in prepared:
+            plan = ser.TabPlan(fields, index, gen._process_value)
+            for value_dict in values:
+                yaml.write(plan.format_item(value_dict))
+                writes += 1
+    return writes
+
+
+def main(repeat=3):
+    """ Run the benchmark for each checked in dictionary file. """
+    out_dir = tempfile.mkdtemp()
+    fragment_file = os.path.join(out_dir, 'fragments.yaml')
+    chunked_file = os.path.join(out_dir, 'chunked.yaml')
+    planned_file = os.path.join(out_dir, 'planned.yaml')
+
+    for filepath in dictionary_data.dictionary_files():
+        prepared = _prepare(filepath)
+        items = sum(len(values) for _, values, _ in prepared)
+        fragment_writes = write_fragments(fragment_file, prepared)
+        write_chunked(chunked_file, prepared)
+        write_planned(planned_file, prepared)
+
+        with open(fragment_file, 'rb') as fragments, open(chunked_file, 'rb') as chunked, \
+                open(planned_file, 'rb') as planned:
+            expected = fragments.read()
+            identical = expected == chunked.read() == planned.read()
+
+        fragment_time = min(timeit.repeat(lambda: write_fragments(fragment_file, prepared),
+                                          number=1, repeat=repeat))
+        chunked_time = min(timeit.repeat(lambda: write_chunked(chunked_file, prepared),
+                                         number=1, repeat=repeat))
+        planned_time = min(timeit.repeat(lambda: write_planned(planned_file, prepared),
+                                         number=1, repeat=repeat))
+
+        print(os.path.basename(filepath))
+        print('  items: {:,}  fragment writes: {:,}  identical output: {}'.format(
+            items, fragment_writes, identical))
+        print('  fragments: {:.3f}s  {:,.0f} writes/s  {:,.0f} items/s'.format(
+            fragment_time, fragment_writes / fragment_time, items / fragment_time))
+        print('  chunked:   {:.3f}s  {:,.0f} writes/s  {:,.0f} items/s'.format(
+            chunked_time, fragment_writes / chunked_time, items / chunked_time))
+        print('  planned:   {:.3f}s  {:,.0f} writes/s  {:,.0f} items/s'.format(
+            planned_time, fragment_writes / planned_time, items / planned_time))
+        print('  speedup:   {:.2f}x chunked  {:.2f}x planned'.format(
+            fragment_time / chunked_time, fragment_time / planned_time))
+
+    for name in (fragment_file, chunked_file, planned_file):
+        os.remove(name)
+    os.rmdir(out_dir)
+
+
+if __name__ == '__main__':
+    main()
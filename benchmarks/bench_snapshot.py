@@ -0,0 +1,77 @@
+"""
+Benchmark of loading binary snapshots of the dictionary files.
+
+For each checked in dictionary file, writes its snapshot and compares
+loading the snapshot to loading the yaml file with yaml.safe_load and with
+the libyaml C loader.  Each load is checked to give the same document.
+
+Usage:  PYTHONPATH=. python benchmarks/bench_snapshot.py
+"""
+# Python imports
+import io
+import os
+import shutil
+import tempfile
+import time
+
+# Third party imports
+import yaml
+
+# Project imports
+from benchmarks import dictionary_data
+from cdr_data_dictionary import compiled_schema
+from cdr_data_dictionary import dictionary_snapshot
+from cdr_data_dictionary import query
+
+# Snapshot loads are short, so they are repeated
+REPEATS = 20
+
+
+def load_yaml(filepath, loader):
+    """ Load a dictionary file with a yaml loader. """
+    with io.open(filepath, 'rb') as dict_file:
+        return yaml.load(dict_file, Loader=loader)
+
+
+def timed(load, repeats=1):
+    """ The result and mean seconds of a load. """
+    start = time.time()
+    for _ in range(repeats):
+        result = load()
+    return result, (time.time() - start) / repeats
+
+
+def main():
+    """ Run the benchmark on every checked in dictionary file. """
+    temp_dir = tempfile.mkdtemp()
+    try:
+        for filepath in dictionary_data.dictionary_files():
+            snapshot_file = os.path.join(temp_dir, os.path.basename(filepath) + '.cdrdd')
+            _, write_time = timed(lambda: dictionary_snapshot.write_file_snapshot(
+                filepath, snapshot_file))
+
+            expected, safe_time = timed(lambda: load_yaml(filepath, yaml.SafeLoader))
+            c_loaded, c_time = timed(lambda: load_yaml(filepath, compiled_schema.SAFE_LOADER))
+            document, snapshot_time = timed(
+                lambda: dictionary_snapshot.load_document(snapshot_file, filepath), REPEATS)
+            _, query_time = timed(lambda: dictionary_snapshot.load(snapshot_file), REPEATS)
+
+            print('{}:  yaml {:.0f}kB  snapshot {:.0f}kB  write {:.3f}s'.format(
+                os.path.basename(filepath), os.path.getsize(filepath) / 1024.0,
+                os.path.getsize(snapshot_file) / 1024.0, write_time))
+            print('  yaml.safe_load:          {:.4f}s'.format(safe_time))
+            print('  C loader:                {:.4f}s  {:.1f}x'.format(c_time, safe_time / c_time))
+            print('  snapshot:                {:.4f}s  {:.1f}x  identical: {}'.format(
+                snapshot_time, safe_time / snapshot_time,
+                document == expected and c_loaded == expected))
+            print('  snapshot to query:       {:.4f}s  {:.1f}x'.format(
+                query_time, safe_time / query_time))
+            # the indexes are the same however the document is loaded
+            assert (query.DataDictionary(document).fields ==
+                    query.DataDictionary(expected).fields)
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
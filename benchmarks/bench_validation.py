@@ -0,0 +1,88 @@
+"""
+Benchmark of validating a dictionary file with the compiled schema.
+
+Writes each checked in dictionary file again from the values it was
+generated from.  Compares writing the file and then validating it with
+yamale, or with the compiled schema, to checking each item with the compiled
+schema as it is written.  Single quotes are removed from the values, so every
+written file can be loaded.
+
+Usage:  PYTHONPATH=. python benchmarks/bench_validation.py
+"""
+# Python imports
+from argparse import Namespace
+import copy
+import os
+import tempfile
+import time
+
+# Third party imports
+from future.utils import string_types
+
+# Project imports
+from benchmarks import dictionary_data
+from cdr_data_dictionary import compiled_schema
+from cdr_data_dictionary import generate_yaml as gen
+from cdr_data_dictionary import validator
+
+SCHEMA_FILE = os.path.join('cdr_data_dictionary', 'schema.yaml')
+
+
+def unquoted_tabs(tabs):
+    """ Remove single quotes from the values of the tabs. """
+    return [(tab_name, [[cell.replace("'", '') if isinstance(cell, string_types) else cell
+                         for cell in row] for row in rows])
+            for tab_name, rows in tabs]
+
+
+def errors(validate):
+    """ Run a validation.  Returns the number of errors reported. """
+    try:
+        validate()
+    except compiled_schema.SchemaValidationError as exc:
+        return len(exc.errors)
+    except ValueError as exc:
+        return len(str(exc).splitlines()) - 1
+    return 0
+
+
+def timed(function):
+    """ Run a function.  Returns the wall clock seconds and its result. """
+    start = time.time()
+    result = function()
+    return time.time() - start, result
+
+
+def main():
+    """ Run the benchmark on every checked in dictionary file. """
+    output_dir = tempfile.mkdtemp()
+    for filepath in dictionary_data.dictionary_files():
+        meta_data, tabs = dictionary_data.tab_values(filepath)
+        tabs = unquoted_tabs(tabs)
+        settings = Namespace(column_id=None, incremental=False,
+                             output_file=os.path.join(output_dir, 'out.yaml'))
+
+        write_time, _ = timed(
+            lambda: gen.create_yaml_file(settings, copy.deepcopy(tabs), meta_data))
+        yamale_time, yamale_errors = timed(
+            lambda: errors(lambda: validator.validate(SCHEMA_FILE, settings.output_file)))
+        compiled_schema.load_schema(SCHEMA_FILE)
+        file_time, file_errors = timed(
+            lambda: errors(lambda: compiled_schema.validate_file(SCHEMA_FILE,
+                                                                 settings.output_file)))
+        item_validator = compiled_schema.ItemValidator(SCHEMA_FILE)
+        checked_time, _ = timed(
+            lambda: gen.create_yaml_file(settings, copy.deepcopy(tabs), meta_data,
+                                         item_validator))
+        item_errors = len(item_validator.collector.errors)
+
+        print('{}:'.format(os.path.basename(filepath)))
+        print('  write {:.2f}s'.format(write_time))
+        print('  yamale:            +{:.2f}s  {} errors'.format(yamale_time, yamale_errors))
+        print('  compiled file:     +{:.2f}s  {} errors'.format(file_time, file_errors))
+        print('  checked on write:  +{:.2f}s  {} errors'.format(
+            checked_time - write_time, item_errors))
+
+
+if __name__ == '__main__':
+    main()
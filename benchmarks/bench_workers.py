@@ -0,0 +1,72 @@
+"""
+Benchmark of processing and formatting tabs in a pool of worker processes.
+
+Builds a large spreadsheet by repeating the rows of the newest checked in
+dictionary file.  Writes it in this process, then with 1, 2, 4, and 8
+workers, and checks that every file is identical.  Speed ups are limited by
+the number of CPUs available.
+
+Usage:  PYTHONPATH=. python benchmarks/bench_workers.py
+"""
+# Python imports
+from argparse import Namespace
+import copy
+import multiprocessing
+import os
+import tempfile
+import time
+
+# Third party imports
+
+# Project imports
+from benchmarks import dictionary_data
+from cdr_data_dictionary import generate_yaml as gen
+
+REPEATS = 10
+WORKERS = [1, 2, 4, 8]
+
+
+def repeated_tabs(tabs, repeats):
+    """ Repeat the rows of each tab, after its header row. """
+    return [(tab_name, [rows[0]] + rows[1:] * repeats) for tab_name, rows in tabs]
+
+
+def timed(write, settings, tabs):
+    """ Run a write.  Returns the wall clock seconds and the file contents. """
+    values = copy.deepcopy(tabs)
+    start = time.time()
+    write(settings, values)
+    elapsed = time.time() - start
+    with open(settings.output_file, 'rb') as yaml_file:
+        return elapsed, yaml_file.read()
+
+
+def main():
+    """ Run the benchmark on the newest checked in dictionary file. """
+    filepath = dictionary_data.dictionary_files()[-1]
+    meta_data, tabs = dictionary_data.tab_values(filepath)
+    tabs = repeated_tabs(tabs, REPEATS)
+    output_dir = tempfile.mkdtemp()
+    rows = sum(len(tab_rows) for _, tab_rows in tabs)
+
+    settings = Namespace(column_id=None, incremental=False, workers=1,
+                         output_file=os.path.join(output_dir, 'serial.yaml'))
+    serial_time, expected = timed(
+        lambda settings, values: gen.create_yaml_file(settings, values, meta_data),
+        settings, tabs)
+
+    print('{} x{}: {} tabs, {} rows, {} cpus'.format(
+        os.path.basename(filepath), REPEATS, len(tabs), rows, multiprocessing.cpu_count()))
+    print('  serial:     {:.2f}s'.format(serial_time))
+    for workers in WORKERS:
+        settings = Namespace(column_id=None, incremental=False, workers=workers,
+                             output_file=os.path.join(output_dir, 'parallel.yaml'))
+        parallel_time, contents = timed(
+            lambda settings, values: gen.write_parallel_yaml_file(settings, values, meta_data),
+            settings, tabs)
+        print('  {} workers:  {:.2f}s  {:.2f}x  identical: {}'.format(
+            workers, parallel_time, serial_time / parallel_time, contents == expected))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Rebuild spreadsheet style tab values from a generated dictionary file.
+
+The benchmarks use the checked in yaml_files as realistic input.  Each
+transformations section is turned back into the rows the Sheets API would
+return for its tab: a header row followed by one list of strings per item.
+"""
+# Python imports
+import datetime
+import glob
+import os
+
+# Third party imports
+import yaml
+
+# Project imports
+from cdr_data_dictionary import constants as consts
+from cdr_data_dictionary import generate_yaml as gen
+
+YAML_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'yaml_files')
+
+LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def dictionary_files():
+    """ Get the paths of the checked in dictionary files, newest last. """
+    return sorted(glob.glob(os.path.join(YAML_DIR, 'CDRDD_*.yaml')))
+
+
+def load_dictionary(filepath):
+    """ Load a generated dictionary file with the fastest available loader. """
+    with open(filepath, 'r') as yaml_file:
+        return yaml.load(yaml_file, Loader=LOADER)
+
+
+def _cell(value):
+    """ Turn a loaded yaml value back into a spreadsheet cell string. """
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    if isinstance(value, list):
+        return '\n'.join(_cell(item) for item in value)
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%m/%d/%Y %H:%M:%S')
+    if isinstance(value, datetime.date):
+        return value.strftime('%m/%d/%Y')
+    return str(value)
+
+
+def tab_values(filepath):
+    """
+    Rebuild the tab values and meta data a dictionary file was generated from.
+
+    :param filepath:  path to a generated dictionary file
+
+    :return:  a tuple of the meta data dictionary and a list of the form
+        [(tab_name, [[header_row], [value_row_1], ...])]
+    """
+    document = load_dictionary(filepath)
+    tab_names = {gen._get_sequence_title(name): name for name in consts.SHEET_NAMES}
+
+    tabs = []
+    for section in document['transformations']:
+        for title, items in section.items():
+            items = items or []
+            keys = []
+            for item in items:
+                keys.extend(key for key in item if key not in keys)
+
+            rows = [[key.replace('_', ' ').title() for key in keys]]
+            for item in items:
+                row = [_cell(item.get(key)) for key in keys]
+                # the sheets api does not return trailing empty cells
+                while row and row[-1] == '':
+                    row.pop()
+                rows.append(row)
+            tabs.append((tab_names.get(title, title), rows))
+
+    meta_data = dict(consts.INIT_META_DATA_VALUES)
+    for key, value in (document.get('meta_data') or [{}])[0].items():
+        meta_data[key] = value if value is None else _cell(value)
+    meta_data['cdr_version'] = meta_data['cdr_version'] or 'unknown'
+    return meta_data, tabs
@@ -0,0 +1,111 @@
+"""
+Module responsible for grouping tab rows on the group by column.
+
+Each unique value of the group by column becomes a single group.  The other
+fields of the group hold the unique values of every row in the group, in the
+order they were first read.  Groups are found with a dictionary keyed on the
+group by value, and unique values are kept in insertion ordered dictionaries,
+so grouping takes a single pass over the rows.
+"""
+# Python imports
+from collections import OrderedDict
+import logging
+
+# Third party imports
+from future.utils import viewitems
+
+# Project imports
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _raw_items(row):
+    """ Get the field names and unwrapped values of a row record or dictionary. """
+    raw_items = getattr(row, 'raw_items', None)
+    if raw_items is not None:
+        return raw_items()
+    return [(key, value[0]) for key, value in viewitems(row)]
+
+
+class Group(object):
+    """
+    The aggregated rows sharing a single group by value.
+
+    :param group_field:  the name of the group by field
+    :param group_value:  the value of the group by field shared by the rows
+    """
+    __slots__ = ('group_field', 'group_value', 'fields', 'rows')
+
+    def __init__(self, group_field, group_value):
+        self.group_field = group_field
+        self.group_value = group_value
+        # field name to an ordered dictionary used as an ordered set
+        self.fields = OrderedDict()
+        self.rows = 0
+
+    def add(self, row):
+        """
+        Add the values of a row to the group.
+
+        :param row:  a row record or dictionary of field names to a list
+            holding the value of the field.
+        """
+        fields = self.fields
+        for key, value in _raw_items(row):
+            try:
+                unique = fields[key]
+            except KeyError:
+                unique = fields[key] = OrderedDict()
+            unique[value] = None
+        self.rows += 1
+
+    def get(self, field, default=None):
+        """
+        Get the unique values of a field.
+
+        :param field:  the field name
+        :param default:  returned if no row had the field
+
+        :return:  a list of the unique values of the field, in the order they
+            were first read.
+        """
+        unique = self.fields.get(field)
+        if unique is None:
+            return default
+        return list(unique)
+
+    def value_lists(self):
+        """
+        Get the unique values of every field.
+
+        :return:  a list of (field name, list of unique values) tuples.
+        """
+        return [(key, list(unique)) for key, unique in viewitems(self.fields)]
+
+
+def group_rows(rows, group_field):
+    """
+    Aggregate rows by the value of the group by field.
+
+    :param rows:  an iterable of row records or dictionaries of field names to
+        a list holding the value of the field.  Rows without the group by
+        field are grouped under an empty value.
+    :param group_field:  the name of the field to group by
+
+    :return:  a list of Group objects, in the order each group by value was
+        first read.
+    """
+    groups = OrderedDict()
+    row_count = 0
+    for row in rows:
+        group_value = (row.get(group_field) or [''])[0]
+        try:
+            group = groups[group_value]
+        except KeyError:
+            group = groups[group_value] = Group(group_field, group_value)
+        group.add(row)
+        row_count += 1
+
+    LOGGER.debug("Aggregated %d rows into %d groups on %s",
+                 row_count, len(groups), group_field)
+    return list(groups.values())
@@ -0,0 +1,443 @@
+"""
+Apply a generated dictionary to OMOP table extracts.
+
+Each csv file of the input directory, such as observation.csv, is an extract
+of the table named by the file.  Tables listed in table_suppressions are not
+written.  The rows of other tables are read in chunks of a fixed number of
+rows, so a table is never held in memory, and each chunk is:
+
+  * dropped row by row, when a concept id column holds a concept of
+    concept_suppressions,
+  * generalized, rewriting the input concept ids of concept_generalizations
+    to their generalized output concept ids in the fields_affected columns,
+  * blanked in the columns listed in field_suppressions.
+
+Chunks are applied by a pool of worker processes and written in order.
+This is an entry point.
+"""
+# Python imports
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import io
+import logging
+import os
+import time
+from itertools import islice
+
+# Third party imports
+from future.utils import PY2
+
+# Project imports
+from cdr_data_dictionary import cdr_parser
+from cdr_data_dictionary import closure
+from cdr_data_dictionary import constants as consts
+from cdr_data_dictionary import query
+from cdr_data_dictionary import yaml_logging
+
+LOGGER = logging.getLogger(__name__)
+
+CSV_EXTENSION = '.csv'
+CONCEPT_COLUMN_SUFFIX = '_concept_id'
+SOURCE_VALUE_SUFFIX = '_source_value'
+# Chunks submitted to the pool, and not yet written, for each worker
+PENDING_CHUNKS_PER_WORKER = 2
+
+# The dictionary of a worker process, and the rules of each table built from
+# it.  Set once for each worker, so only rows are sent with each chunk.
+_WORKER_STATE = {}
+
+
+def _open_csv(path, mode):
+    """ Open a csv file for the csv module of either python version. """
+    if PY2:
+        return open(path, mode + 'b')
+    return io.open(path, mode, newline='', encoding='utf-8')
+
+
+def _applies_to(item, table):
+    """ True if an item applies to the table.  Items without tables apply to every table. """
+    tables = query.names(item.get('relevant_omop_table'))
+    return not tables or table in tables
+
+
+def _scope_column(field_name, header):
+    """
+    Find the column holding the concepts generalized values are recorded for.
+
+    Generalizations name the question field, which may be its source value
+    column, such as observation_source_value.  The concept id column of the
+    same source is used.
+
+    :return:  the index of the column, or None
+    """
+    candidates = [field_name]
+    if field_name.endswith(SOURCE_VALUE_SUFFIX):
+        candidates.append(field_name[:-len(SOURCE_VALUE_SUFFIX)] + '_source' +
+                          CONCEPT_COLUMN_SUFFIX)
+    for candidate in candidates:
+        if candidate.endswith(CONCEPT_COLUMN_SUFFIX) and candidate in header:
+            return header.index(candidate)
+    return None
+
+
+def _flatten(mapping, scoped):
+    """
+    Replace the outputs of a column mapping with the final outputs of their chains.
+
+    Scoped chains stay within their scope.  Inputs of cycles are left out.
+    """
+    if not scoped:
+        return closure.final_outputs(mapping)[0]
+    scopes = {}
+    for (scope, input_id), output_id in mapping.items():
+        scopes.setdefault(scope, {})[input_id] = output_id
+    flattened = {}
+    for scope, outputs in scopes.items():
+        for input_id, output_id in closure.final_outputs(outputs)[0].items():
+            flattened[(scope, input_id)] = output_id
+    return flattened
+
+
+class TableRules(object):
+    """
+    The rules of a dictionary applying to the rows of one table.
+
+    The rules are plain data, so they are sent to worker processes with each
+    chunk.  Concept ids are compared as the strings read from the csv file.
+
+    Suppression rules do not name the concept id columns reliably, so a row
+    is dropped if any of its concept id columns holds a suppressed concept.
+
+    :param dictionary:  a query.DataDictionary
+    :param table:  the name of the table, such as 'observation'
+    :param header:  the list of column names of the table
+    """
+
+    def __init__(self, dictionary, table, header):
+        header = [name.strip().lower() for name in header]
+        self.table = table
+        self.width = len(header)
+        self.concept_columns = [index for index, name in enumerate(header)
+                                if name.endswith(CONCEPT_COLUMN_SUFFIX)]
+        self.suppressed = set()
+        for concept_id, items in dictionary.suppressed_concepts.items():
+            if any(_applies_to(item, table) for item in items):
+                self.suppressed.add(str(concept_id))
+        self.blank_columns = [index for index, name in enumerate(header)
+                              if dictionary.is_field_suppressed(table, name)]
+        self.generalizations = self._generalizations(dictionary, header)
+
+    def _generalizations(self, dictionary, header):
+        """
+        Collect the generalized outputs of each affected column.
+
+        Inputs are generalized for the concept of the item when the table has
+        a column for it.  Otherwise, the first output of an input is used.
+        Chained generalizations are followed to their final output.
+
+        :return:  a list of (column index, scope column index or None,
+            dictionary of input keys to output concept ids) tuples
+        """
+        mappings = {}
+        for item in dictionary.sections.get(query.CONCEPT_GENERALIZATIONS, []):
+            outputs = query.concept_ids(item.get('generalized_output_concept_id'))
+            if len(outputs) != 1 or not _applies_to(item, self.table):
+                continue
+            affected = [name.strip() for field in query.names(item.get('fields_affected'))
+                        for name in field.split(',')]
+            columns = [header.index(name) for name in affected
+                       if name.endswith(CONCEPT_COLUMN_SUFFIX) and name in header]
+            scope_index = None
+            for field_name in query.names(item.get('field_name')):
+                scope_index = _scope_column(field_name, header)
+                if scope_index is not None:
+                    break
+            scopes = [str(concept_id) for concept_id in query.concept_ids(item.get('concept_id'))]
+            for column in columns:
+                mapping = mappings.setdefault((column, scope_index), {})
+                for input_id in query.concept_ids(item.get('input_concept_id')):
+                    if scope_index is None:
+                        mapping.setdefault(str(input_id), str(outputs[0]))
+                    else:
+                        for scope in scopes:
+                            mapping.setdefault((scope, str(input_id)), str(outputs[0]))
+        return [(column, scope_index, _flatten(mapping, scope_index is not None))
+                for (column, scope_index), mapping in sorted(mappings.items(),
+                                                             key=lambda pair: pair[0][0])]
+
+    def apply(self, rows):
+        """
+        Apply the rules to a chunk of rows.
+
+        :param rows:  a list of lists of column values.  Kept rows are changed.
+
+        :return:  a tuple of the list of kept rows, the number of dropped
+            rows, and the number of generalized values
+        """
+        kept = []
+        dropped = 0
+        generalized = 0
+        for row in rows:
+            if len(row) < self.width:
+                row.extend([''] * (self.width - len(row)))
+            if self.suppressed and any(row[index] in self.suppressed
+                                       for index in self.concept_columns):
+                dropped += 1
+                continue
+            for index, scope_index, mapping in self.generalizations:
+                key = row[index] if scope_index is None else (row[scope_index], row[index])
+                output_id = mapping.get(key)
+                if output_id is not None:
+                    row[index] = output_id
+                    generalized += 1
+            for index in self.blank_columns:
+                row[index] = ''
+            kept.append(row)
+        return kept, dropped, generalized
+
+
+def _init_worker(dictionary):
+    """
+    Set the dictionary the chunks of a worker process are applied with.
+
+    :param dictionary:  a query.DataDictionary
+    """
+    _WORKER_STATE.clear()
+    _WORKER_STATE[None] = dictionary
+
+
+def _create_pool(dictionary, workers):
+    """
+    Create the process pool applying chunks, sending the dictionary to each
+    worker once.
+
+    :param dictionary:  a query.DataDictionary
+    :param workers:  the number of worker processes
+
+    :return:  a ProcessPoolExecutor
+    """
+    if PY2:
+        # the futures backport has no initializer.  workers are forked from
+        # this process, and inherit the dictionary.
+        _init_worker(dictionary)
+        return ProcessPoolExecutor(max_workers=workers)
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(dictionary,))
+
+
+def apply_chunk(task):
+    """
+    Apply table rules to a chunk of rows.  Runs in a worker process.
+
+    The rules of each table are built once in each worker, from the
+    dictionary set by _init_worker.
+
+    :param task:  a tuple of the table name, its header row, and a list of rows
+
+    :return:  the tuple returned by TableRules.apply
+    """
+    table, header, rows = task
+    key = (table, tuple(header))
+    rules = _WORKER_STATE.get(key)
+    if rules is None:
+        rules = TableRules(_WORKER_STATE[None], table, header)
+        _WORKER_STATE[key] = rules
+    return rules.apply(rows)
+
+
+class TableReport(object):
+    """
+    The counts of applying a dictionary to one table.
+
+    :param table:  the name of the table
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.rows = 0
+        self.kept = 0
+        self.dropped = 0
+        self.generalized = 0
+        self.seconds = 0.0
+        self.suppressed = False
+
+    @property
+    def rows_per_second(self):
+        """ The rows read each second. """
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        if self.suppressed:
+            return '{}:  table suppressed, not written'.format(self.table)
+        return ('{}:  {} rows, {} kept, {} dropped, {} values generalized, '
+                '{:.2f} seconds, {:.0f} rows/s').format(
+                    self.table, self.rows, self.kept, self.dropped, self.generalized,
+                    self.seconds, self.rows_per_second)
+
+
+def _chunks(reader, chunk_rows):
+    """ Read lists of at most chunk_rows rows. """
+    while True:
+        rows = list(islice(reader, chunk_rows))
+        if not rows:
+            return
+        yield rows
+
+
+def apply_file(dictionary, input_path, output_path, chunk_rows=consts.DEFAULT_APPLY_CHUNK_ROWS,
+               executor=None, max_pending=1):
+    """
+    Apply a dictionary to the csv extract of one table.
+
+    :param dictionary:  a query.DataDictionary
+    :param input_path:  the path to the csv file.  The file name, without
+        its extension, is the table name.
+    :param output_path:  the path the transformed csv file is written to.
+        Not written if the table is suppressed.
+    :param chunk_rows:  the number of rows read and applied at a time
+    :param executor:  if given, a process pool from _create_pool the chunks
+        are applied by.  Otherwise, chunks are applied in this process.
+    :param max_pending:  the number of chunks submitted to the executor and
+        not yet written.  Bounds the rows held in memory.
+
+    :return:  a TableReport
+    """
+    table = os.path.splitext(os.path.basename(input_path))[0].lower()
+    report = TableReport(table)
+    if dictionary.is_table_suppressed(table):
+        report.suppressed = True
+        LOGGER.info("%s", report)
+        return report
+
+    start = time.time()
+    with _open_csv(input_path, 'r') as input_file, _open_csv(output_path, 'w') as output_file:
+        reader = csv.reader(input_file)
+        writer = csv.writer(output_file, lineterminator='\n')
+        header = next(reader, None)
+        if header is None:
+            report.seconds = time.time() - start
+            LOGGER.info("%s", report)
+            return report
+        writer.writerow(header)
+        rules = TableRules(dictionary, table, header) if executor is None else None
+        pending = deque()
+
+        def write(result):
+            kept, dropped, generalized = result
+            writer.writerows(kept)
+            report.kept += len(kept)
+            report.dropped += dropped
+            report.generalized += generalized
+
+        for rows in _chunks(reader, chunk_rows):
+            report.rows += len(rows)
+            if executor is None:
+                write(rules.apply(rows))
+                continue
+            pending.append(executor.submit(apply_chunk, (table, header, rows)))
+            if len(pending) >= max_pending:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+
+    report.seconds = time.time() - start
+    LOGGER.info("%s", report)
+    return report
+
+
+def apply_directory(dictionary, input_dir, output_dir, chunk_rows=consts.DEFAULT_APPLY_CHUNK_ROWS,
+                    workers=1):
+    """
+    Apply a dictionary to the csv extract of each table of a directory.
+
+    :param dictionary:  a query.DataDictionary
+    :param input_dir:  the directory of csv files, one for each table
+    :param output_dir:  the directory the transformed files are written to.
+        Created if it does not exist.
+    :param chunk_rows:  the number of rows read and applied at a time
+    :param workers:  the number of worker processes applying chunks.  With
+        1, chunks are applied in this process.
+
+    :return:  a list of TableReports, in the order of the file names
+    """
+    try:
+        os.makedirs(output_dir)
+    except OSError:
+        # path already exists.  moving on.
+        pass
+
+    file_names = sorted(name for name in os.listdir(input_dir)
+                        if name.lower().endswith(CSV_EXTENSION))
+    paths = [(os.path.join(input_dir, name), os.path.join(output_dir, name))
+             for name in file_names]
+    if workers == 1:
+        return [apply_file(dictionary, input_path, output_path, chunk_rows)
+                for input_path, output_path in paths]
+
+    with _create_pool(dictionary, workers) as executor:
+        return [apply_file(dictionary, input_path, output_path, chunk_rows, executor,
+                           workers * PENDING_CHUNKS_PER_WORKER)
+                for input_path, output_path in paths]
+
+
+def _parse_command_line(raw_args=None):
+    """
+    Parse the command line arguments.
+
+    :param raw_args:  If not None, the arguments to parse.  Otherwise, the
+        raw command line arguments are parsed.
+    """
+    parser = ArgumentParser(
+        description=('Apply the suppressions and generalizations of a generated '
+                     'dictionary file to a directory of OMOP csv files.')
+    )
+    parser.add_argument('-d', '--dictionary-file', dest='dictionary_file', action='store',
+                        required=True,
+                        help='Path to the generated yaml dictionary file.')
+    parser.add_argument('-i', '--input-dir', dest='input_dir', action='store', required=True,
+                        help=('Directory of csv files, each named for its OMOP '
+                              'table, such as observation.csv.'))
+    parser.add_argument('-o', '--output-dir', dest='output_dir', action='store', required=True,
+                        help='Directory the transformed csv files are written to.')
+    parser.add_argument('--chunk-rows', dest='chunk_rows', action='store',
+                        default=consts.DEFAULT_APPLY_CHUNK_ROWS, type=cdr_parser.positive_int,
+                        help=('Number of rows read and transformed at a time.  '
+                              'Defaults to {}.').format(consts.DEFAULT_APPLY_CHUNK_ROWS))
+    parser.add_argument('--workers', dest='workers', action='store',
+                        default=1, type=cdr_parser.positive_int,
+                        help=('Number of processes transforming chunks.  Defaults '
+                              'to 1, transforming in this process.'))
+    parser.add_argument('-l', '--log-path', dest='log_path', action='store',
+                        default=consts.DEFAULT_APPLY_LOG,
+                        help='Path to the log file.  Defaults to {}.'.format(
+                            consts.DEFAULT_APPLY_LOG))
+    parser.add_argument('-c', '--console-log', dest='console_log', action='store_true',
+                        help='Log to the console as well as the log file.')
+    return parser.parse_args(raw_args)
+
+
+def main(raw_args=None):
+    """
+    Apply a dictionary file to the csv files named on the command line.
+
+    :return:  a list of TableReports
+    """
+    args = _parse_command_line(raw_args)
+    yaml_logging.setup_logging(args)
+
+    dictionary = query.load(args.dictionary_file)
+    start = time.time()
+    reports = apply_directory(dictionary, args.input_dir, args.output_dir,
+                              args.chunk_rows, args.workers)
+    seconds = time.time() - start
+    rows = sum(report.rows for report in reports)
+    LOGGER.info("Done.  Applied %s to %d rows of %d tables in %.2f seconds, %.0f rows/s, "
+                "with %d workers.", args.dictionary_file, rows, len(reports), seconds,
+                rows / seconds if seconds else 0.0, args.workers)
+    return reports
+
+
+if __name__ == '__main__':
+    main()
@@ -68,6 +68,56 @@ def log_filepath(filepath):
     raise ArgumentTypeError("Log file names must end with '.log'")
 
 
+def positive_int(value):
+    """
+    Verify a value is a positive integer.
+
+    :param value:  string value read from the command line
+
+    :return:  integer value
+
+    :raises ArgumentTypeError:  raised if value is not an integer greater than zero
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise ArgumentTypeError("{} is not an integer".format(value))
+
+    if number < 1:
+        raise ArgumentTypeError("{} must be greater than zero".format(value))
+
+    return number
+
+
+def column_spec(value):
+    """
+    Read a column projection specification.
+
+    Specifications are a comma separated list of field names, optionally
+    preceded by a tab name and '='.  Field names are normalized the way
+    column names are.  For example, 'relevant_omop_table,Concept ID' or
+    'Concept (Row) Suppressions=concept_id,concept_name'.
+
+    :param value:  string value read from the command line
+
+    :return:  a tuple of the tab name, or None for every tab, and the list of
+        normalized field names.
+
+    :raises ArgumentTypeError:  raised if no field names are given
+    """
+    tab_name = None
+    if '=' in value:
+        tab_name, value = value.split('=', 1)
+        tab_name = tab_name.strip()
+
+    fields = [field.strip().lower().replace(' ', '_') for field in value.split(',')]
+    fields = [field for field in fields if field]
+    if not fields:
+        raise ArgumentTypeError("{} does not name any fields".format(value))
+
+    return (tab_name, fields)
+
+
 def parse_command_line(raw_args=None):
     """
     Parse the command line arguments.
@@ -111,11 +161,39 @@ def parse_command_line(raw_args=None):
                               'title default to Column D.  Tabs with neither in '
                               'the title default to Column A.  Valid choices are letters A-Z.')
                        )
+    parser.add_argument('--columns', dest='columns', action='append',
+                        default=None, type=column_spec,
+                        help=('Only read, write, and validate these fields.  A '
+                              'comma separated list of field names, optionally '
+                              'preceded by a tab name and \'=\' to apply to a '
+                              'single tab.  May be repeated.  The group by '
+                              'column is always kept.')
+                       )
+    parser.add_argument('--aggregate', dest='aggregate', action='store_true',
+                        help=('Write a single item for each unique value of the '
+                              'group by column.  The other fields of the item '
+                              'list the unique values of every row in the group.'))
     parser.add_argument('-d', '--schema-file', dest='schema_file', action='store',
                         default='cdr_data_dictionary/schema.yaml',
                         help=('Path to the schema yaml file.  If not provided, '
                               'defaults to \'cdr_data_dictionary/schema.yaml\'.')
                        )
+    parser.add_argument('--max-errors', dest='max_errors', action='store',
+                        default=None, type=positive_int,
+                        help=('Stop validating after this many schema errors '
+                              'are found.  If not provided, every error is '
+                              'reported.')
+                       )
+    parser.add_argument('--cross-check', dest='cross_check', action='store_true',
+                        help=('Also validate the written file with yamale, '
+                              'after validating it with the compiled schema.'))
+    parser.add_argument('--generalization-map', dest='generalization_map', action='store_true',
+                        help=('Also write the final output of every chained '
+                              'concept generalization to a json lookup file '
+                              'next to the yaml file.'))
+    parser.add_argument('--binary-snapshot', dest='binary_snapshot', action='store_true',
+                        help=('Also write a binary snapshot of the yaml file next '
+                              'to it.  Snapshots load much faster than yaml.'))
     parser.add_argument('-l', '--log-path', dest='log_path', action='store',
                         default=consts.DEFAULT_LOG, type=log_filepath,
                         help=('Specify the log file path and/or name.  File name '
@@ -127,6 +205,80 @@ def parse_command_line(raw_args=None):
     parser.add_argument('--cdr-version', dest='cdr_version', action='store',
                         required=True,
                         help='CDR version number.  Used as part of output file name.')
+    parser.add_argument('--batch-fetch', dest='batch_fetch', action='store_true',
+                        help=('Read all tabs with a single batch request per '
+                              'render option, instead of one request per tab.'))
+    parser.add_argument('--batch-size', dest='batch_size', action='store',
+                        default=None, type=positive_int,
+                        help=('Maximum number of tabs or ranges to read in a '
+                              'single batch request.  Used with --batch-fetch.  '
+                              'If not provided, all ranges are read in one '
+                              'request.')
+                       )
+    parser.add_argument('--hyperlink-fetch', dest='hyperlink_fetch', action='store_true',
+                        help=('Read cell values and hyperlink targets together '
+                              'with a single spreadsheets request, instead of '
+                              'reading values and formulas separately.'))
+    parser.add_argument('--fetch-workers', dest='fetch_workers', action='store',
+                        default=1, type=positive_int,
+                        help=('Number of tabs to read concurrently when not '
+                              'using --batch-fetch.  Defaults to 1, reading '
+                              'tabs one at a time.')
+                       )
+    parser.add_argument('--chunk-rows', dest='chunk_rows', action='store',
+                        default=None, type=positive_int,
+                        help=('Read tabs with more rows than this as separate '
+                              'row ranges, which are read concurrently with '
+                              '--fetch-workers and retried on their own if '
+                              'they fail.  Used when not using --batch-fetch.  '
+                              'If not provided, tabs are read whole.')
+                       )
+    parser.add_argument('--workers', dest='workers', action='store',
+                        default=1, type=positive_int,
+                        help=('Number of processes processing and formatting '
+                              'tabs.  Tabs with more than {} rows are split '
+                              'into chunks of rows.  Not used with '
+                              '--incremental.  Defaults to 1, processing tabs '
+                              'one at a time.'.format(consts.DEFAULT_WORKER_CHUNK_ROWS))
+                       )
+    parser.add_argument('--pipeline-depth', dest='pipeline_depth', action='store',
+                        default=None, type=positive_int,
+                        help=('Read, process, format, and write tabs '
+                              'concurrently, holding at most this many tabs '
+                              'between each step.  Tabs are still written in '
+                              'order.  Not used with --incremental.  If not '
+                              'provided, every tab is read before the file is '
+                              'written.')
+                       )
+    parser.add_argument('--cache-dir', dest='cache_dir', action='store',
+                        default=consts.DEFAULT_CACHE_DIR,
+                        help=('Directory of cached spreadsheet snapshots.  '
+                              'Defaults to {}'.format(consts.DEFAULT_CACHE_DIR))
+                       )
+    parser.add_argument('--cache-size', dest='cache_size', action='store',
+                        default=consts.DEFAULT_CACHE_SIZE_MB, type=positive_int,
+                        help=('Maximum size of the snapshot cache in megabytes.  '
+                              'Least recently used snapshots are removed first.  '
+                              'Defaults to {}'.format(consts.DEFAULT_CACHE_SIZE_MB))
+                       )
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false',
+                        help=('Always read the spreadsheet and do not store a '
+                              'snapshot of the values read.'))
+    parser.add_argument('--refresh', dest='refresh', action='store_true',
+                        help=('Read the spreadsheet even if a snapshot of the '
+                              'current version is cached.  Replaces the cached '
+                              'snapshot.'))
+    parser.add_argument('--incremental', dest='incremental', action='store_true',
+                        help=('Only regenerate the sections of tabs that changed '
+                              'since the file described by the manifest was '
+                              'generated.  Unchanged sections are copied from '
+                              'the previous file.'))
+    parser.add_argument('--manifest-file', dest='manifest_file', action='store',
+                        default=consts.DEFAULT_MANIFEST,
+                        help=('Path to the manifest describing the previously '
+                              'generated file.  Used with --incremental.  '
+                              'Defaults to {}'.format(consts.DEFAULT_MANIFEST))
+                       )
     args = parser.parse_args(raw_args)
 
     filename = output_filename(args.cdr_version)
@@ -0,0 +1,200 @@
+"""
+Module classifying many concept ids at once.
+
+The suppressed concepts and the generalized input concepts of a dictionary
+are kept in sorted int64 arrays.  A whole array of concept ids is classified
+as suppressed, generalized, or untouched with a few vectorized searches,
+instead of one dictionary lookup per id.
+
+Most ids of an extract are untouched.  A table indexed by the low bits of an
+id rejects most of them before the sorted arrays are searched.
+"""
+# Python imports
+import logging
+import time
+
+# Third party imports
+import numpy as np
+
+# Project imports
+from cdr_data_dictionary import query
+
+LOGGER = logging.getLogger(__name__)
+
+# The status of a classified concept id
+UNTOUCHED = 0
+SUPPRESSED = 1
+GENERALIZED = 2
+STATUS_NAMES = ['untouched', 'suppressed', 'generalized']
+
+# The output of a concept id that is not generalized
+NO_CONCEPT = -1
+
+# Scoped keys hold the scope concept id in the high 32 bits
+SCOPE_SHIFT = 32
+MAX_SCOPED_ID = 2 ** SCOPE_SHIFT - 1
+
+# The number of low bits of a key indexing its filter table
+FILTER_BITS = 20
+FILTER_MASK = 2 ** FILTER_BITS - 1
+
+
+def _sorted_pairs(keys, values):
+    """ Sort parallel lists of keys and values as int64 arrays, by key. """
+    keys = np.asarray(keys, dtype=np.int64)
+    values = np.asarray(values, dtype=np.int64)
+    order = np.argsort(keys, kind='mergesort')
+    return keys[order], values[order]
+
+
+def _key_filter(sorted_keys):
+    """ Create a table, True at the low bits of each key. """
+    key_filter = np.zeros(FILTER_MASK + 1, dtype=bool)
+    key_filter[sorted_keys & FILTER_MASK] = True
+    return key_filter
+
+
+def _find(sorted_keys, key_filter, keys):
+    """
+    Find keys in a sorted array.
+
+    Only the keys passing the filter of the sorted keys are searched.
+
+    :return:  a tuple of the indexes of the keys found, and their positions
+        in sorted_keys
+    """
+    candidates = np.flatnonzero(key_filter[keys & FILTER_MASK])
+    candidate_keys = keys[candidates]
+    positions = np.searchsorted(sorted_keys, candidate_keys)
+    np.minimum(positions, len(sorted_keys) - 1, out=positions)
+    found = sorted_keys[positions] == candidate_keys
+    return candidates[found], positions[found]
+
+
+def _scoped_keys(scope_ids, input_ids):
+    """
+    Combine scope and input concept ids into single int64 keys.
+
+    :raises ValueError:  if an id is negative or does not fit in 32 bits
+    """
+    for ids in (scope_ids, input_ids):
+        if len(ids) and (ids.min() < 0 or ids.max() > MAX_SCOPED_ID):
+            raise ValueError('Scoped concept ids must be between 0 and {}.'.format(MAX_SCOPED_ID))
+    return (scope_ids << SCOPE_SHIFT) | input_ids
+
+
+class ConceptClassifier(object):
+    """
+    Classifies arrays of concept ids against a dictionary.
+
+    Suppression takes precedence over generalization.  The suppressed and
+    generalized ids are merged into a single sorted array, with the status
+    and output of each, so unscoped ids are classified with one search.
+
+    :param suppressed_ids:  the suppressed concept ids
+    :param generalizations:  a list of (input concept id, output concept id)
+        tuples.  The first output of an input is used.
+    :param scoped_generalizations:  a list of ((scope concept id, input
+        concept id), output concept id) tuples, used when the concepts the
+        ids are recorded for are given.
+    """
+
+    def __init__(self, suppressed_ids, generalizations, scoped_generalizations=()):
+        self.suppressed = np.unique(np.asarray(list(suppressed_ids), dtype=np.int64))
+        self.inputs, self.outputs = self._first_outputs(generalizations)
+
+        generalized = ~np.isin(self.inputs, self.suppressed)
+        keys = np.concatenate([self.suppressed, self.inputs[generalized]])
+        order = np.argsort(keys, kind='mergesort')
+        self.keys = keys[order]
+        self.key_outputs = np.concatenate([
+            np.full(len(self.suppressed), NO_CONCEPT, dtype=np.int64),
+            self.outputs[generalized]])[order]
+        self.key_status = np.concatenate([
+            np.full(len(self.suppressed), SUPPRESSED, dtype=np.int8),
+            np.full(generalized.sum(), GENERALIZED, dtype=np.int8)])[order]
+        self.key_filter = _key_filter(self.keys)
+        self.suppressed_filter = _key_filter(self.suppressed)
+
+        scopes = [scope for (scope, _), _ in scoped_generalizations]
+        inputs = [input_id for (_, input_id), _ in scoped_generalizations]
+        keys = _scoped_keys(np.asarray(scopes, dtype=np.int64), np.asarray(inputs, dtype=np.int64))
+        self.scoped_inputs, self.scoped_outputs = self._first_outputs(
+            zip(keys.tolist(), [output_id for _, output_id in scoped_generalizations]))
+        self.scoped_filter = _key_filter(self.scoped_inputs)
+
+    @staticmethod
+    def _first_outputs(generalizations):
+        """ Sort the first output of each input, as int64 arrays. """
+        outputs = {}
+        for input_id, output_id in generalizations:
+            outputs.setdefault(input_id, output_id)
+        return _sorted_pairs(list(outputs), list(outputs.values()))
+
+    @classmethod
+    def from_dictionary(cls, dictionary):
+        """
+        Create a classifier of the concepts of a loaded dictionary.
+
+        :param dictionary:  a query.DataDictionary
+        """
+        start = time.time()
+        classifier = cls(
+            dictionary.suppressed_concepts,
+            [(input_id, outputs[0]) for input_id, outputs in dictionary.generalized_outputs.items()],
+            [(key, outputs[0]) for key, outputs in dictionary.scoped_outputs.items()])
+        LOGGER.debug("Built concept arrays in %.3f seconds", time.time() - start)
+        return classifier
+
+    @classmethod
+    def load(cls, dict_path):
+        """
+        Create a classifier of the concepts of a dictionary file.
+
+        :param dict_path:  the path to a generated dictionary file
+        """
+        return cls.from_dictionary(query.load(dict_path))
+
+    def classify(self, concept_ids, scope_ids=None):
+        """
+        Classify an array of concept ids.
+
+        :param concept_ids:  a one dimensional array like of integer concept ids
+        :param scope_ids:  if given, a parallel array like of the concepts
+            the ids are recorded for, such as the questions of answers.  Only
+            the generalizations of those concepts are used.
+
+        :return:  a tuple of parallel arrays.  An int8 array of the status of
+            each id, one of UNTOUCHED, SUPPRESSED, or GENERALIZED, and an
+            int64 array of the generalized output of each id, or NO_CONCEPT.
+        """
+        ids = np.asarray(concept_ids, dtype=np.int64)
+        status = np.full(ids.shape, UNTOUCHED, dtype=np.int8)
+        outputs = np.full(ids.shape, NO_CONCEPT, dtype=np.int64)
+
+        if scope_ids is None:
+            found, positions = _find(self.keys, self.key_filter, ids)
+            status[found] = self.key_status[positions]
+            outputs[found] = self.key_outputs[positions]
+            return status, outputs
+
+        keys = _scoped_keys(np.asarray(scope_ids, dtype=np.int64), ids)
+        found, positions = _find(self.scoped_inputs, self.scoped_filter, keys)
+        status[found] = GENERALIZED
+        outputs[found] = self.scoped_outputs[positions]
+
+        found, _ = _find(self.suppressed, self.suppressed_filter, ids)
+        status[found] = SUPPRESSED
+        outputs[found] = NO_CONCEPT
+        return status, outputs
+
+    def counts(self, status):
+        """
+        Count the ids of each status.
+
+        :param status:  a status array returned by classify
+
+        :return:  a dictionary of status names to counts
+        """
+        totals = np.bincount(status, minlength=len(STATUS_NAMES))
+        return dict(zip(STATUS_NAMES, totals.tolist()))
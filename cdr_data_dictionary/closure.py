@@ -0,0 +1,194 @@
+"""
+Module flattening chained concept generalizations.
+
+The generalized output concept of one concept_generalizations rule can be
+the input concept of another.  The final output of every input concept is
+computed once, following each chain to its end, so a generalized value is
+found with a single lookup.
+
+Chains that return to one of their own concepts are cycles.  They are
+reported, and their concepts are left out of the final outputs.  A rule
+generalizing a concept to itself ends a chain and is not a cycle.
+
+The final outputs are written to a lookup file next to the yaml file, with
+the hash of the yaml file they were computed from.
+"""
+# Python imports
+import json
+import logging
+import os
+import time
+
+# Third party imports
+from future.utils import viewitems
+
+# Project imports
+from cdr_data_dictionary import incremental
+from cdr_data_dictionary import query
+
+LOGGER = logging.getLogger(__name__)
+
+# Increment when the lookup file format changes
+CLOSURE_FORMAT = 1
+CLOSURE_SUFFIX = '_generalizations.json'
+
+
+def final_outputs(outputs):
+    """
+    Follow the chains of a mapping of inputs to outputs.
+
+    :param outputs:  a dictionary of input keys to output keys
+
+    :return:  a tuple of a dictionary of input keys to the key ending their
+        chain, and a list of cycles.  Each cycle is a list of the keys of the
+        cycle, in chain order.  Keys of cycles, and keys leading to cycles,
+        have no final output.
+    """
+    finals = {}
+    cycles = []
+    for start in outputs:
+        if start in finals:
+            continue
+
+        path = []
+        on_path = {}
+        key = start
+        while key in outputs and outputs[key] != key and key not in finals:
+            if key in on_path:
+                break
+            on_path[key] = len(path)
+            path.append(key)
+            key = outputs[key]
+
+        if key in on_path:
+            cycle = path[on_path[key]:]
+            cycles.append(cycle)
+            final = None
+        else:
+            final = finals[key] if key in finals else key
+
+        for member in path or [start]:
+            finals[member] = final
+
+    return dict((key, final) for key, final in viewitems(finals) if final is not None), cycles
+
+
+class GeneralizationClosure(object):
+    """
+    The final generalized output of every input concept of a dictionary.
+
+    Unscoped chains follow the first output of each input.  Scoped chains
+    stay within the concept, such as a question, the inputs are recorded
+    for.
+
+    :param dictionary:  a query.DataDictionary
+    """
+
+    def __init__(self, dictionary):
+        start = time.time()
+        first_outputs = dict((input_id, output_ids[0]) for input_id, output_ids
+                             in viewitems(dictionary.generalized_outputs))
+        self.outputs, self.cycles = final_outputs(first_outputs)
+
+        self.scoped_outputs = {}
+        self.scoped_cycles = []
+        scopes = {}
+        for (scope, input_id), output_ids in viewitems(dictionary.scoped_outputs):
+            scopes.setdefault(scope, {})[input_id] = output_ids[0]
+        for scope, scope_outputs in sorted(viewitems(scopes)):
+            finals, cycles = final_outputs(scope_outputs)
+            for input_id, output_id in viewitems(finals):
+                self.scoped_outputs[(scope, input_id)] = output_id
+            self.scoped_cycles.extend((scope, cycle) for cycle in cycles)
+
+        for cycle in self.cycles:
+            LOGGER.warning("Concept generalizations form a cycle: %s",
+                           ' -> '.join(str(concept_id) for concept_id in cycle + cycle[:1]))
+        for scope, cycle in self.scoped_cycles:
+            LOGGER.warning("Concept generalizations of concept %s form a cycle: %s", scope,
+                           ' -> '.join(str(concept_id) for concept_id in cycle + cycle[:1]))
+        LOGGER.debug("Flattened generalizations in %.3f seconds", time.time() - start)
+
+    def final_output(self, input_concept_id, concept_id=None, default=None):
+        """
+        Get the concept an input concept is finally generalized to.
+
+        :param input_concept_id:  the concept id of a value
+        :param concept_id:  if given, the concept the value is recorded for.
+            Only its generalizations are used.
+        :param default:  returned if the concept is not generalized
+        """
+        if concept_id is None:
+            return self.outputs.get(input_concept_id, default)
+        return self.scoped_outputs.get((concept_id, input_concept_id), default)
+
+
+def closure_path(dict_path):
+    """ The path of the lookup file of a dictionary file. """
+    return os.path.splitext(dict_path)[0] + CLOSURE_SUFFIX
+
+
+def write_closure(dict_path, output_path=None, document=None):
+    """
+    Write the final generalized outputs of a dictionary file.
+
+    The lookup file is compact json.  Outputs are lists of [input, output]
+    pairs and scoped outputs are lists of [concept, input, output] triples,
+    so concept ids stay integers.
+
+    :param dict_path:  the path to a generated dictionary file
+    :param output_path:  the path of the lookup file.  Defaults to the path
+        of the dictionary file, ending in CLOSURE_SUFFIX.
+    :param document:  the already loaded yaml document of the dictionary
+        file.  If None, the file is loaded.
+
+    :return:  the GeneralizationClosure written
+    """
+    output_path = output_path or closure_path(dict_path)
+    if document is None:
+        document = query.load_document(dict_path)
+    result = GeneralizationClosure(query.DataDictionary(document))
+    contents = {
+        'format': CLOSURE_FORMAT,
+        'yaml_file': os.path.basename(dict_path),
+        'yaml_hash': incremental.file_hash(dict_path),
+        'outputs': sorted([input_id, output_id]
+                          for input_id, output_id in viewitems(result.outputs)),
+        'scoped_outputs': sorted([scope, input_id, output_id] for (scope, input_id), output_id
+                                 in viewitems(result.scoped_outputs)),
+        'cycles': result.cycles,
+        'scoped_cycles': [[scope, cycle] for scope, cycle in result.scoped_cycles],
+    }
+    with open(output_path, 'w') as closure_file:
+        json.dump(contents, closure_file, separators=(',', ':'))
+    LOGGER.info("Wrote %d final generalized outputs and %d cycles to: %s",
+                len(result.outputs) + len(result.scoped_outputs),
+                len(result.cycles) + len(result.scoped_cycles), output_path)
+    return result
+
+
+def load_closure(closure_file_path, dict_path=None):
+    """
+    Load a lookup file of final generalized outputs.
+
+    :param closure_file_path:  the path to a lookup file
+    :param dict_path:  if given, the dictionary file the lookup file should
+        have been computed from
+
+    :return:  a tuple of dictionaries of input concept ids, and of
+        (concept id, input concept id) tuples, to final output concept ids
+
+    :raises ValueError:  if the file format is unknown, or the dictionary
+        file changed since the lookup file was written
+    """
+    with open(closure_file_path, 'r') as closure_file:
+        contents = json.load(closure_file)
+    if contents.get('format') != CLOSURE_FORMAT:
+        raise ValueError('Unknown generalization lookup format in {}.'.format(closure_file_path))
+    if dict_path is not None and contents.get('yaml_hash') != incremental.file_hash(dict_path):
+        raise ValueError('{} was not computed from the current contents of {}.'.format(
+            closure_file_path, dict_path))
+    outputs = dict((input_id, output_id) for input_id, output_id in contents['outputs'])
+    scoped_outputs = dict(((scope, input_id), output_id)
+                          for scope, input_id, output_id in contents['scoped_outputs'])
+    return outputs, scoped_outputs
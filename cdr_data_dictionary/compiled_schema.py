@@ -0,0 +1,866 @@
+"""
+Module compiling the schema definition file into specialized check functions.
+
+Each validator expression of the schema, such as
+any(list(int()), int(), null()), is parsed once into a rule.  A rule holds a
+function accepting or rejecting a value, and a generator explaining why a
+value is rejected.  Rules follow the yamale semantics of the same
+expressions, including the custom url() validator, so a file accepted by the
+compiled schema is accepted by yamale.
+
+Items can be checked as their yaml text is written, without loading the
+whole file again.  The distinct values of each field are loaded once.
+"""
+# Python imports
+import ast
+from datetime import date, datetime
+import io
+import logging
+import re
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+# Third party imports
+from concurrent.futures import ProcessPoolExecutor
+from future.utils import string_types, viewitems
+import yaml
+
+# Project imports
+from cdr_data_dictionary import constants as consts
+from cdr_data_dictionary import value_cache
+
+LOGGER = logging.getLogger(__name__)
+
+# The libyaml loader is used when it is available
+SAFE_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+TRANSFORMATIONS = 'transformations'
+INCLUDE_PATTERN = re.compile(r"include\('(?P<name>[^']+)'\)")
+URL_PATTERN = re.compile(consts.URL_REGEX)
+# Plain scalars read as integers by the yaml int resolver, without a sign.
+# Only ascii digits, unlike str.isdigit.
+DECIMAL_PATTERN = re.compile(r'(?:0|[1-9][0-9]*)\Z')
+
+# Shards of a dictionary file, validated separately
+DOCUMENT_SHARD = 'document'
+HEAD_SHARD = 'head'
+SECTION_SHARD = 'section'
+LINE_BREAK_PATTERN = re.compile(r'\r\n|\r|\n')
+TRANSFORMATIONS_LINE_PATTERN = re.compile(r'^' + TRANSFORMATIONS + r':[ \t]*(?=\r|\n)', re.M)
+DOCUMENT_START_PATTERN = re.compile(r'^---', re.M)
+# The line starting a section of the transformations
+SECTION_START_PATTERN = re.compile(r'(?:\r\n|\r|\n)(?=  -[ \t]*(?:\r\n|\r|\n))')
+
+
+class SchemaValidationError(ValueError):
+    """
+    Raised when values do not match the schema.
+
+    :param errors:  the list of SchemaError found
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super(SchemaValidationError, self).__init__(
+            '{} schema errors:\n{}'.format(len(errors), '\n'.join(str(error) for error in errors)))
+
+
+class SchemaError(object):
+    """
+    A single value that does not match the schema.
+
+    :param path:  the keys and indexes leading to the value
+    :param message:  the description of the error
+    :param rows:  if True, items of the transformations are spreadsheet rows.
+        The header row is row 1, so the first item is row 2.
+    """
+    __slots__ = ('section', 'item', 'row', 'field', 'message')
+
+    def __init__(self, path, message, rows=True):
+        path = list(path)
+        if len(path) >= 3 and path[0] == TRANSFORMATIONS:
+            self.section = path[2]
+            self.item = self.row = None
+            if len(path) >= 4:
+                self.item = path[3] + 1
+                self.row = self.item + 1 if rows else None
+            path = path[4:]
+        else:
+            self.section = path.pop(0) if path else None
+            self.item = self.row = None
+        self.field = '.'.join(str(key) for key in path if not isinstance(key, int))
+        self.message = message
+
+    def __str__(self):
+        location = [self.section or 'document']
+        if self.row is not None:
+            location.append('row {}'.format(self.row))
+        elif self.item is not None:
+            location.append('item {}'.format(self.item))
+        if self.field:
+            return '{}: {}: {}'.format(' '.join(location), self.field, self.message)
+        return '{}: {}'.format(' '.join(location), self.message)
+
+    def __repr__(self):
+        return 'SchemaError({!r})'.format(str(self))
+
+
+class ErrorCollector(object):
+    """
+    Collects schema errors, up to a maximum number.
+
+    :param max_errors:  the number of errors collected before checking stops.
+        None collects every error.
+    """
+
+    def __init__(self, max_errors=None):
+        self.max_errors = max_errors
+        self.errors = []
+
+    @property
+    def full(self):
+        """ True if no more errors are collected. """
+        return self.max_errors is not None and len(self.errors) >= self.max_errors
+
+    def collect(self, path, messages, rows=True):
+        """
+        Collect the errors explaining a rejected value.
+
+        :param path:  the keys and indexes leading to the value
+        :param messages:  an iterable of (relative path, message) tuples
+        :param rows:  if True, items of the transformations are spreadsheet rows.
+        """
+        for sub_path, message in messages:
+            if self.full:
+                return
+            self.errors.append(SchemaError(tuple(path) + tuple(sub_path), message, rows))
+
+    def raise_errors(self):
+        """ Raise a SchemaValidationError if any errors were collected. """
+        if self.errors:
+            raise SchemaValidationError(self.errors)
+
+
+class Rule(object):
+    """
+    A compiled validator expression.
+
+    :param expression:  the text of the expression
+    :param accepts:  function returning True if a value matches the expression
+    :param explain:  function taking a rejected value and yielding
+        (relative path, message) tuples explaining the rejection.  If None,
+        the rejection is explained with the expression.
+    :param required:  False if the field may be missing
+    :param fields:  the (field name, Rule) tuples of a map rule
+    :param include:  the name of the type of an include rule
+    """
+    __slots__ = ('expression', 'accepts', 'required', '_explain', 'fields', 'include')
+
+    def __init__(self, expression, accepts, explain=None, required=True, fields=None,
+                 include=None):
+        self.expression = expression
+        self.accepts = accepts
+        self.required = required
+        self._explain = explain
+        self.fields = fields
+        self.include = include
+
+    def explain(self, value):
+        """
+        Explain why a value is rejected.
+
+        :param value:  a value rejected by accepts
+
+        :return:  yields (relative path, message) tuples
+        """
+        if self._explain is not None:
+            return self._explain(value)
+        return iter([((), "'{}' is not a {}.".format(value, self.expression))])
+
+
+def _is_list(value):
+    """ True if the value is a yaml sequence. """
+    return isinstance(value, (list, tuple))
+
+
+def _is_url(value):
+    """ The custom URL validator of the schema. """
+    try:
+        return URL_PATTERN.match(value) is not None
+    except TypeError:
+        return False
+
+
+def _is_int(value):
+    """ yamale accepts booleans as integers. """
+    return isinstance(value, int)
+
+
+TYPE_TESTS = {
+    'str': lambda value: isinstance(value, string_types),
+    'int': _is_int,
+    'num': lambda value: isinstance(value, (int, float)),
+    'bool': lambda value: isinstance(value, bool),
+    'null': lambda value: value is None,
+    'day': lambda value: isinstance(value, date),
+    'timestamp': lambda value: isinstance(value, datetime),
+    'url': _is_url,
+}
+
+# The converters of min and max constraints, by validator
+CONSTRAINT_TYPES = {
+    'int': int,
+    'num': float,
+    'day': lambda text: datetime.strptime(text, '%Y-%m-%d').date(),
+    'timestamp': lambda text: datetime.strptime(text, '%Y-%m-%d %H:%M:%S'),
+}
+
+# Validators whose min and max constraints limit the length of the value
+LENGTH_CONSTRAINTS = frozenset(['str', 'list'])
+
+
+def _constrained(test, name, kwargs):
+    """
+    Add the min and max constraints of an expression to its type test.
+
+    Constraints are only tested for values passing the type test.
+    """
+    bounds = [kwargs.get(key) for key in ('min', 'max')]
+    if bounds == [None, None]:
+        return test
+
+    if name in LENGTH_CONSTRAINTS:
+        measure = len
+        bounds = [int(bound) if bound is not None else None for bound in bounds]
+    elif name in CONSTRAINT_TYPES:
+        measure = lambda value: value
+        convert = CONSTRAINT_TYPES[name]
+        bounds = [bound if bound is None or not isinstance(bound, string_types)
+                  else convert(bound) for bound in bounds]
+    else:
+        return test
+
+    low, high = bounds
+
+    def constrained(value):
+        """ Test the type, then the constraints. """
+        if not test(value):
+            return False
+        try:
+            measured = measure(value)
+            return ((low is None or low <= measured) and
+                    (high is None or measured <= high))
+        except TypeError:
+            return False
+
+    return constrained
+
+
+class CompiledSchema(object):
+    """
+    A schema definition file compiled into rules.
+
+    :param schema_path:  the path to the schema definition file.  The first
+        yaml document defines the file.  The optional second document defines
+        the include types.
+    """
+
+    def __init__(self, schema_path):
+        with io.open(schema_path, encoding='utf-8') as schema_file:
+            documents = list(yaml.load_all(schema_file, Loader=SAFE_LOADER))
+
+        self.schema_path = schema_path
+        self.includes = {}
+        definitions = documents[1] if len(documents) > 1 and documents[1] else {}
+        for name, body in viewitems(definitions):
+            self.includes[name] = self.compile_map(body, name)
+
+        self.root = self.compile_map(documents[0], 'root')
+        self.sections = self._section_items(definitions)
+
+    def _section_items(self, definitions):
+        """
+        Find the item rule of each transformations section.
+
+        A section is a single field whose expression includes a single item
+        type, such as concept_suppressions: list(include('concept_sup_item')).
+
+        :return:  a dictionary of section names to item rules
+        """
+        sections = {}
+        for body in definitions.values():
+            if not isinstance(body, Mapping) or len(body) != 1:
+                continue
+            for field, expression in viewitems(body):
+                names = set(INCLUDE_PATTERN.findall(str(expression)))
+                if len(names) == 1:
+                    sections[field] = self.includes[names.pop()]
+        return sections
+
+    def compile_map(self, body, name):
+        """
+        Compile a map of field names to expressions.
+
+        Fields are not required to be defined by the map, as with yamale's
+        default, non strict validation.
+
+        :param body:  a dictionary of field names to expressions or maps
+        :param name:  the name of the map, used in messages
+
+        :return:  a Rule
+        """
+        fields = []
+        for field, expression in viewitems(body):
+            if isinstance(expression, Mapping):
+                rule = self.compile_map(expression, field)
+            else:
+                rule = self.compile(expression)
+            fields.append((field, rule))
+
+        checks = [(field, rule.accepts, rule.required) for field, rule in fields]
+
+        def accepts(value):
+            """ Accept a map with valid values for every field. """
+            if not isinstance(value, Mapping):
+                return False
+            for field, accepts_field, required in checks:
+                if field in value:
+                    if not accepts_field(value[field]):
+                        return False
+                elif required:
+                    return False
+            return True
+
+        def explain(value):
+            """ Explain each invalid or missing field. """
+            if not isinstance(value, Mapping):
+                yield ((), "'{}' is not a map of {}.".format(value, name))
+                return
+            for field, rule in fields:
+                if field not in value:
+                    if rule.required:
+                        yield ((field,), 'Required field missing')
+                elif not rule.accepts(value[field]):
+                    for sub_path, message in rule.explain(value[field]):
+                        yield ((field,) + tuple(sub_path), message)
+
+        return Rule(name, accepts, explain, fields=fields)
+
+    def compile(self, expression):
+        """
+        Compile a validator expression.
+
+        :param expression:  the text of the expression, such as
+            any(list(str()), str(), null())
+
+        :return:  a Rule
+        :raises SyntaxError:  if the expression is not a known validator
+        """
+        try:
+            node = ast.parse(expression.strip(), mode='eval').body
+        except SyntaxError:
+            raise SyntaxError('Invalid schema expression: {}'.format(expression))
+        return self._compile_node(node, expression.strip())
+
+    def _compile_node(self, node, expression):
+        """ Compile a parsed validator call. """
+        if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Name):
+            raise SyntaxError('Invalid schema expression: {}'.format(expression))
+
+        name = node.func.id
+        kwargs = dict((keyword.arg, ast.literal_eval(keyword.value))
+                      for keyword in node.keywords)
+        required = bool(kwargs.pop('required', True))
+        can_be_none = bool(kwargs.pop('none', True))
+        rules = [self._compile_node(arg, _source(arg, expression))
+                 for arg in node.args if isinstance(arg, ast.Call)]
+        literals = [ast.literal_eval(arg) for arg in node.args if not isinstance(arg, ast.Call)]
+
+        explain = None
+        include = None
+        if name in TYPE_TESTS:
+            test = _constrained(TYPE_TESTS[name], name, kwargs)
+        elif name == 'enum':
+            test = literals.__contains__
+        elif name == 'regex':
+            patterns = [re.compile(pattern) for pattern in literals]
+            test = lambda value: (isinstance(value, string_types) and
+                                  any(pattern.match(value) for pattern in patterns))
+        elif name == 'any':
+            test, explain = self._compile_any(rules)
+        elif name == 'list':
+            test, explain = self._compile_list(rules)
+            test = _constrained(test, name, kwargs)
+        elif name == 'map':
+            test = self._compile_values(rules)
+        elif name == 'include':
+            include = literals[0]
+            test, explain = self._compile_include(include)
+        else:
+            raise SyntaxError('Unknown validator {} in: {}'.format(name, expression))
+
+        if not required and can_be_none:
+            # an optional field with no value is always valid
+            type_test = test
+            test = lambda value: value is None or type_test(value)
+
+        return Rule(expression, test, explain, required, include=include)
+
+    def _compile_any(self, rules):
+        """ Compile the test and explanation of any(...) """
+        if not rules:
+            return (lambda value: True), None
+
+        tests = tuple(rule.accepts for rule in rules)
+
+        def accepts(value):
+            """ Accept a value matching any of the rules. """
+            for test in tests:
+                if test(value):
+                    return True
+            return False
+
+        return accepts, self._explain_candidates(rules)
+
+    def _compile_list(self, rules):
+        """ Compile the test and explanation of list(...) """
+        tests = tuple(rule.accepts for rule in rules)
+
+        def accepts(value):
+            """ Accept a list with elements matching any of the rules. """
+            if not _is_list(value):
+                return False
+            if not tests:
+                return True
+            for element in value:
+                for test in tests:
+                    if test(element):
+                        break
+                else:
+                    return False
+            return True
+
+        explain_element = self._explain_candidates(rules)
+
+        def explain(value):
+            """ Explain each invalid element. """
+            if not _is_list(value):
+                yield ((), "'{}' is not a list.".format(value))
+                return
+            for index, element in enumerate(value):
+                if tests and not any(test(element) for test in tests):
+                    for sub_path, message in explain_element(element):
+                        yield ((index,) + tuple(sub_path), message)
+
+        return accepts, explain
+
+    def _compile_values(self, rules):
+        """ Compile the test of map(...) """
+        tests = tuple(rule.accepts for rule in rules)
+
+        def accepts(value):
+            """ Accept a map with values matching any of the rules. """
+            if not isinstance(value, Mapping):
+                return False
+            return all(any(test(item) for test in tests) for item in value.values()) \
+                if tests else True
+
+        return accepts
+
+    def _compile_include(self, name):
+        """ Compile the test and explanation of include(...) """
+        includes = self.includes
+
+        def accepts(value):
+            """ Accept a value matching the included type. """
+            try:
+                return includes[name].accepts(value)
+            except KeyError:
+                raise SyntaxError("Include '{}' has not been defined.".format(name))
+
+        def explain(value):
+            """ Explain why the included type rejects a value. """
+            return includes[name].explain(value)
+
+        return accepts, explain
+
+    def _explain_candidates(self, rules):
+        """
+        Create a function explaining why a value matches none of several rules.
+
+        Included types sharing field names with the value, or the list rule
+        of a list value, are the likely intended types.  If there is a single
+        one, only it is explained.  Otherwise the value is described.
+        """
+        includes = self.includes
+
+        def shares_fields(rule, value):
+            """ True if the value has a field of the included type. """
+            fields = includes[rule.include].fields or []
+            return any(field in value for field, _ in fields)
+
+        def explain(value):
+            """ Explain the rejection by the likely intended rules. """
+            if len(rules) == 1:
+                return rules[0].explain(value)
+            if isinstance(value, Mapping):
+                candidates = [rule for rule in rules
+                              if rule.include in includes and shares_fields(rule, value)]
+                if len(candidates) == 1:
+                    return candidates[0].explain(value)
+            elif _is_list(value):
+                candidates = [rule for rule in rules if rule.expression.startswith('list(')]
+                if len(candidates) == 1:
+                    return candidates[0].explain(value)
+            return iter([((), "'{}' does not match any of: {}.".format(
+                value, ', '.join(rule.expression for rule in rules)))])
+
+        return explain
+
+    def section_checker(self, section, collector, rows=True):
+        """
+        Create a function checking the items of a section as they are written.
+
+        :param section:  the sequence title of the section
+        :param collector:  the ErrorCollector of the errors found
+        :param rows:  if True, the items are spreadsheet rows, starting with
+            row 2.  False for aggregated items.
+
+        :return:  a SectionChecker
+        """
+        return SectionChecker(self, section, collector, rows)
+
+    def check_meta_data(self, meta_text, collector):
+        """
+        Check the yaml text of the meta data.
+
+        :param meta_text:  the yaml text written for the meta data
+        :param collector:  the ErrorCollector of the errors found
+        """
+        self.check_fields(yaml.load(meta_text, Loader=SAFE_LOADER), collector)
+
+    def check_fields(self, document, collector):
+        """
+        Check the fields of a partial yaml document.  Missing fields are
+        not errors.
+
+        :param document:  the loaded partial document
+        :param collector:  the ErrorCollector of the errors found
+        """
+        for field, rule in self.root.fields:
+            if field in document and not rule.accepts(document[field]):
+                collector.collect((field,), rule.explain(document[field]))
+
+    def check_document(self, document, collector):
+        """
+        Check a loaded yaml document.
+
+        :param document:  the loaded document
+        :param collector:  the ErrorCollector of the errors found
+        """
+        if not self.root.accepts(document):
+            collector.collect((), self.root.explain(document))
+
+
+def _source(node, expression):
+    """ Get the text of a sub expression, for messages. """
+    try:
+        return ast.get_source_segment(expression, node) or expression
+    except AttributeError:
+        # python 2
+        return expression
+
+
+def load_scalar(text):
+    """
+    Load the value of a single line of yaml text, as a yaml loader would.
+
+    Quoted strings, integers, and booleans are read directly.  Other values,
+    such as lists and dates, are read by the yaml loader.
+
+    :param text:  the text following the key of a yaml line
+
+    :return:  the loaded value
+    """
+    if not text:
+        return None
+    if len(text) > 1 and text[0] == "'" and text[-1] == "'":
+        inner = text[1:-1]
+        if "'" not in inner.replace("''", ''):
+            return inner.replace("''", "'")
+    if DECIMAL_PATTERN.match(text):
+        return int(text)
+    if text == 'True':
+        return True
+    if text == 'False':
+        return False
+    return yaml.load(text, Loader=SAFE_LOADER)
+
+
+def _yaml_problem(exc):
+    """ Describe a yaml error on a single line. """
+    return 'Not valid yaml: ' + ' '.join(str(exc).split())
+
+
+class SectionChecker(object):
+    """
+    Checks the items of a section as they are written.
+
+    Items are given as the mapping of their fields to the yaml text of each
+    value, built while the item is formatted.  The distinct value texts of
+    each field are loaded once.
+
+    :param schema:  the CompiledSchema
+    :param section:  the sequence title of the section
+    :param collector:  the ErrorCollector of the errors found
+    :param rows:  if True, the items are spreadsheet rows.
+    """
+
+    def __init__(self, schema, section, collector, rows=True):
+        self.collector = collector
+        self.rows = rows
+        self.item = 0
+        self.path = (TRANSFORMATIONS, None, section)
+        self.rule = schema.sections.get(section)
+        self.memos = {}
+        if self.rule is None:
+            collector.collect(self.path, [((), 'Section is not defined by the schema.')])
+
+    def load_item(self, value_texts):
+        """
+        Load the field values of an item, as the yaml loader reads them.
+
+        :param value_texts:  a dictionary of field names to the yaml text
+            written for their values
+
+        :return:  a dictionary of the loaded field values
+
+        :raises yaml.YAMLError:  if a value text is not valid yaml
+        """
+        item = {}
+        memos = self.memos
+        for field, value_text in viewitems(value_texts):
+            memo = memos.get(field)
+            if memo is None:
+                memo = memos[field] = value_cache.BoundedMemo()
+            item[field] = memo.lookup(value_text, load_scalar)
+        return item
+
+    def __call__(self, value_texts):
+        """
+        Check the next item.
+
+        :param value_texts:  a dictionary of field names to the yaml text
+            written for their values, from yaml_serializer.TabPlan
+        """
+        index = self.item
+        self.item += 1
+        if self.rule is None or self.collector.full:
+            return
+
+        try:
+            item = self.load_item(value_texts)
+        except yaml.YAMLError as exc:
+            self.collector.collect(self.path + (index,), [((), _yaml_problem(exc))], self.rows)
+            return
+
+        if not self.rule.accepts(item):
+            self.collector.collect(self.path + (index,), self.rule.explain(item), self.rows)
+
+
+class ItemValidator(object):
+    """
+    Validates a yaml file as it is written, with a compiled schema.
+
+    :param schema_path:  the path to the schema definition file
+    :param max_errors:  the number of errors reported before validation
+        stops.  None reports every error.
+    """
+
+    def __init__(self, schema_path, max_errors=None):
+        self.schema = load_schema(schema_path)
+        self.collector = ErrorCollector(max_errors)
+
+    def check_meta_data(self, meta_text):
+        """
+        Check the meta data.
+
+        :param meta_text:  the yaml text written for the meta data
+        """
+        self.schema.check_meta_data(meta_text, self.collector)
+
+    def section(self, section, aggregated=False):
+        """
+        Get a function checking the items of a section as they are written.
+
+        :param section:  the sequence title of the section
+        :param aggregated:  True if the items are aggregated rows
+
+        :return:  a SectionChecker
+        """
+        return self.schema.section_checker(section, self.collector, rows=not aggregated)
+
+    def raise_errors(self):
+        """ Raise a SchemaValidationError if any errors were found. """
+        self.collector.raise_errors()
+
+
+_SCHEMAS = {}
+
+
+def load_schema(schema_path):
+    """
+    Get the compiled schema of a schema definition file.
+
+    Each file is compiled once per process.
+
+    :param schema_path:  the path to the schema definition file
+
+    :return:  a CompiledSchema
+    """
+    schema = _SCHEMAS.get(schema_path)
+    if schema is None:
+        schema = _SCHEMAS[schema_path] = CompiledSchema(schema_path)
+    return schema
+
+
+def split_document(text):
+    """
+    Split the text of a dictionary file into separately loaded shards.
+
+    The head holds everything before the first transformations section,
+    including the meta data.  Each section of the transformations is its
+    own shard.  Files with several yaml documents, or without a
+    transformations sequence, are a single shard.
+
+    :param text:  the text of the dictionary file
+
+    :return:  a list of (kind, text) tuples, where kind is one of
+        DOCUMENT_SHARD, HEAD_SHARD, or SECTION_SHARD.  The text of a section
+        shard is padded to keep the line numbers of the file.
+    """
+    transformations = TRANSFORMATIONS_LINE_PATTERN.search(text)
+    if transformations is None or DOCUMENT_START_PATTERN.search(text):
+        return [(DOCUMENT_SHARD, text)]
+
+    starts = [match.end() for match in
+              SECTION_START_PATTERN.finditer(text, transformations.end())]
+    if not starts:
+        return [(DOCUMENT_SHARD, text)]
+
+    shards = [(HEAD_SHARD, text[:starts[0]])]
+    lines = 0
+    previous = 0
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        lines += len(LINE_BREAK_PATTERN.findall(text, previous, start))
+        previous = start
+        padding = TRANSFORMATIONS + ':' + '\n' * lines
+        shards.append((SECTION_SHARD, padding + text[start:end]))
+    return shards
+
+
+def check_shard(shard):
+    """
+    Check a shard of a dictionary file.
+
+    Runs in the worker processes of validate_files.  The schema is compiled
+    once per process.
+
+    :param shard:  a tuple of the schema path, the shard kind and text
+        returned by split_document, and the maximum number of errors
+
+    :return:  the list of SchemaError found
+    """
+    schema_path, kind, text, max_errors = shard
+    schema = load_schema(schema_path)
+    collector = ErrorCollector(max_errors)
+    try:
+        if kind == SECTION_SHARD:
+            schema.check_fields(yaml.load(text, Loader=SAFE_LOADER), collector)
+        elif kind == HEAD_SHARD:
+            # the sections are checked in their own shards
+            document = yaml.load(text, Loader=SAFE_LOADER)
+            if isinstance(document, Mapping):
+                document[TRANSFORMATIONS] = []
+            schema.check_document(document, collector)
+        else:
+            for document in yaml.load_all(text, Loader=SAFE_LOADER):
+                schema.check_document(document, collector)
+    except yaml.YAMLError as exc:
+        collector.collect((), [((), _yaml_problem(exc))])
+    return collector.errors
+
+
+def validate_files(schema_path, dict_paths, workers=1, max_errors=None):
+    """
+    Validate several yaml files with the compiled schema.
+
+    Each file is split into its meta data and its transformations sections,
+    which are loaded and checked in a pool of worker processes.  The errors
+    of each file are merged in the order of the file.
+
+    :param schema_path:  The path to the schema defintion file.
+    :param dict_paths:  The paths to the files to validate.
+    :param workers:  the number of worker processes.  If 1, the files are
+        validated in this process.  If None, one per CPU.
+    :param max_errors:  the number of errors reported for each file.  None
+        reports every error.
+
+    :return:  a list of (path, list of SchemaError) tuples, in the order of
+        dict_paths.  A file that cannot be read has a single error, and the
+        other files are still validated.
+    """
+    # fails early if the schema cannot be compiled
+    load_schema(schema_path)
+
+    shards = []
+    read_errors = {}
+    for index, dict_path in enumerate(dict_paths):
+        try:
+            with io.open(dict_path, encoding='utf-8', newline='') as dict_file:
+                text = dict_file.read()
+        except (IOError, OSError) as exc:
+            LOGGER.debug("Unable to read %s", dict_path, exc_info=True)
+            read_errors[index] = [SchemaError((), 'File not found or unreadable: {}'.format(
+                exc.strerror or exc))]
+            continue
+        for kind, shard_text in split_document(text):
+            shards.append((index, (schema_path, kind, shard_text, max_errors)))
+
+    tasks = [shard for _, shard in shards]
+    if workers == 1:
+        results = [check_shard(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(check_shard, tasks))
+
+    errors = [read_errors.get(index, []) for index in range(len(dict_paths))]
+    for (index, _), shard_errors in zip(shards, results):
+        errors[index].extend(shard_errors)
+    if max_errors is not None:
+        errors = [file_errors[:max_errors] for file_errors in errors]
+
+    LOGGER.debug("Validated %d files in %d shards", len(dict_paths), len(shards))
+    return list(zip(dict_paths, errors))
+
+
+def validate_file(schema_path, dict_path, max_errors=None, workers=1):
+    """
+    Validate a yaml file with the compiled schema.
+
+    The file is loaded with the libyaml loader, when it is available.
+
+    :param schema_path:  The path to the schema defintion file.
+    :param dict_path:  The path to the file to validate.
+    :param max_errors:  the number of errors reported before validation
+        stops.  None reports every error.
+    :param workers:  the number of worker processes checking the sections of
+        the file.  See validate_files.
+
+    :raises SchemaValidationError:  if the file does not match the schema
+    """
+    [(_, errors)] = validate_files(schema_path, [dict_path], workers, max_errors)
+    if errors:
+        raise SchemaValidationError(errors)
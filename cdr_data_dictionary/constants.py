@@ -75,10 +75,20 @@ FILENAME_DATE_FORMAT = '%Y%m%d'
 
 # File names
 DEFAULT_LOG = 'LOGS/generate_yaml.log'
+DEFAULT_CACHE_DIR = 'CACHE/snapshots'
+DEFAULT_CACHE_SIZE_MB = 200
+DEFAULT_MANIFEST = 'CACHE/sections_manifest.json'
+DEFAULT_SCHEMA_DIR = 'CACHE/schemas'
+DEFAULT_CHUNK_RETRIES = 3
+DEFAULT_WORKER_CHUNK_ROWS = 5000
+DEFAULT_APPLY_LOG = 'LOGS/apply_dictionary.log'
+DEFAULT_APPLY_CHUNK_ROWS = 20000
+DEFAULT_VALIDATE_LOG = 'LOGS/validator.log'
 YAML_OUTPUT_FILENAME = 'yaml_files/CDRDD_{cdr_version}_{today}.yaml'
 
 # Regular expressions
 HYPERLINK_REGEX = r'=HYPERLINK\("(?P<link>.+)","(?P<text>.+)"\)'
+HYPERLINK_PREFIX = '=HYPERLINK'
 URL_REGEX = (r'(http:\/\/www\.|https:\/\/www\.|http:\/\/|https:\/\/)?'
              r'[a-z0-9]+([\-\.]{1}[a-z0-9]+)*\.[a-z]{2,5}(:[0-9]{1,5})?(\/.*)?$')
 
@@ -0,0 +1,355 @@
+"""
+Module writing and loading binary snapshots of generated dictionary files.
+
+A snapshot holds the same content as a dictionary file in a compact binary
+format, which loads much faster than the yaml file.  It is not a pickle,
+so loading a snapshot never runs code.
+
+The file starts with a magic string, the format version, and the sha256 hex
+digest of the yaml file the snapshot was made from, so a snapshot that no
+longer matches its yaml file is detected.  It continues with:
+
+  * the interned string table.  Each distinct string is stored once, as
+    character offsets into a single utf-8 block.
+  * the list pool.  The elements of list values, such as the concept ids
+    of aggregated items, as typed columns.
+  * the tables.  The meta data and each section of transformations, stored
+    as one typed column for each field.  A typed column is an array of uint8
+    type tags and a parallel array of int64 values.  Integers, such as
+    concept ids, are stored as they are.  Strings and lists are stored as
+    indexes into the string table and the list pool.
+
+All numbers are little endian.
+"""
+# Python imports
+import datetime
+import io
+import logging
+import os
+import struct
+import time
+
+# Third party imports
+from future.utils import integer_types, string_types, text_type, viewitems
+
+# Project imports
+from cdr_data_dictionary import compiled_schema
+from cdr_data_dictionary import incremental
+from cdr_data_dictionary import query
+
+LOGGER = logging.getLogger(__name__)
+
+MAGIC = b'CDRDDBIN'
+# Increment when the snapshot format changes.  Other versions are not loaded.
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_SUFFIX = '.cdrdd'
+HEADER = struct.Struct('<8sH64s')
+COUNT = struct.Struct('<I')
+TABLE_HEADER = struct.Struct('<IBII')
+
+# The kinds of tables
+META_DATA_TABLE = 0
+SECTION_TABLE = 1
+# A section written without items, loaded as None
+EMPTY_SECTION_TABLE = 2
+
+# The type tags of typed columns
+MISSING = 0
+NULL = 1
+FALSE = 2
+TRUE = 3
+INTEGER = 4
+FLOAT = 5
+STRING = 6
+DATE = 7
+DATETIME = 8
+LIST = 9
+
+EPOCH = datetime.datetime(1970, 1, 1)
+MIN_INT64 = -2 ** 63
+MAX_INT64 = 2 ** 63 - 1
+MICROSECONDS_PER_DAY = 24 * 60 * 60 * 1000 * 1000
+
+
+def snapshot_path(dict_path):
+    """ The path of the snapshot of a dictionary file. """
+    return os.path.splitext(dict_path)[0] + SNAPSHOT_SUFFIX
+
+
+def _pack_array(typecode, values):
+    """ Pack a sequence of numbers as a little endian array. """
+    return struct.pack('<{}{}'.format(len(values), typecode), *values)
+
+
+class _SnapshotWriter(object):
+    """ Encodes the values of a document into typed columns. """
+
+    def __init__(self):
+        self.strings = {}
+        self.list_offsets = [0]
+        self.list_tags = []
+        self.list_values = []
+
+    def intern(self, value):
+        """ Get the index of a string in the string table. """
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def encode(self, value, nested=False):
+        """
+        Encode a value as a type tag and an int64.
+
+        :raises ValueError:  if the value can not be stored in a snapshot
+        """
+        if value is None:
+            return NULL, 0
+        if isinstance(value, bool):
+            return (TRUE if value else FALSE), 0
+        if isinstance(value, integer_types):
+            if not MIN_INT64 <= value <= MAX_INT64:
+                raise ValueError('Integer {} does not fit in 64 bits.'.format(value))
+            return INTEGER, value
+        if isinstance(value, float):
+            return FLOAT, struct.unpack('<q', struct.pack('<d', value))[0]
+        if isinstance(value, string_types):
+            if not isinstance(value, text_type):
+                value = value.decode('utf-8')
+            return STRING, self.intern(value)
+        if isinstance(value, datetime.datetime):
+            if value.tzinfo is not None:
+                raise ValueError('Datetime {} has a time zone.'.format(value))
+            delta = value - EPOCH
+            return DATETIME, ((delta.days * MICROSECONDS_PER_DAY) +
+                              (delta.seconds * 1000 * 1000) + delta.microseconds)
+        if isinstance(value, datetime.date):
+            return DATE, value.toordinal()
+        if isinstance(value, list) and not nested:
+            encoded = [self.encode(element, nested=True) for element in value]
+            self.list_tags.extend(tag for tag, _ in encoded)
+            self.list_values.extend(number for _, number in encoded)
+            self.list_offsets.append(len(self.list_tags))
+            return LIST, len(self.list_offsets) - 2
+        raise ValueError('Value {!r} can not be stored in a snapshot.'.format(value))
+
+    def table(self, name, kind, items):
+        """ Encode a list of items as typed columns. """
+        items = items or []
+        fields = []
+        for item in items:
+            for field in item:
+                if field not in fields:
+                    fields.append(field)
+
+        chunks = [TABLE_HEADER.pack(self.intern(name), kind, len(items), len(fields)),
+                  _pack_array('I', [self.intern(field) for field in fields])]
+        for field in fields:
+            tags = []
+            numbers = []
+            for item in items:
+                if field in item:
+                    tag, number = self.encode(item[field])
+                else:
+                    tag, number = MISSING, 0
+                tags.append(tag)
+                numbers.append(number)
+            chunks.append(_pack_array('B', tags))
+            chunks.append(_pack_array('q', numbers))
+        return b''.join(chunks)
+
+    def string_table(self):
+        """ Encode the interned strings. """
+        strings = sorted(self.strings, key=self.strings.get)
+        offsets = [0]
+        for value in strings:
+            offsets.append(offsets[-1] + len(value))
+        block = u''.join(strings).encode('utf-8')
+        return b''.join([COUNT.pack(len(strings)), _pack_array('I', offsets),
+                         COUNT.pack(len(block)), block])
+
+    def list_pool(self):
+        """ Encode the elements of list values. """
+        return b''.join([COUNT.pack(len(self.list_offsets) - 1),
+                         _pack_array('I', self.list_offsets),
+                         _pack_array('B', self.list_tags),
+                         _pack_array('q', self.list_values)])
+
+
+def write_snapshot(document, output_path, yaml_hash):
+    """
+    Write the snapshot of a loaded dictionary document.
+
+    :param document:  the loaded yaml document of a dictionary file
+    :param output_path:  the path of the snapshot file
+    :param yaml_hash:  the sha256 hex digest of the dictionary file
+
+    :raises ValueError:  if a value can not be stored in a snapshot
+    """
+    writer = _SnapshotWriter()
+    tables = []
+    if query.META_DATA in document:
+        tables.append(writer.table(query.META_DATA, META_DATA_TABLE, document[query.META_DATA]))
+    for section in document.get(compiled_schema.TRANSFORMATIONS) or []:
+        for title, items in viewitems(section):
+            kind = SECTION_TABLE if items is not None else EMPTY_SECTION_TABLE
+            tables.append(writer.table(title, kind, items))
+
+    with io.open(output_path, 'wb') as snapshot_file:
+        snapshot_file.write(HEADER.pack(MAGIC, SNAPSHOT_FORMAT, yaml_hash.encode('ascii')))
+        snapshot_file.write(writer.string_table())
+        snapshot_file.write(writer.list_pool())
+        snapshot_file.write(COUNT.pack(len(tables)))
+        for table in tables:
+            snapshot_file.write(table)
+
+
+def write_file_snapshot(dict_path, output_path=None, document=None):
+    """
+    Write the snapshot of a dictionary file.
+
+    :param dict_path:  the path to a generated dictionary file
+    :param output_path:  the path of the snapshot file.  Defaults to the path
+        of the dictionary file, ending in SNAPSHOT_SUFFIX.
+    :param document:  the already loaded yaml document of the dictionary
+        file.  If None, the file is loaded.
+
+    :return:  the path of the snapshot file
+    """
+    start = time.time()
+    output_path = output_path or snapshot_path(dict_path)
+    if document is None:
+        document = query.load_document(dict_path)
+    write_snapshot(document, output_path, incremental.file_hash(dict_path))
+    LOGGER.info("Wrote snapshot of %s in %.3f seconds: %s", dict_path,
+                time.time() - start, output_path)
+    return output_path
+
+
+class _SnapshotReader(object):
+    """ Reads the parts of a snapshot in order. """
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def take(self, size):
+        """ Read the next bytes. """
+        chunk = self.data[self.offset:self.offset + size]
+        if len(chunk) != size:
+            raise ValueError('The snapshot is truncated.')
+        self.offset += size
+        return chunk
+
+    def unpack(self, packer):
+        """ Read the next fixed size record. """
+        return packer.unpack(self.take(packer.size))
+
+    def array(self, typecode, count):
+        """ Read the next array of numbers. """
+        size = struct.calcsize('<{}{}'.format(count, typecode))
+        return struct.unpack('<{}{}'.format(count, typecode), self.take(size))
+
+
+def _decoders(strings, lists):
+    """ Create the function decoding the int64 of each type tag. """
+    decoders = [None] * (LIST + 1)
+    decoders[NULL] = lambda number: None
+    decoders[FALSE] = lambda number: False
+    decoders[TRUE] = lambda number: True
+    decoders[INTEGER] = lambda number: number
+    decoders[FLOAT] = lambda number: struct.unpack('<d', struct.pack('<q', number))[0]
+    decoders[STRING] = strings.__getitem__
+    decoders[DATE] = datetime.date.fromordinal
+    decoders[DATETIME] = lambda number: EPOCH + datetime.timedelta(microseconds=number)
+    decoders[LIST] = lambda number: list(lists[number])
+    return decoders
+
+
+def _read_header(data, snapshot_file_path, dict_path):
+    """ Check the header of a snapshot, and the hash of its dictionary file. """
+    if len(data) < HEADER.size:
+        raise ValueError('{} is not a dictionary snapshot.'.format(snapshot_file_path))
+    magic, version, yaml_hash = HEADER.unpack(data[:HEADER.size])
+    if magic != MAGIC:
+        raise ValueError('{} is not a dictionary snapshot.'.format(snapshot_file_path))
+    if version != SNAPSHOT_FORMAT:
+        raise ValueError('{} has snapshot format {}, not {}.'.format(
+            snapshot_file_path, version, SNAPSHOT_FORMAT))
+    yaml_hash = yaml_hash.decode('ascii')
+    if dict_path is not None and yaml_hash != incremental.file_hash(dict_path):
+        raise ValueError('{} was not made from the current contents of {}.'.format(
+            snapshot_file_path, dict_path))
+    return yaml_hash
+
+
+def load_document(snapshot_file_path, dict_path=None):
+    """
+    Load the document of a dictionary file from its snapshot.
+
+    :param snapshot_file_path:  the path to a snapshot file
+    :param dict_path:  if given, the dictionary file the snapshot should have
+        been made from
+
+    :return:  the document, as yaml.safe_load would load the dictionary file
+
+    :raises ValueError:  if the file is not a snapshot of this format, or the
+        dictionary file changed since the snapshot was made
+    """
+    start = time.time()
+    with io.open(snapshot_file_path, 'rb') as snapshot_file:
+        data = snapshot_file.read()
+    _read_header(data, snapshot_file_path, dict_path)
+    reader = _SnapshotReader(data)
+    reader.take(HEADER.size)
+
+    (string_count,) = reader.unpack(COUNT)
+    offsets = reader.array('I', string_count + 1)
+    (block_size,) = reader.unpack(COUNT)
+    text = reader.take(block_size).decode('utf-8')
+    strings = [text[begin:end] for begin, end in zip(offsets, offsets[1:])]
+
+    (list_count,) = reader.unpack(COUNT)
+    list_offsets = reader.array('I', list_count + 1)
+    element_tags = reader.array('B', list_offsets[-1])
+    element_numbers = reader.array('q', list_offsets[-1])
+    decoders = _decoders(strings, [])
+    elements = [decoders[tag](number) for tag, number in zip(element_tags, element_numbers)]
+    lists = [elements[begin:end] for begin, end in zip(list_offsets, list_offsets[1:])]
+    decoders = _decoders(strings, lists)
+
+    document = {}
+    sections = []
+    (table_count,) = reader.unpack(COUNT)
+    for _ in range(table_count):
+        name_index, kind, item_count, field_count = reader.unpack(TABLE_HEADER)
+        fields = [strings[index] for index in reader.array('I', field_count)]
+        items = [{} for _ in range(item_count)]
+        for field in fields:
+            tags = reader.array('B', item_count)
+            numbers = reader.array('q', item_count)
+            for item, tag, number in zip(items, tags, numbers):
+                if tag != MISSING:
+                    item[field] = decoders[tag](number)
+
+        if kind == META_DATA_TABLE:
+            document[query.META_DATA] = items
+        else:
+            sections.append({strings[name_index]: items if kind == SECTION_TABLE else None})
+    document[compiled_schema.TRANSFORMATIONS] = sections
+
+    LOGGER.debug("Loaded snapshot %s in %.3f seconds", snapshot_file_path, time.time() - start)
+    return document
+
+
+def load(snapshot_file_path, dict_path=None):
+    """
+    Load and index a dictionary from its snapshot.
+
+    :param snapshot_file_path:  the path to a snapshot file
+    :param dict_path:  if given, the dictionary file the snapshot should have
+        been made from
+
+    :return:  a query.DataDictionary
+    """
+    return query.DataDictionary(load_document(snapshot_file_path, dict_path))
@@ -4,25 +4,46 @@ Designed specifically for use with the CDR Data Dictionary.
 This is an entry point.
 """
 # Python imports
-import codecs
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import copy
+import hashlib
+import io
 import logging
+import os
 import re
+import time
+from itertools import chain
 from string import ascii_uppercase
 
 # Third party imports
-from dateutil import parser as dt_parser
-from future.utils import viewitems
+from future.utils import string_types, viewitems
 
 # Project imports
+from cdr_data_dictionary import aggregate
 from cdr_data_dictionary import constants as consts
 from cdr_data_dictionary import cdr_parser
+from cdr_data_dictionary import closure
+from cdr_data_dictionary import compiled_schema
+from cdr_data_dictionary import dictionary_snapshot
+from cdr_data_dictionary import incremental
+from cdr_data_dictionary import normalize
+from cdr_data_dictionary import pipeline
+from cdr_data_dictionary import projection
+from cdr_data_dictionary import query
+from cdr_data_dictionary import records
 from cdr_data_dictionary import service
+from cdr_data_dictionary import snapshot_cache
+from cdr_data_dictionary import temporal
 from cdr_data_dictionary import validator
+from cdr_data_dictionary import value_cache
 from cdr_data_dictionary import yaml_logging
+from cdr_data_dictionary import yaml_serializer
 
 LOGGER = logging.getLogger(__name__)
 
+HYPERLINK_PATTERN = re.compile(consts.HYPERLINK_REGEX, re.UNICODE)
+
 def _process_field_names(name_list):
     """
     Read the first row of the tab as a list of field names.
@@ -58,40 +79,7 @@ def _process_value(value):
     :return:  True of False if the value was 'yes' or 'no'.  Otherwise, A string that
         can be written to the output file.
     """
-    result = None
-    try:
-        value = value.replace(u'\u00AD', '-')
-        value = value.replace(u'\u2010', '-')
-        value = value.replace(u'\u2019', "'")
-        value = value.replace(u'\u201c', '"')
-        value = value.replace(u'\u201d', '"')
-        result = value
-    except AttributeError:
-        LOGGER.exception("Attribute error encountered for: [%s]", value)
-        if value is None:
-            LOGGER.debug("Value '%s' can not be utf-8 encoded", value)
-        elif isinstance(value, int):
-            result = str(value)
-
-    if result:
-        result = result.strip()
-        # replacing new line values with a constant to make list
-        # generation easier
-        result = result.replace('\r\n', consts.NEWLINE)
-        result = result.replace('\n', consts.NEWLINE)
-        result = result.replace('\r', consts.NEWLINE)
-        # in yaml, single quotes are represented as ''
-        # inside a string surrounded by single quotes
-        result = result.replace("'", "''")
-        result = result.strip()
-
-        if result.lower() in ['yes', 'y', 'true', 't']:
-            return True
-
-        if result.lower() in ['no', 'n', 'false', 'f']:
-            return False
-
-    return result
+    return normalize.normalize_value(value)
 
 
 def append_to_results(field, value, values_dict, unique=False):
@@ -117,6 +105,48 @@ def append_to_results(field, value, values_dict, unique=False):
     return existing
 
 
+def iter_tab_contents(fields, rows, init_fields=None,
+                      cache_size=value_cache.COLUMN_CACHE_SIZE):
+    """
+    Generator to clean and organize tab values one row at a time.
+
+    Repeated values in a column are interned, so rows that are kept share a
+    single copy of each distinct value.  Each row is stored as a compact
+    record sharing a single schema for the tab.
+
+    :param fields:  the normalized field names of the tab
+    :param rows:  an iterable of the rows read from the tab, without the
+        header row.  each row is a list of values.
+    :param cache_size:  the maximum number of distinct values interned per
+        column.  Zero disables interning.
+
+    :return:  yields a records.Row for each row.  Rows read like a dictionary
+        of field names to a list holding the value of the field.
+    """
+    schema = records.TabSchema(fields, init_fields)
+    interned = [value_cache.BoundedMemo(cache_size).intern for _ in fields]
+    for value in rows:
+        yield schema.record([interned[index](val) for index, val in enumerate(value)])
+
+
+def stream_tab_contents(values, init_fields=None):
+    """
+    Helper method to lazily clean and organize tab values.
+
+    Only the header row is read immediately.  The remaining rows are
+    processed as the returned generator is consumed.
+
+    :param values:  an iterable of values read from the tab.  each row is a
+        list of values where each list item corresponds to a row.
+
+    :return:  A tuple of the list of fields and a generator of concept
+        dictionaries.  (A list of fields, A generator of concepts)
+    """
+    rows = iter(values)
+    fields = _process_field_names(next(rows))
+    return fields, iter_tab_contents(fields, rows, init_fields)
+
+
 def sequentially_process_tab_contents(values, init_fields=None):
     """
     Helper method to clean and organize tab values.
@@ -130,18 +160,8 @@ def sequentially_process_tab_contents(values, init_fields=None):
         fields and associated values.
         (A list of fields, A dictionary of concepts)
     """
-    if not init_fields:
-        init_fields = {}
-
-    fields = _process_field_names(values[0])
-    concepts = []
-    for value in values[1:]:
-        new_dict = copy.copy(init_fields)
-        for index, val in enumerate(value):
-            new_value = append_to_results(fields[index], val, {})
-            new_dict[fields[index]] = new_value
-        concepts.append(new_dict)
-    return fields, concepts
+    fields, concepts = stream_tab_contents(values, init_fields)
+    return fields, list(concepts)
 
 
 def _get_list_value(value):
@@ -153,15 +173,7 @@ def _get_list_value(value):
     :returns: Either the unchanged value, or a string looking like a python
         list.
     """
-    result = value
-    if consts.NEWLINE in value:
-        split_values = value.split(consts.NEWLINE)
-        result = [val for val in split_values if not val.isspace()]
-        result = ["'" + val + "'" if not val.isdigit() else val for val in result]
-        result = ', '.join(result)
-        result = ''.join(['[', result, ']'])
-
-    return result
+    return yaml_serializer.format_list_value(value)
 
 
 def _write_value(yaml_writer, field_name, value):
@@ -173,57 +185,23 @@ def _write_value(yaml_writer, field_name, value):
         It is used to determine how to write the value.
     :param value:  The processed value to write.
     """
-    try:
-        if field_name in consts.INTEGER_FIELDS or field_name in consts.BOOLEAN_FIELDS:
-            yaml_writer.write(value)
-            yaml_writer.write('\n')
-        elif field_name in consts.MULTIPLE_TYPES:
-            try:
-                int_value = int(value)
-                yaml_writer.write(int_value)
-                yaml_writer.write('\n')
-            except ValueError:
-                value = _get_list_value(value)
-                yaml_writer.write(value)
-                yaml_writer.write("\n")
-        elif field_name in consts.TEMPORAL_FIELDS:
-            date = dt_parser.parse(value)
-            if 'time' in field_name:
-                dt_str = date.strftime(consts.DATETIME_FORMAT)
-            elif 'date' in field_name:
-                dt_str = date.strftime(consts.DATE_FORMAT)
-            yaml_writer.write(dt_str + "\n")
-        elif consts.NEWLINE in value:
-            value = _get_list_value(value)
-            yaml_writer.write(value)
-            yaml_writer.write("\n")
-        else:
-            yaml_writer.write("'" + value + "'\n")
-    except IndexError:
-        LOGGER.exception("can't write value for field %s", field_name)
-        yaml_writer.write('  IndexError - cant write this value\n')
-    except UnicodeEncodeError:
-        LOGGER.exception("can't write value for field %s", field_name)
-        yaml_writer.write('  UnicodeEncodeError - cant write this value\n')
-    except UnicodeDecodeError:
-        LOGGER.exception("can't write value for field %s", field_name)
-        yaml_writer.write('  UnicodeDecodeError - cant write this value\n')
-    except TypeError:
-        yaml_writer.write(str(value) + '\n')
-
-
-def _write_meta_data(yaml_writer, meta_data):
+    yaml_writer.write(yaml_serializer.format_value(field_name, value))
+
+
+def _write_meta_data(yaml_writer, meta_data, item_validator=None):
     """
     Helper function to write the meta data dictionary into the yaml output file
 
     :param yaml_writer:  The yaml file writer object.
     :param meta_data:  a dictionary of meta data values.  Everything in the
         dictionary is written to the meta_data yaml object.
+    :param item_validator:  if given, a compiled_schema.ItemValidator checking
+        the meta data.
     """
-    yaml_writer.write('meta_data:\n  -\n')
-    for key, value in viewitems(meta_data):
-        yaml_writer.write('    ' + key + ': ')
-        _write_value(yaml_writer, key, value)
+    meta_text = yaml_serializer.format_meta_data(meta_data)
+    yaml_writer.write(meta_text)
+    if item_validator is not None:
+        item_validator.check_meta_data(meta_text)
 
 
 def write_yaml_file(filepath, meta_data, fields, values_container, sequence_name, index):
@@ -241,7 +219,7 @@ def write_yaml_file(filepath, meta_data, fields, values_container, sequence_name
     :param index:  identifier for the column grouped by. Identifies the first
         field that will be written for each dictionary item.
     """
-    with codecs.open(filepath, 'w', encoding='utf-8') as yaml:
+    with yaml_serializer.open_writer(filepath) as yaml:
         # write the meta data
         _write_meta_data(yaml, meta_data)
         yaml.write('\n')
@@ -250,7 +228,7 @@ def write_yaml_file(filepath, meta_data, fields, values_container, sequence_name
         yaml.write('transformations:\n')
         for list_index, _ in enumerate(sequence_name):
             LOGGER.info("Writing transformations for: %s", sequence_name[list_index])
-            yaml.write('  - \n    ' + sequence_name[list_index] + ':\n')
+            yaml.write(yaml_serializer.format_sequence_header(sequence_name[list_index]))
 
             if isinstance(values_container[list_index], list):
                 _write_yaml_list(yaml,
@@ -260,34 +238,37 @@ def write_yaml_file(filepath, meta_data, fields, values_container, sequence_name
                                 )
 
 
-def _write_yaml_list(yaml, fields, value_list, index):
+def _write_yaml_list(yaml, fields, value_list, index, aggregated=False, check=None):
     """
     Write a list to a yaml file.
-    """
-    grouping_field = fields[index]
 
-    for value_dict in value_list:
-        yaml.write('      - \n')   # marks this as a yaml sequence
-        yaml.write('        ' + grouping_field + ":  ")
+    Each item is formatted in one pass and written with a single call.  The
+    formatting of each column is compiled once for the tab.
 
-        grouping_value = value_dict.get(fields[index])[0]
-        if grouping_field in consts.INTEGER_FIELDS or grouping_field in consts.BOOLEAN_FIELDS:
-            yaml.write(grouping_value)
-            yaml.write('\n')
+    :param aggregated:  if True, value_list holds aggregate.Group objects
+        instead of row records.
+    :param check:  if given, a function called with each item written, as a
+        dictionary of its field names to the yaml text of their values, such
+        as a compiled_schema.SectionChecker.
+    """
+    start = time.time()
+    plan = yaml_serializer.TabPlan(fields, index, _process_value)
+    format_item = plan.format_group if aggregated else plan.format_item
+    items = 0
+    for value_dict in value_list:
+        if check is None:
+            yaml.write(format_item(value_dict))
         else:
-            yaml.write("'" + grouping_value + "'\n")
-
-        for key, value in viewitems(value_dict):
-            if key == grouping_field:
-                continue
-            yaml.write('        ' + key + ':  ')
-            sub_value = _process_value(value[0])
-            if sub_value or isinstance(sub_value, bool):
-                _write_value(yaml, key, sub_value)
-            else:
-                yaml.write('\n')
+            value_texts = {}
+            yaml.write(format_item(value_dict, value_texts))
+            check(value_texts)
+        items += 1
 
-        yaml.write('\n')
+    lookups, hits, distinct = plan.cache_stats()
+    LOGGER.debug("Wrote %d items in %.3f seconds.  Column caches: %d values, "
+                 "%.1f%% hits, %d distinct values processed",
+                 items, time.time() - start, lookups,
+                 100.0 * hits / lookups if lookups else 0.0, distinct)
 
 
 def _get_sequence_title(title):
@@ -310,62 +291,53 @@ def _get_sequence_title(title):
     return sequence_title
 
 
-def _create_yaml_file(settings, tab_name, values):
+def _get_tab_defaults(settings, tab_name):
     """
-    Helper method to determine how the values for a tab are processed.
+    Determine the default field values and the 'group by' column of a tab.
 
-    Takes the values and command line arguments and determines what the 'group by'
-    column should be.  If a specified sheet name is unrecognized, this is logged.
-    The default 'group_by' value depends on the tab that was read.  Generates
-    a yaml sequence title based on the tab_name.
+    The default 'group_by' value depends on the tab that was read.  If a
+    specified sheet name is unrecognized, this is logged.
 
     ;param settings:  python namespace values from command line parameters.
     :param tab_name:  name of the tab the values are associated with.
-    :param values:  a list of values read from the spreadsheet's tab
 
-    :return:  a tuple of values.  The yaml file sequence title, the fields
-        read in the spreadsheet tab, the values dictionary, and the group_by
-        column id.  The values dictionary is a dictionary with keys specified
-        as the unique values found in the column identified by 'group_by'.  Each
-        concept contains a dictionary of the other fields and their associated
-        unique values.  These sub-keys may contain list values.
-        (sequence_title, fields, values_dict, group_by)
+    :return:  a tuple of the default field values dictionary and the group_by
+        column id.  (init_fields, group_by)
     """
-    sequence_title = _get_sequence_title(tab_name)
     group_by = settings.column_id
 
     if tab_name == consts.CONCEPT_GENERALIZATIONS_TAB_NAME:
-        fields, values_list = sequentially_process_tab_contents(values, consts.INIT_ROW_GENERALIZATIONS)
+        init_fields = consts.INIT_ROW_GENERALIZATIONS
         group_by = 3 if group_by is None else group_by
     elif tab_name == consts.CONCEPT_SUPPRESSIONS_TAB_NAME:
-        fields, values_list = sequentially_process_tab_contents(values, consts.INIT_ROW_SUPPRESSIONS)
+        init_fields = consts.INIT_ROW_SUPPRESSIONS
         group_by = 3 if group_by is None else group_by
     elif tab_name == consts.FIELD_GENERALIZATIONS_TAB_NAME:
-        fields, values_list = sequentially_process_tab_contents(values, consts.INIT_COL_GENERALIZATIONS)
+        init_fields = consts.INIT_COL_GENERALIZATIONS
         group_by = 1 if group_by is None else group_by
     elif tab_name == consts.FIELD_SUPPRESSIONS_TAB_NAME:
-        fields, values_list = sequentially_process_tab_contents(values, consts.INIT_COL_SUPPRESSIONS)
+        init_fields = consts.INIT_COL_SUPPRESSIONS
         group_by = 1 if group_by is None else group_by
     elif tab_name == consts.AVAILABLE_FIELDS_TAB_NAME:
-        fields, values_list = sequentially_process_tab_contents(values, consts.INIT_AVAILABLE_FIELDS_VALUES)
+        init_fields = consts.INIT_AVAILABLE_FIELDS_VALUES
         group_by = 1 if group_by is None else group_by
     elif tab_name == consts.TABLE_SUPPRESSIONS_TAB_NAME:
-        fields, values_list = sequentially_process_tab_contents(values, consts.INIT_TABLE_SUPPRESSIONS)
+        init_fields = consts.INIT_TABLE_SUPPRESSIONS
         group_by = 0 if group_by is None else group_by
     elif tab_name == consts.CHANGE_LOG_TAB_NAME:
-        fields, values_list = sequentially_process_tab_contents(values, consts.INIT_CHANGE_LOG_VALUES)
+        init_fields = consts.INIT_CHANGE_LOG_VALUES
         group_by = 0 if group_by is None else group_by
     elif tab_name == consts.CLEANING_CONFORMANCE_TAB_NAME:
-        fields, values_list = sequentially_process_tab_contents(values, consts.INIT_CLEAN_CONFORM_VALUES)
+        init_fields = consts.INIT_CLEAN_CONFORM_VALUES
         group_by = 0 if group_by is None else group_by
     elif tab_name == consts.PROGRAM_CUSTOM_CONCEPT_IDS_TAB_NAME:
-        fields, values_list = sequentially_process_tab_contents(values, consts.INIT_CUSTOM_CONCEPTS)
+        init_fields = consts.INIT_CUSTOM_CONCEPTS
         group_by = 0 if group_by is None else group_by
     elif tab_name == consts.WEARABLES_TAB_NAME:
-        fields, values_list = sequentially_process_tab_contents(values, consts.INIT_WEARABLES)
+        init_fields = consts.INIT_WEARABLES
         group_by = 0 if group_by is None else group_by
     else:
-        fields, values_list = sequentially_process_tab_contents(values, {})
+        init_fields = {}
         group_by = 0 if group_by is None else group_by
         try:
             column = ascii_uppercase[group_by]
@@ -376,6 +348,96 @@ def _create_yaml_file(settings, tab_name, values):
 
         LOGGER.info("Sheet name unrecognized.  Grouping will be done on Column %s.", column)
 
+    return (init_fields, group_by)
+
+
+def _project_tab(values, init_fields, group_by, kept, warn_missing=True):
+    """
+    Keep only the projected columns of a tab.
+
+    :param values:  an iterable of values read from the spreadsheet's tab
+    :param init_fields:  the default field values of the tab
+    :param group_by:  the group_by column id of the tab
+    :param kept:  the set of field names kept.  The group_by column is
+        always kept.
+    :param warn_missing:  warn about kept fields missing from the tab
+
+    :return:  a tuple of the projected rows, the projected default field
+        values, and the group_by column id within the projected rows.
+        (values, init_fields, group_by)
+    """
+    rows = iter(values)
+    header = next(rows)
+    fields = _process_field_names(header)
+    indexes = projection.column_indexes(fields, kept, group_by, warn_missing)
+
+    group_field = fields[group_by] if group_by < len(fields) else None
+    init_fields = {key: value for key, value in viewitems(init_fields)
+                   if key in kept or key == group_field}
+    if group_by in indexes:
+        group_by = indexes.index(group_by)
+
+    values = chain([projection.project_row(header, indexes)],
+                   projection.project_rows(rows, indexes))
+    return (values, init_fields, group_by)
+
+
+def select_columns(settings):
+    """
+    Create the column selector used to read a projection.
+
+    :param settings:  python namespace values from command line parameters.
+
+    :return:  a callable taking a tab name and its header row, and returning
+        the sorted indexes of the columns kept, or None to keep every column.
+    """
+    def selector(tab_name, header):
+        """ Find the columns of a tab that are kept. """
+        kept = projection.projected_fields(settings.columns, tab_name)
+        if kept is None:
+            return None
+        _, group_by = _get_tab_defaults(settings, tab_name)
+        return projection.column_indexes(_process_field_names(header), kept, group_by,
+                                         projection.names_tab(settings.columns, tab_name))
+
+    return selector
+
+
+def _create_yaml_file(settings, tab_name, values):
+    """
+    Helper method to determine how the values for a tab are processed.
+
+    Takes the values and command line arguments and determines what the 'group by'
+    column should be.  Generates a yaml sequence title based on the tab_name.
+    If settings.columns is set, only the projected columns are processed.
+
+    ;param settings:  python namespace values from command line parameters.
+    :param tab_name:  name of the tab the values are associated with.
+    :param values:  an iterable of values read from the spreadsheet's tab
+
+    :return:  a tuple of values.  The yaml file sequence title, the fields
+        read in the spreadsheet tab, the values generator, and the group_by
+        column id.  The values generator lazily yields a dictionary for each
+        row with the field names as keys.  If settings.aggregate is set, it
+        is instead a list with an aggregate.Group for each unique value of the
+        group_by column.  Each group contains the other fields and their
+        associated unique values.
+        (sequence_title, fields, values_generator, group_by)
+    """
+    sequence_title = _get_sequence_title(tab_name)
+    init_fields, group_by = _get_tab_defaults(settings, tab_name)
+
+    columns = getattr(settings, 'columns', None)
+    kept = projection.projected_fields(columns, tab_name)
+    if kept is not None:
+        values, init_fields, group_by = _project_tab(values, init_fields, group_by, kept,
+                                                     projection.names_tab(columns, tab_name))
+
+    fields, values_list = stream_tab_contents(values, init_fields)
+
+    if getattr(settings, 'aggregate', False):
+        values_list = aggregate.group_rows(values_list, fields[group_by])
+
     return (sequence_title, fields, values_list, group_by)
 
 
@@ -392,22 +454,142 @@ def get_merged_lists(val_list, form_list):
 
     :return:  The value list with any required updates.
     """
-    pattern = re.compile(consts.HYPERLINK_REGEX, re.UNICODE)
-
     for list_index, formula_list in enumerate(form_list):
-        for item_index, item in enumerate(formula_list):
-            try:
-                match = pattern.match(item)
-                if match:
-                    link = match.group('link').strip()
-                    if link.startswith('http'):
-                        val_list[list_index][item_index] = link
-            except TypeError:
-                pass
+        _merge_row(val_list[list_index], formula_list)
 
     return val_list
 
 
+def _merge_row(val_row, form_row, pattern=HYPERLINK_PATTERN):
+    """
+    Merge a single row of values with its row of formulas.
+
+    Only cells starting with the HYPERLINK function are matched against the
+    regular expression.  Plain values, numbers, and other formulas are skipped
+    with a type and prefix check.
+
+    :param val_row:  The row of values.  Updated in place.
+    :param form_row:  The row of formulas checked for hyperlinks.
+    :param pattern:  The compiled hyperlink regular expression.
+
+    :return:  The row of values with any required updates.
+    """
+    prefix = consts.HYPERLINK_PREFIX
+    for item_index, item in enumerate(form_row):
+        if not isinstance(item, string_types) or not item.startswith(prefix):
+            continue
+
+        match = pattern.match(item)
+        if match:
+            link = match.group('link').strip()
+            if link.startswith('http'):
+                val_row[item_index] = link
+
+    return val_row
+
+
+def merge_tab(val_list, form_list):
+    """
+    Merge the values and formulas of a single tab.
+
+    Can be called as soon as both the values and formulas of a tab are read.
+    Rows without formulas are left unchanged.
+
+    :param val_list:  The rows of values read from the tab.  Updated in place.
+    :param form_list:  The rows of formulas read from the tab.
+
+    :return:  The rows of values, updated with external hyperlinks.
+    """
+    for val_row, form_row in zip(val_list, form_list):
+        _merge_row(val_row, form_row)
+
+    return val_list
+
+
+def iter_merged_rows(val_list, form_list):
+    """
+    Generator merging the rows of a tab one at a time.
+
+    :param val_list:  The rows of values read from the tab.
+    :param form_list:  The rows of formulas read from the tab.
+
+    :return:  yields each row of values, updated with external hyperlinks.
+    """
+    for list_index, val_row in enumerate(val_list):
+        if list_index < len(form_list):
+            _merge_row(val_row, form_list[list_index])
+        yield val_row
+
+
+def _index_tabs(tabs):
+    """
+    Index tabs by name.
+
+    :param tabs:  a list of tuples of the form (sheet_name, rows)
+
+    :return:  a dictionary of sheet names to a deque of the tuples with that
+        name, in list order.
+    """
+    index = {}
+    for tab in tabs:
+        index.setdefault(tab[0], deque()).append(tab)
+    return index
+
+
+def _release(sections):
+    """
+    Generator yielding the items of a list while removing them from the list.
+
+    Each item can be freed as soon as the consumer is done with it.
+
+    :param sections:  the list to consume.  It is empty when the generator
+        is exhausted.
+    """
+    sections.reverse()
+    while sections:
+        yield sections.pop()
+
+
+def iter_merged_values(values, formulas, release=False):
+    """
+    Generator merging the data values and formulas one tab at a time.
+
+    Performs the same merge as merge_values_and_formulas, but only as each tab
+    is consumed.  The rows of each tab are merged lazily.
+
+    :param values:  a list of tuples of the form [(sheet_name, [[value_row_1], [value_row_2]])]
+        where rows contain actual cell data values
+    :param formulas:  a list of tuples of the form
+        [(sheet_name, [[value_row_1], [value_row_2]])] where rows contain formula
+        data if it exists, otherwise, cell data values.
+    :param release:  if True, the values and formulas lists are emptied as tabs
+        are consumed, so the rows of a tab can be freed once it is written.
+
+    :return:  yields a tuple of the form (sheet_name, row_generator) for each
+        tab found in both lists.
+    """
+    formula_index = _index_tabs(formulas)
+    if release:
+        values = _release(values)
+
+    for val_tup in values:
+        matches = formula_index.get(val_tup[0])
+        if not matches:
+            continue
+
+        for_tup = matches[0]
+        if release:
+            # stop referencing the formulas so they are freed with the values
+            matches.popleft()
+            for form_index, tab in enumerate(formulas):
+                if tab is for_tup:
+                    del formulas[form_index]
+                    break
+
+        LOGGER.info("Read %d values from: %s", len(val_tup[1]), val_tup[0])
+        yield (val_tup[0], iter_merged_rows(val_tup[1], for_tup[1]))
+
+
 def merge_values_and_formulas(values, formulas):
     """
     Merge the data values and formulas read from the spreadsheets.
@@ -427,20 +609,266 @@ def merge_values_and_formulas(values, formulas):
         [(sheet_name, [[value_row_1], [value_row_2]])] where rows contain actual
         cell data or external hyperlinks
     """
+    formula_index = _index_tabs(formulas)
+
     final_values = []
     for val_tup in values:
-        merged_list = []
-        for for_tup in formulas:
-            if val_tup[0] == for_tup[0]:
-                merged_list = get_merged_lists(val_tup[1], for_tup[1])
-                final_values.append((val_tup[0], merged_list))
+        for for_tup in formula_index.get(val_tup[0], ()):
+            merged_list = get_merged_lists(val_tup[1], for_tup[1])
+            final_values.append((val_tup[0], merged_list))
 
     return final_values
 
 
-def create_yaml_file(settings, values, meta_data):
+def iter_tab_pairs(values, formulas):
     """
-    Entry point for creating a yaml file from the given values and settings
+    Generator pairing the values and formulas of each tab, without merging them.
+
+    The values and formulas lists are emptied as tabs are consumed, as with
+    iter_merged_values(values, formulas, release=True).
+
+    :param values:  a list of tuples of the form (sheet_name, value_rows)
+    :param formulas:  a list of tuples of the form (sheet_name, formula_rows)
+
+    :return:  yields a tuple of the form (sheet_name, value_rows, formula_rows)
+        for each tab found in both lists.
+    """
+    formula_index = _index_tabs(formulas)
+    del formulas[:]
+
+    for tab_name, tab_values in _release(values):
+        matches = formula_index.get(tab_name)
+        if matches:
+            yield (tab_name, tab_values, matches.popleft()[1])
+
+
+def _process_section(settings, tab):
+    """
+    Merge and process the rows of a tab.  The first stage of the pipeline.
+
+    :param settings:  python namespace values from command line parameters.
+    :param tab:  a tuple of the form (sheet_name, value_rows, formula_rows)
+
+    :return:  the tuple returned by _create_yaml_file, with a list of the
+        processed rows.
+    """
+    tab_name, tab_values, tab_formulas = tab
+    LOGGER.info("Read %d values from: %s", len(tab_values), tab_name)
+    merge_tab(tab_values, tab_formulas)
+
+    seq_title, fields, values_list, grouped = _create_yaml_file(settings, tab_name, tab_values)
+    return (seq_title, fields, list(values_list), grouped)
+
+
+def _format_section(settings, section, item_validator=None):
+    """
+    Format the processed rows of a tab.  The second stage of the pipeline.
+
+    :param settings:  python namespace values from command line parameters.
+    :param section:  a tuple returned by _process_section
+    :param item_validator:  if given, a compiled_schema.ItemValidator checking
+        each item as it is formatted.
+
+    :return:  the yaml text of the tab's sequence
+    """
+    text = io.StringIO()
+    _write_sequence(text, settings, section, item_validator)
+    return text.getvalue()
+
+
+def write_pipelined_yaml_file(settings, tabs, meta_data, item_validator=None):
+    """
+    Write the yaml file with reading, processing, formatting, and writing overlapped.
+
+    Each step runs in its own thread, connected by queues holding at most
+    settings.pipeline_depth tabs.  While one tab is written, the next is
+    formatted, the one after it is processed, and later tabs are read.  Tabs
+    are written in the order they are read.  The result is identical to the
+    file written by create_yaml_file.
+
+    :param settings:  command line settings for generating the yaml file.
+        python namespace values.
+    :param tabs:  an iterable of tuples of the form
+        (sheet_name, value_rows, formula_rows).  It is iterated in a separate
+        thread, so it may read each tab as it is needed.
+    :param meta_data:  a dictionary of file meta data.  added to the yaml file
+        for ease of access
+    :param item_validator:  if given, a compiled_schema.ItemValidator checking
+        the meta data and each item as it is formatted.
+    """
+    output_file = settings.output_file
+    stages = [lambda tab: _process_section(settings, tab),
+              lambda section: _format_section(settings, section, item_validator)]
+
+    tab_count = 0
+    with yaml_serializer.open_writer(output_file) as yaml:
+        _write_meta_data(yaml, meta_data, item_validator)
+        yaml.write('\n')
+        yaml.write('transformations:\n')
+
+        for text in pipeline.run_stages(tabs, stages, settings.pipeline_depth):
+            yaml.write(text)
+            tab_count += 1
+
+    temporal.CONVERTER.log_stats()
+    LOGGER.info("Done.  Read %d tabs.  Created yaml file: %s",
+                tab_count, output_file)
+
+
+def _tab_tasks(settings, tab_name, rows, chunk_rows):
+    """
+    Split the rows of a tab into tasks for the process pool.
+
+    Rows are formatted independently of each other, so a large tab is split
+    into chunks of rows.  Each chunk repeats the header row.  Aggregated and
+    projected tabs are not split, since their items depend on other rows.
+
+    :param settings:  python namespace values from command line parameters.
+    :param tab_name:  name of the tab the rows are associated with.
+    :param rows:  a list of the merged rows of the tab, starting with the
+        header row.
+    :param chunk_rows:  the maximum number of rows in a chunk.
+
+    :return:  a list of the arguments for render_fragment
+    """
+    if (getattr(settings, 'aggregate', False) or getattr(settings, 'columns', None)
+            or len(rows) <= chunk_rows + 1):
+        return [(settings, tab_name, rows, True)]
+
+    header = rows[0]
+    return [(settings, tab_name, [header] + rows[start:start + chunk_rows], start == 1)
+            for start in range(1, len(rows), chunk_rows)]
+
+
+def render_fragment(task):
+    """
+    Process and format the rows of a tab, or a chunk of a tab.
+
+    Runs in the worker processes of write_parallel_yaml_file.
+
+    :param task:  a tuple of the form (settings, tab_name, rows, with_header).
+        rows starts with the header row of the tab.  If with_header is True,
+        the yaml sequence header of the tab is included.
+
+    :return:  the utf-8 encoded yaml text
+    """
+    settings, tab_name, rows, with_header = task
+    seq_title, fields, values_list, grouped = _create_yaml_file(settings, tab_name, rows)
+
+    text = io.StringIO()
+    if with_header:
+        text.write(yaml_serializer.format_sequence_header(seq_title))
+    _write_yaml_list(text, fields, values_list, grouped,
+                     getattr(settings, 'aggregate', False))
+    return text.getvalue().encode('utf-8')
+
+
+def write_parallel_yaml_file(settings, values, meta_data,
+                             chunk_rows=consts.DEFAULT_WORKER_CHUNK_ROWS):
+    """
+    Write the yaml file, processing and formatting tabs in a pool of processes.
+
+    Each tab, or chunk of rows of a large tab, is sent to a pool of
+    settings.workers processes as soon as it is read.  Workers return encoded
+    yaml fragments, which are written in the order of the tabs behind the
+    meta data header.  The result is identical to the file written by
+    create_yaml_file.
+
+    :param settings:  command line settings for generating the yaml file.
+        python namespace values.
+    :param values:  merged values read from the google drive spreadsheet.  an
+        iterable of tuples in the form (tab_name, values).
+    :param meta_data:  a dictionary of file meta data.  added to the yaml file
+        for ease of access
+    :param chunk_rows:  the maximum number of rows sent to a worker at once.
+    """
+    output_file = settings.output_file
+    pending = deque()
+    tab_count = 0
+
+    with yaml_serializer.open_writer(output_file) as yaml, \
+            ProcessPoolExecutor(max_workers=settings.workers) as executor:
+        _write_meta_data(yaml, meta_data)
+        yaml.write('\n')
+        yaml.write('transformations:\n')
+
+        for tab_name, tab_values in values:
+            for task in _tab_tasks(settings, tab_name, list(tab_values), chunk_rows):
+                pending.append(executor.submit(render_fragment, task))
+            tab_count += 1
+
+            # write the fragments that are done, without waiting
+            while pending and pending[0].done():
+                yaml.write_encoded(pending.popleft().result())
+
+        while pending:
+            yaml.write_encoded(pending.popleft().result())
+
+    LOGGER.info("Done.  Read %d tabs with %d workers.  Created yaml file: %s",
+                tab_count, settings.workers, output_file)
+
+
+def _render_section(settings, tab_name, values):
+    """
+    Create the yaml text for a single tab.
+
+    :param settings:  python namespace values from command line parameters.
+    :param tab_name:  name of the tab the values are associated with.
+    :param values:  a list of values read from the spreadsheet's tab
+
+    :return:  the utf-8 encoded yaml sequence for the tab, as written by
+        write_yaml_file.
+    """
+    section = io.StringIO()
+    _write_section(section, settings, tab_name, values)
+    return section.getvalue().encode('utf-8')
+
+
+def _write_section(yaml, settings, tab_name, values, item_validator=None):
+    """
+    Process the values of a tab and write them to the yaml file.
+
+    The rows are processed and written one at a time.
+
+    :param yaml:  The yaml file writer object.
+    :param settings:  python namespace values from command line parameters.
+    :param tab_name:  name of the tab the values are associated with.
+    :param values:  an iterable of values read from the spreadsheet's tab
+    :param item_validator:  if given, a compiled_schema.ItemValidator checking
+        each item as it is written.
+    """
+    _write_sequence(yaml, settings, _create_yaml_file(settings, tab_name, values),
+                    item_validator)
+
+
+def _write_sequence(yaml, settings, section, item_validator=None):
+    """
+    Write the yaml sequence of a processed tab.
+
+    :param yaml:  The yaml file writer object.
+    :param settings:  python namespace values from command line parameters.
+    :param section:  a tuple returned by _create_yaml_file
+    :param item_validator:  if given, a compiled_schema.ItemValidator checking
+        each item as it is written.
+    """
+    seq_title, fields, values_list, grouped = section
+    aggregated = getattr(settings, 'aggregate', False)
+    check = item_validator.section(seq_title, aggregated) if item_validator else None
+
+    LOGGER.info("Writing transformations for: %s", seq_title)
+    yaml.write(yaml_serializer.format_sequence_header(seq_title))
+    _write_yaml_list(yaml, fields, values_list, grouped, aggregated, check)
+
+
+def write_incremental_yaml_file(settings, values, meta_data):
+    """
+    Write the yaml file, regenerating only the tabs that changed.
+
+    The manifest of the previous run identifies the sections of the previous
+    output file and the fingerprint of the tab values each section was
+    generated from.  Sections with unchanged fingerprints are copied from the
+    previous output file without being processed again.  The result is
+    identical to the file written by write_yaml_file.
 
     :param settings:  command line settings for generating the yaml file.
         python namespace values.
@@ -448,24 +876,223 @@ def create_yaml_file(settings, values, meta_data):
         tuples in the form (tab_name, values).
     :param meta_data:  a dictionary of file meta data.  added to the yaml file
         for ease of access
+
+    :return:  a list of the tab names that were regenerated.
+    """
+    output_file = settings.output_file
+    manifest = incremental.load_manifest(settings.manifest_file)
+    previous = incremental.previous_sections(manifest)
+
+    header = io.StringIO()
+    _write_meta_data(header, meta_data)
+    header.write(u'\n')
+    header.write(u'transformations:\n')
+
+    regenerated = []
+    sections = []
+    digest = hashlib.sha256()
+    temp_file = output_file + '.tmp'
+    previous_yaml = open(manifest['output_file'], 'rb') if manifest else None
+    try:
+        with open(temp_file, 'wb') as yaml:
+            # the meta data header is always written
+            chunk = header.getvalue().encode('utf-8')
+            yaml.write(chunk)
+            digest.update(chunk)
+            offset = len(chunk)
+
+            for tab_name, tab_values in values:
+                tab_values = list(tab_values)
+                fingerprint = incremental.fingerprint(tab_name, tab_values, settings)
+                section = previous.get(tab_name)
+                if section and section['fingerprint'] == fingerprint:
+                    previous_yaml.seek(section['start'])
+                    chunk = previous_yaml.read(section['end'] - section['start'])
+                else:
+                    chunk = _render_section(settings, tab_name, tab_values)
+                    regenerated.append(tab_name)
+
+                sections.append({'tab_name': tab_name,
+                                 'fingerprint': fingerprint,
+                                 'start': offset,
+                                 'end': offset + len(chunk)})
+                yaml.write(chunk)
+                digest.update(chunk)
+                offset += len(chunk)
+    finally:
+        if previous_yaml:
+            previous_yaml.close()
+
+    # the previous output may be the file being replaced
+    if os.path.exists(output_file):
+        os.remove(output_file)
+    os.rename(temp_file, output_file)
+    incremental.save_manifest(settings.manifest_file, output_file,
+                              digest.hexdigest(), sections)
+
+    LOGGER.info("Regenerated %d of %d sections: %s",
+                len(regenerated), len(sections), ', '.join(regenerated))
+    return regenerated
+
+
+def create_yaml_file(settings, values, meta_data, item_validator=None):
+    """
+    Entry point for creating a yaml file from the given values and settings
+
+    Tabs are processed and written one at a time, and the rows of each tab
+    are streamed through processing into the file.  values may be a
+    generator, such as iter_merged_values, so only one tab needs to be held
+    in memory at a time.
+
+    :param settings:  command line settings for generating the yaml file.
+        python namespace values.
+    :param values:  values read from the google drive spreadsheet.  an iterable
+        of tuples in the form (tab_name, values).
+    :param meta_data:  a dictionary of file meta data.  added to the yaml file
+        for ease of access
+    :param item_validator:  if given, a compiled_schema.ItemValidator checking
+        the meta data and each item as it is written.  Not used for
+        incremental files.
     """
     output_file = settings.output_file
 
-    seq_titles = []
-    output_fields = []
-    output_values = []
-    grouped_by = []
-    for item in values:
-        seq_title, fields, values_list, grouped = _create_yaml_file(settings, item[0], item[1])
-        seq_titles.append(seq_title)
-        output_fields.append(fields)
-        output_values.append(values_list)
-        grouped_by.append(grouped)
+    if getattr(settings, 'incremental', False):
+        regenerated = write_incremental_yaml_file(settings, values, meta_data)
+        temporal.CONVERTER.log_stats()
+        LOGGER.info("Done.  Regenerated %d tabs.  Created yaml file: %s",
+                    len(regenerated), output_file)
+        return
+
+    tab_count = 0
+    with yaml_serializer.open_writer(output_file) as yaml:
+        # write the meta data
+        _write_meta_data(yaml, meta_data, item_validator)
+        yaml.write('\n')
 
-    write_yaml_file(output_file, meta_data, output_fields, output_values, seq_titles, grouped_by)
+        # start writing actual value data
+        yaml.write('transformations:\n')
+        for tab_name, tab_values in values:
+            _write_section(yaml, settings, tab_name, tab_values, item_validator)
+            tab_count += 1
 
+    temporal.CONVERTER.log_stats()
     LOGGER.info("Done.  Read %d tabs.  Created yaml file: %s",
-                len(seq_titles), output_file)
+                tab_count, output_file)
+
+
+def _read_spreadsheet(args, credentials):
+    """
+    Read the raw values and formulas from the spreadsheet.
+
+    :param args:  command line arguments describing what to read and how.
+    :param credentials:  credentials used to read the spreadsheet.
+
+    :return:  a tuple of the values and formulas lists.  Each list has the
+        form [(sheet_name, [[value_row_1], [value_row_2]])]
+    """
+    dd_values_service = service.create_spreadsheets_service(credentials)
+
+    if args.columns and args.range is None:
+        # only the projected columns are read.  the header rows identify them.
+        tab_ranges = service.read_projected_ranges(dd_values_service, args,
+                                                   select_columns(args))
+        values = service.read_projected_values(dd_values_service, args, tab_ranges)
+        formulas = service.read_projected_values(dd_values_service, args, tab_ranges,
+                                                 render_option='FORMULA')
+    elif args.hyperlink_fetch:
+        values = service.read_sheet_grid(dd_values_service, args)
+        # hyperlinks are already applied to the values.  merging with empty
+        # formula tabs leaves the values unchanged.
+        formulas = [(tab_name, []) for tab_name, _ in values]
+    elif args.batch_fetch:
+        values = service.batch_read_sheet_values(dd_values_service, args)
+        formulas = service.batch_read_sheet_values(dd_values_service, args,
+                                                   render_option='FORMULA')
+    else:
+        http_factory = service.create_http_factory(credentials)
+        values = service.read_sheet_values(dd_values_service, args,
+                                           http_factory=http_factory)
+        formulas = service.read_sheet_values(dd_values_service, args,
+                                             render_option='FORMULA',
+                                             http_factory=http_factory)
+
+    return values, formulas
+
+
+def _writes_tabs_concurrently(args):
+    """
+    Determine if tabs are written by the pipeline or the process pool.
+
+    :param args:  command line arguments describing how to write the file.
+
+    :return:  True if --pipeline-depth or --workers is used.
+    """
+    return bool((args.pipeline_depth or args.workers > 1) and not args.incremental)
+
+
+def _reads_tabs_lazily(args):
+    """
+    Determine if tabs are read one at a time as they are written.
+
+    Tabs are streamed by default, so memory use is bounded by the largest
+    tab rather than the whole workbook.  Batch, hyperlink, and projected
+    reads return every tab at once, so writing starts after they finish.
+
+    :param args:  command line arguments describing what to read and how.
+
+    :return:  True if each tab is read as it is needed.
+    """
+    return not (args.columns or args.hyperlink_fetch or args.batch_fetch)
+
+
+def _iter_spreadsheet_tabs(args, credentials, snapshot_writer=None):
+    """
+    Generator reading the values and formulas of the spreadsheet one tab at a time.
+
+    :param args:  command line arguments describing what to read and how.
+    :param credentials:  credentials used to read the spreadsheet.
+    :param snapshot_writer:  a snapshot_cache.SnapshotWriter.  If given, each
+        tab is added to the snapshot as it is read.  The snapshot is stored
+        once every tab is read, and discarded if reading stops early.
+
+    :return:  yields a tuple of the form (sheet_name, value_rows, formula_rows)
+    """
+    dd_values_service = service.create_spreadsheets_service(credentials)
+    http_factory = service.create_http_factory(credentials)
+
+    complete = False
+    try:
+        for tab in service.iter_sheet_tabs(dd_values_service, args, http_factory=http_factory):
+            if snapshot_writer is not None:
+                snapshot_writer.write_tab(*tab)
+            yield tab
+        complete = True
+    finally:
+        if snapshot_writer is not None:
+            if complete:
+                snapshot_writer.close()
+            else:
+                snapshot_writer.discard()
+
+
+def _write_derived_files(args):
+    """
+    Write the files derived from a validated yaml file, if requested.
+
+    Chained generalizations are flattened into a lookup file, and the binary
+    snapshot is written.  The yaml file is loaded once for both.
+
+    :param args:  command line arguments naming the yaml file and the
+        derived files to write.
+    """
+    if not (args.generalization_map or args.binary_snapshot):
+        return
+
+    document = query.load_document(args.output_file)
+    if args.generalization_map:
+        closure.write_closure(args.output_file, document=document)
+    if args.binary_snapshot:
+        dictionary_snapshot.write_file_snapshot(args.output_file, document=document)
 
 
 def main(raw_args=None):
@@ -478,19 +1105,33 @@ def main(raw_args=None):
 
     # get the service started up
     credentials = service.create_drive_credentials(args.key_file)
-    dd_values_service = service.create_spreadsheets_service(credentials)
     dd_meta_service = service.create_meta_data_service(credentials)
     LOGGER.debug("Successfully set up credentials.")
 
-    # read the values
-    values = service.read_sheet_values(dd_values_service, args)
-    formulas = service.read_sheet_values(dd_values_service, args, render_option='FORMULA')
-
-    values = merge_values_and_formulas(values, formulas)
+    # read the meta data.  the document version identifies cached snapshots.
+    mdata = service.read_meta_data(dd_meta_service, args)
 
+    snapshot = None
+    key = snapshot_cache.snapshot_key(args, mdata)
+    if args.use_cache and not args.refresh:
+        snapshot = snapshot_cache.load_snapshot(args.cache_dir, key)
+
+    # read the values.  tabs read one at a time are read as they are written,
+    # and cached as they are read.
+    snapshot_writer = None
+    if snapshot:
+        values, formulas = snapshot
+    elif _reads_tabs_lazily(args):
+        values = formulas = None
+        if args.use_cache:
+            snapshot_writer = snapshot_cache.SnapshotWriter(args.cache_dir, key,
+                                                            args.cache_size * 1024 * 1024)
+    else:
+        values, formulas = _read_spreadsheet(args, credentials)
+        if args.use_cache:
+            snapshot_cache.save_snapshot(args.cache_dir, key, values, formulas,
+                                         args.cache_size * 1024 * 1024)
 
-    # read the meta data
-    mdata = service.read_meta_data(dd_meta_service, args)
     # add cdr version to meta data
     mdata['cdr_version'] = args.cdr_version
 
@@ -498,23 +1139,66 @@ def main(raw_args=None):
     meta_data = copy.copy(consts.INIT_META_DATA_VALUES)
     meta_data.update(mdata)
 
-    for index, _ in enumerate(values):
-        LOGGER.info("Read %d values from: %s", len(values[index][1]), values[index][0])
+    # the schema the file is validated against.  items are checked as they
+    # are written, unless they are written in other processes or merged
+    # with an existing file.  projected and aggregated files are validated
+    # against a schema derived for them.  derived schemas are kept out of the
+    # output directory, so they are never mistaken for dictionary files.
+    schema_file = args.schema_file
+    if args.columns or args.aggregate:
+        fields = projection.all_projected_fields(args.columns) if args.columns else None
+        output_name = os.path.splitext(os.path.basename(args.output_file))[0]
+        schema_file = validator.project_schema(
+            args.schema_file, fields,
+            os.path.join(consts.DEFAULT_SCHEMA_DIR, output_name + '_schema.yaml'), args.aggregate)
+
+    item_validator = None
+    if args.workers == 1 and not args.incremental:
+        item_validator = compiled_schema.ItemValidator(schema_file, args.max_errors)
+
+    # create the yaml file.  tabs are merged as they are written and
+    # released once written.
+    if _writes_tabs_concurrently(args):
+        if values is None:
+            tabs = _iter_spreadsheet_tabs(args, credentials, snapshot_writer)
+        else:
+            tabs = iter_tab_pairs(values, formulas)
 
-    # create the yaml file
-    create_yaml_file(args, values, meta_data)
+        if args.workers > 1:
+            merged = ((tab_name, merge_tab(tab_values, tab_formulas))
+                      for tab_name, tab_values, tab_formulas in tabs)
+            write_parallel_yaml_file(args, merged, meta_data)
+        else:
+            write_pipelined_yaml_file(args, tabs, meta_data, item_validator)
+    else:
+        if values is None:
+            merged = ((tab_name, merge_tab(tab_values, tab_formulas))
+                      for tab_name, tab_values, tab_formulas
+                      in _iter_spreadsheet_tabs(args, credentials, snapshot_writer))
+        else:
+            merged = iter_merged_values(values, formulas, release=True)
+        create_yaml_file(args, merged, meta_data, item_validator)
     LOGGER.debug("Created the yaml file.")
 
     # validate the created yaml file
     try:
-        validator.validate(args.schema_file, args.output_file)
+        if item_validator is None:
+            compiled_schema.validate_file(schema_file, args.output_file, args.max_errors,
+                                           args.workers)
+        else:
+            item_validator.raise_errors()
+        if args.cross_check:
+            validator.validate(schema_file, args.output_file)
     except ValueError:
         LOGGER.exception('The generated file does not validate.  Check the '
                          'input source Google spreadsheet and the schema '
                          'definition file for changes.  Update as needed.')
+        if args.generalization_map or args.binary_snapshot:
+            LOGGER.warning("Not writing the generalization map or binary snapshot "
+                           "of a file that does not validate.")
     else:
         LOGGER.info("Successfully validated yaml file: %s", args.output_file)
-
+        _write_derived_files(args)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,149 @@
+"""
+Module responsible for tracking the sections of a generated yaml file.
+
+Incremental generation stores a manifest describing the previously generated
+file.  For each tab, the manifest holds a fingerprint of the raw rows read from
+the tab and the byte range of the tab's section in the generated file.  Tabs
+with unchanged fingerprints can reuse their previously generated section.
+"""
+# Python imports
+import hashlib
+import json
+import logging
+import os
+
+# Third party imports
+
+# Project imports
+
+LOGGER = logging.getLogger(__name__)
+
+# Increment when the generated section format changes.  Sections written by a
+# different format version are never reused.
+MANIFEST_FORMAT = 1
+
+# Chunk size used when hashing files
+READ_SIZE = 1024 * 1024
+
+
+def settings_fingerprint(settings):
+    """
+    Identify the command line settings that change how a tab is written.
+
+    :param settings:  python namespace values from command line parameters.
+
+    :return:  a json serializable list of the settings values.
+    """
+    return [MANIFEST_FORMAT, settings.column_id, getattr(settings, 'aggregate', False),
+            getattr(settings, 'columns', None)]
+
+
+def fingerprint(tab_name, rows, settings):
+    """
+    Create a content fingerprint for a tab.
+
+    :param tab_name:  name of the tab the rows were read from
+    :param rows:  the raw rows read from the tab, after merging formulas
+    :param settings:  python namespace values from command line parameters.
+
+    :return:  a hex digest that changes if the tab contents or the settings
+        used to write the tab change.
+    """
+    contents = json.dumps([tab_name, settings_fingerprint(settings), rows])
+    return hashlib.sha256(contents.encode('utf-8')).hexdigest()
+
+
+def file_hash(filepath):
+    """
+    Hash the contents of a file.
+
+    :param filepath:  the file to hash
+
+    :return:  the hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as hashed_file:
+        chunk = hashed_file.read(READ_SIZE)
+        while chunk:
+            digest.update(chunk)
+            chunk = hashed_file.read(READ_SIZE)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path):
+    """
+    Read the manifest of the previously generated file.
+
+    The manifest is only returned if the file it describes still exists and
+    is unchanged since it was generated.
+
+    :param manifest_path:  path to the manifest file
+
+    :return:  the manifest dictionary, or None if no usable manifest exists.
+    """
+    try:
+        with open(manifest_path, 'r') as manifest_file:
+            manifest = json.load(manifest_file)
+    except (IOError, OSError, ValueError):
+        LOGGER.info("No usable manifest found at: %s", manifest_path)
+        return None
+
+    output_file = manifest.get('output_file')
+    if manifest.get('format') != MANIFEST_FORMAT or not output_file:
+        LOGGER.info("Manifest format has changed.  Regenerating all sections.")
+        return None
+
+    try:
+        current_hash = file_hash(output_file)
+    except (IOError, OSError):
+        LOGGER.info("Previous output file is missing: %s", output_file)
+        return None
+
+    if current_hash != manifest.get('output_hash'):
+        LOGGER.info("Previous output file has changed since it was generated: %s",
+                    output_file)
+        return None
+
+    return manifest
+
+
+def save_manifest(manifest_path, output_file, output_hash, sections):
+    """
+    Write the manifest describing a generated file.
+
+    :param manifest_path:  path to the manifest file
+    :param output_file:  path of the generated yaml file
+    :param output_hash:  hex digest of the generated yaml file
+    :param sections:  a list of section dictionaries with the keys 'tab_name',
+        'fingerprint', 'start', and 'end'.  start and end are byte offsets.
+    """
+    manifest_dir = os.path.dirname(manifest_path)
+    if manifest_dir:
+        try:
+            os.makedirs(manifest_dir)
+        except OSError:
+            # path already exists.  moving on.
+            pass
+
+    manifest = {
+        'format': MANIFEST_FORMAT,
+        'output_file': output_file,
+        'output_hash': output_hash,
+        'sections': sections,
+    }
+    with open(manifest_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+
+def previous_sections(manifest):
+    """
+    Index the sections of a manifest by tab name.
+
+    :param manifest:  a manifest dictionary from load_manifest, or None
+
+    :return:  a dictionary of tab names to section dictionaries
+    """
+    if not manifest:
+        return {}
+
+    return {section['tab_name']: section for section in manifest['sections']}
@@ -0,0 +1,129 @@
+"""
+Module responsible for normalizing cell values read from the spreadsheet.
+
+Normalization replaces common unicode punctuation, escapes single quotes,
+removes surrounding whitespace, replaces new lines with a constant, and turns
+yes/no style values into booleans.  The replacements are made with a single
+translation table and a single compiled new line pattern.
+"""
+# Python imports
+import logging
+import re
+
+# Third party imports
+from future.utils import string_types
+
+# Project imports
+from cdr_data_dictionary import constants as consts
+
+LOGGER = logging.getLogger(__name__)
+
+# Unicode punctuation replacements.  In yaml, single quotes are represented
+# as '' inside a string surrounded by single quotes.
+TRANSLATION_TABLE = {
+    ord(u'\u00AD'): u'-',
+    ord(u'\u2010'): u'-',
+    ord(u'\u2019'): u"''",
+    ord(u'\u201c'): u'"',
+    ord(u'\u201d'): u'"',
+    ord(u"'"): u"''",
+}
+
+NEWLINE_PATTERN = re.compile(u'\r\n|\r|\n')
+
+TRUE_VALUES = frozenset(['yes', 'y', 'true', 't'])
+FALSE_VALUES = frozenset(['no', 'n', 'false', 'f'])
+
+# Length of the longest boolean value.  Longer values are never booleans.
+MAX_BOOLEAN_LENGTH = max(len(value) for value in TRUE_VALUES | FALSE_VALUES)
+
+
+def _normalize_other(value):
+    """
+    Normalize a value that is not a string.
+
+    :param value:  The value to process
+
+    :return:  the normalized text of an integer value, otherwise None.
+    """
+    # values without string methods are reported with their type
+    LOGGER.error("Attribute error encountered for: [%s] (%s)", value, type(value).__name__)
+
+    if value is None:
+        LOGGER.debug("Value '%s' can not be utf-8 encoded", value)
+    elif isinstance(value, int):
+        return normalize_value(str(value))
+
+    return None
+
+
+def normalize_value(value):
+    """
+    Process the values to make writing to a yaml file easier.
+
+    Replaces common unicode characters.
+    Removes leading and trailing whitespace.
+    Replaces new lines with a constant to preserve the yaml file formatting.
+
+    None of the replaced characters are whitespace, so the replacements can
+    be made before the whitespace is removed in a single translation.
+
+    :param value:  The value to process
+
+    :return:  True of False if the value was 'yes' or 'no'.  Otherwise, A string that
+        can be written to the output file.
+    """
+    if not isinstance(value, string_types):
+        return _normalize_other(value)
+
+    result = value.translate(TRANSLATION_TABLE).strip()
+    if u'\n' in result or u'\r' in result:
+        # replacing new line values with a constant to make list
+        # generation easier
+        result = NEWLINE_PATTERN.sub(consts.NEWLINE, result)
+
+    if len(result) <= MAX_BOOLEAN_LENGTH:
+        lowered = result.lower()
+        if lowered in TRUE_VALUES:
+            return True
+
+        if lowered in FALSE_VALUES:
+            return False
+
+    return result
+
+
+def normalize_column(values):
+    """
+    Normalize a whole column of values in one call.
+
+    :param values:  an iterable of values read from a single column
+
+    :return:  a list of the normalized values, in the same order
+    """
+    table = TRANSLATION_TABLE
+    pattern = NEWLINE_PATTERN
+    newline = consts.NEWLINE
+    true_values = TRUE_VALUES
+    false_values = FALSE_VALUES
+
+    results = []
+    for value in values:
+        if not isinstance(value, string_types):
+            results.append(_normalize_other(value))
+            continue
+
+        result = value.translate(table).strip()
+        if u'\n' in result or u'\r' in result:
+            result = pattern.sub(newline, result)
+
+        if len(result) <= MAX_BOOLEAN_LENGTH:
+            lowered = result.lower()
+            if lowered in true_values:
+                result = True
+            elif lowered in false_values:
+                result = False
+
+        results.append(result)
+
+    return results
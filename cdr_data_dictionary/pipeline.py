@@ -0,0 +1,148 @@
+"""
+Module running work as a pipeline of stages connected by bounded queues.
+
+Each stage runs in its own thread and handles one item at a time, so items
+leave the pipeline in the order they entered it.  While one stage works on an
+item, the earlier stages work on the following items.  A stage waits when the
+queue to the next stage is full, so at most depth items are held between two
+stages.  An error in any stage stops every stage and is raised to the
+consumer.
+"""
+# Python imports
+import logging
+import sys
+import threading
+
+# Third party imports
+from future.moves.queue import Empty, Full, Queue
+from future.utils import raise_
+
+# Project imports
+
+LOGGER = logging.getLogger(__name__)
+
+# Seconds a stage waits on a queue before checking if the pipeline stopped
+POLL_INTERVAL = 0.1
+
+# Marks the end of the items passed between stages
+_DONE = object()
+
+
+class _Failure(object):
+    """
+    An error raised by a stage, passed downstream in place of an item.
+    """
+    __slots__ = ('exc_info',)
+
+    def __init__(self, exc_info):
+        self.exc_info = exc_info
+
+
+def _put(queue, item, stop):
+    """
+    Put an item on a queue, waiting while the queue is full.
+
+    :return:  False if the pipeline stopped before the item was queued.
+    """
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=POLL_INTERVAL)
+            return True
+        except Full:
+            pass
+    return False
+
+
+def _get(queue, stop):
+    """
+    Get an item from a queue, waiting while the queue is empty.
+
+    :return:  the item, or _DONE if the pipeline stopped.
+    """
+    while not stop.is_set():
+        try:
+            return queue.get(timeout=POLL_INTERVAL)
+        except Empty:
+            pass
+    return _DONE
+
+
+def _feed(source, outbox, stop):
+    """
+    Thread target putting the items of the source on the first queue.
+    """
+    try:
+        for item in source:
+            if not _put(outbox, item, stop):
+                return
+    except Exception:  # pylint: disable=broad-except
+        _put(outbox, _Failure(sys.exc_info()), stop)
+        return
+    _put(outbox, _DONE, stop)
+
+
+def _work(stage, inbox, outbox, stop):
+    """
+    Thread target applying a stage to each item of its inbox.
+
+    Failures of earlier stages are passed on without calling the stage.
+    """
+    while True:
+        item = _get(inbox, stop)
+        if item is _DONE or isinstance(item, _Failure):
+            _put(outbox, item, stop)
+            return
+
+        try:
+            result = stage(item)
+        except Exception:  # pylint: disable=broad-except
+            _put(outbox, _Failure(sys.exc_info()), stop)
+            return
+
+        if not _put(outbox, result, stop):
+            return
+
+
+def run_stages(source, stages, depth=1):
+    """
+    Generator passing the items of a source through a pipeline of stages.
+
+    The source is iterated in its own thread, so it can be a generator that
+    reads each item as it is needed.  The consumer of the generator is the
+    last stage of the pipeline.
+
+    :param source:  an iterable of the items to process
+    :param stages:  a list of callables.  Each is called with the result of
+        the previous stage for an item.
+    :param depth:  the maximum number of items waiting between two stages.
+
+    :return:  yields the result of the last stage for each item, in source
+        order.
+    """
+    stop = threading.Event()
+    queues = [Queue(maxsize=depth) for _ in range(len(stages) + 1)]
+    threads = [threading.Thread(target=_feed, args=(source, queues[0], stop),
+                                name='pipeline-source')]
+    for index, stage in enumerate(stages):
+        threads.append(threading.Thread(
+            target=_work, args=(stage, queues[index], queues[index + 1], stop),
+            name='pipeline-stage-{}'.format(index + 1)))
+
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    try:
+        while True:
+            item = _get(queues[-1], stop)
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise_(*item.exc_info)
+            yield item
+    finally:
+        # stops the stages early if the consumer fails or stops consuming
+        stop.set()
+        for thread in threads:
+            thread.join()
+        LOGGER.debug("Pipeline of %d stages stopped", len(stages))
@@ -0,0 +1,177 @@
+"""
+Module responsible for projecting tabs onto a subset of their columns.
+
+A projection is given on the command line as a list of column specifications.
+Each specification is a tuple of a tab name, or None for every tab, and a list
+of normalized field names.  A tab specific specification replaces the
+specification for every tab.  The group by column of a tab is always kept, so
+every yaml item can still be identified.
+"""
+# Python imports
+import logging
+
+# Third party imports
+
+# Project imports
+
+LOGGER = logging.getLogger(__name__)
+
+
+def projected_fields(columns, tab_name):
+    """
+    Get the fields kept for a tab.
+
+    :param columns:  a list of (tab name or None, field names) specifications
+    :param tab_name:  the name of the tab
+
+    :return:  a set of the field names kept, or None to keep every field.
+    """
+    if not columns:
+        return None
+
+    kept = None
+    for spec_tab, fields in columns:
+        if spec_tab == tab_name:
+            return set(fields)
+        if spec_tab is None:
+            kept = set(fields) if kept is None else kept | set(fields)
+    return kept
+
+
+def names_tab(columns, tab_name):
+    """
+    Check whether a tab specific specification is given for a tab.
+
+    :param columns:  a list of (tab name or None, field names) specifications
+    :param tab_name:  the name of the tab
+    """
+    return any(spec_tab == tab_name for spec_tab, _ in columns or [])
+
+
+def all_projected_fields(columns):
+    """
+    Get every field named by the projection.
+
+    :param columns:  a list of (tab name or None, field names) specifications
+
+    :return:  a set of field names
+    """
+    fields = set()
+    for _, spec_fields in columns or []:
+        fields.update(spec_fields)
+    return fields
+
+
+def column_indexes(fields, kept, group_by, warn_missing=True):
+    """
+    Find the columns of a tab that are kept.
+
+    :param fields:  the normalized field names of the header row
+    :param kept:  the set of field names kept
+    :param group_by:  the index of the group by column.  It is always kept.
+    :param warn_missing:  warn about kept fields missing from the tab.  Fields
+        of a specification for every tab are usually missing from most tabs,
+        so they are only logged at debug level.
+
+    :return:  a sorted list of the indexes of the kept columns
+    """
+    indexes = [index for index, field in enumerate(fields)
+               if field in kept or index == group_by]
+
+    missing = kept.difference(fields)
+    if missing:
+        log = LOGGER.warning if warn_missing else LOGGER.debug
+        log("Projected fields not found in the tab: %s", ', '.join(sorted(missing)))
+    return indexes
+
+
+def project_row(row, indexes):
+    """
+    Keep the kept columns of a row.
+
+    Trailing empty values are removed, as they are when a range of columns is
+    read from the spreadsheet.
+
+    :param row:  a list of the cell values of a row
+    :param indexes:  a sorted list of the indexes of the kept columns
+
+    :return:  a list of the kept cell values
+    """
+    length = len(row)
+    projected = [row[index] for index in indexes if index < length]
+    while projected and projected[-1] == '':
+        projected.pop()
+    return projected
+
+
+def project_rows(rows, indexes):
+    """
+    Generator keeping the kept columns of each row.
+
+    Rows without any kept values at the end of the tab are skipped, as they
+    are when a range of columns is read from the spreadsheet.
+
+    :param rows:  an iterable of rows of cell values
+    :param indexes:  a sorted list of the indexes of the kept columns
+
+    :return:  yields the projected rows
+    """
+    empty_rows = 0
+    for row in rows:
+        projected = project_row(row, indexes)
+        if not projected:
+            # only yielded if a later row holds values
+            empty_rows += 1
+            continue
+
+        for _ in range(empty_rows):
+            yield []
+        empty_rows = 0
+        yield projected
+
+
+def column_ranges(indexes):
+    """
+    Group kept columns into ranges of adjacent columns.
+
+    :param indexes:  a sorted list of the indexes of the kept columns
+
+    :return:  a list of (first index, last index) tuples
+    """
+    ranges = []
+    for index in indexes:
+        if ranges and ranges[-1][1] == index - 1:
+            ranges[-1] = (ranges[-1][0], index)
+        else:
+            ranges.append((index, index))
+    return ranges
+
+
+def join_column_ranges(range_rows, ranges):
+    """
+    Join rows read from several column ranges into single rows.
+
+    Values are placed at their original column positions.  Columns that were
+    not read are left empty, so column indexes match rows read whole.
+
+    :param range_rows:  a list with the rows read from each column range
+    :param ranges:  the (first index, last index) tuples of the column ranges
+
+    :return:  a list of rows, without trailing empty values or rows.
+    """
+    row_count = max([len(rows) for rows in range_rows] or [0])
+    joined = []
+    for row_index in range(row_count):
+        row = []
+        for rows, (first, _) in zip(range_rows, ranges):
+            values = rows[row_index] if row_index < len(rows) else []
+            if values:
+                row.extend([''] * (first - len(row)))
+                row.extend(values)
+        while row and row[-1] == '':
+            row.pop()
+        joined.append(row)
+
+    while joined and not joined[-1]:
+        joined.pop()
+    return joined
@@ -0,0 +1,276 @@
+"""
+Module answering questions about a generated dictionary file.
+
+A dictionary file is loaded once and its items are indexed by concept id,
+by table and field name, and by change number.  Each question is answered
+with a dictionary lookup instead of a scan of the items.
+
+Aggregated files list several values in a field.  Each value is indexed.
+"""
+# Python imports
+import io
+import logging
+import time
+
+# Third party imports
+from future.utils import integer_types, string_types, viewitems
+import yaml
+
+# Project imports
+from cdr_data_dictionary import compiled_schema
+
+LOGGER = logging.getLogger(__name__)
+
+META_DATA = 'meta_data'
+CHANGE_LOG = 'change_log'
+AVAILABLE_FIELDS = 'available_fields'
+TABLE_SUPPRESSIONS = 'table_suppressions'
+FIELD_SUPPRESSIONS = 'field_suppressions'
+CONCEPT_SUPPRESSIONS = 'concept_suppressions'
+FIELD_GENERALIZATIONS = 'field_generalizations'
+CONCEPT_GENERALIZATIONS = 'concept_generalizations'
+# The sections describing the fields of tables
+FIELD_SECTIONS = [AVAILABLE_FIELDS, FIELD_SUPPRESSIONS, FIELD_GENERALIZATIONS]
+
+
+def _values(value):
+    """ Get the values of a field.  Fields of aggregated items are lists. """
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def concept_ids(value):
+    """
+    Get the concept ids of a field value.
+
+    :param value:  the loaded value of a field
+
+    :return:  a list of integer concept ids.  Integers and strings of digits
+        are concept ids.  Other values, such as 'varies', are not.
+    """
+    ids = []
+    for element in _values(value):
+        if isinstance(element, bool):
+            continue
+        if isinstance(element, integer_types):
+            ids.append(element)
+        elif isinstance(element, string_types) and element.strip().isdigit():
+            ids.append(int(element))
+    return ids
+
+
+def names(value):
+    """ Get the non empty names of a field value, such as table names. """
+    result = []
+    for element in _values(value):
+        if element is None:
+            continue
+        name = element.strip() if isinstance(element, string_types) else str(element)
+        if name:
+            result.append(name)
+    return result
+
+
+def _add(index, key, item):
+    """ Add an item to the list of items of a key. """
+    items = index.get(key)
+    if items is None:
+        index[key] = [item]
+    elif items[-1] is not item:
+        items.append(item)
+
+
+class DataDictionary(object):
+    """
+    A loaded dictionary file, indexed for lookups.
+
+    Lookups return the loaded items, which are shared and should not be
+    changed.
+
+    :param document:  the loaded yaml document of a dictionary file
+    """
+
+    def __init__(self, document):
+        start = time.time()
+        self.meta_data = (document.get(META_DATA) or [{}])[0]
+        self.sections = {}
+        for section in document.get(compiled_schema.TRANSFORMATIONS) or []:
+            for title, items in viewitems(section):
+                self.sections[title] = items or []
+
+        self.suppressed_concepts = self._concept_index(CONCEPT_SUPPRESSIONS, 'concept_id')
+        self.generalized_concepts = self._concept_index(CONCEPT_GENERALIZATIONS, 'concept_id')
+        self.generalization_inputs = self._concept_index(CONCEPT_GENERALIZATIONS,
+                                                         'input_concept_id')
+        self.generalized_outputs, self.scoped_outputs = self._output_indexes()
+        self.fields = self._field_index()
+        self.suppressed_tables = {}
+        for item in self.sections.get(TABLE_SUPPRESSIONS, []):
+            for table in names(item.get('relevant_omop_table')):
+                _add(self.suppressed_tables, table, item)
+        self.changes = {}
+        for item in self.sections.get(CHANGE_LOG, []):
+            for change_number in names(item.get('change_number')):
+                self.changes.setdefault(change_number, item)
+
+        LOGGER.debug("Indexed dictionary in %.3f seconds", time.time() - start)
+
+    def _concept_index(self, section, field):
+        """
+        Index the items of a section by the concept ids of a field.
+
+        :return:  a dictionary of concept ids to lists of items
+        """
+        index = {}
+        for item in self.sections.get(section, []):
+            for concept_id in concept_ids(item.get(field)):
+                _add(index, concept_id, item)
+        return index
+
+    def _output_indexes(self):
+        """
+        Index the generalized output concept of each input concept.
+
+        The same input, such as a skipped answer, may be generalized to
+        different outputs for different concepts, so outputs are also
+        indexed by the concept and input.  Items with several output
+        concepts, as aggregated items may have, do not say which input has
+        which output and are not indexed.
+
+        :return:  a tuple of dictionaries of input concept ids, and of
+            (concept id, input concept id) tuples, to lists of distinct output
+            concept ids, in the order of the file
+        """
+        outputs_index = {}
+        scoped_index = {}
+        for item in self.sections.get(CONCEPT_GENERALIZATIONS, []):
+            outputs = concept_ids(item.get('generalized_output_concept_id'))
+            if len(outputs) != 1:
+                continue
+            scopes = concept_ids(item.get('concept_id'))
+            for input_id in concept_ids(item.get('input_concept_id')):
+                keys = [(outputs_index, input_id)]
+                keys.extend((scoped_index, (concept_id, input_id)) for concept_id in scopes)
+                for index, key in keys:
+                    output_ids = index.setdefault(key, [])
+                    if outputs[0] not in output_ids:
+                        output_ids.append(outputs[0])
+        return outputs_index, scoped_index
+
+    def _field_index(self):
+        """
+        Index the items of the field sections by table and field name.
+
+        :return:  a dictionary of (table, field name) tuples to dictionaries
+            of section names to lists of items
+        """
+        index = {}
+        for section in FIELD_SECTIONS:
+            for item in self.sections.get(section, []):
+                for table in names(item.get('relevant_omop_table')):
+                    for field_name in names(item.get('field_name')):
+                        _add(index.setdefault((table, field_name), {}), section, item)
+        return index
+
+    def is_suppressed(self, concept_id):
+        """ True if rows with the concept are suppressed. """
+        return concept_id in self.suppressed_concepts
+
+    def suppressions(self, concept_id):
+        """ Get the concept suppression items of a concept. """
+        return self.suppressed_concepts.get(concept_id, [])
+
+    def generalizations(self, concept_id):
+        """ Get the concept generalization items of a concept. """
+        return self.generalized_concepts.get(concept_id, [])
+
+    def generalization_rules(self, input_concept_id):
+        """ Get the concept generalization items generalizing an input concept. """
+        return self.generalization_inputs.get(input_concept_id, [])
+
+    def generalized_output(self, input_concept_id, concept_id=None, default=None):
+        """
+        Get the concept an input concept is generalized to.
+
+        :param input_concept_id:  the concept id of a value
+        :param concept_id:  if given, the concept the value is recorded for,
+            such as the question of an answer.  Only its generalizations
+            are used.
+        :param default:  returned if the concept is not generalized
+
+        :return:  the generalized output concept id.  If several items
+            generalize the input, the output of the first.
+        """
+        if concept_id is None:
+            outputs = self.generalized_outputs.get(input_concept_id)
+        else:
+            outputs = self.scoped_outputs.get((concept_id, input_concept_id))
+        return outputs[0] if outputs else default
+
+    def field(self, table, field_name, section=None):
+        """
+        Get the items describing a field of a table.
+
+        The table suppression items of the table describe each of its fields.
+
+        :param table:  the relevant omop table, such as 'observation'
+        :param field_name:  the field name, such as 'value_source_concept_id'
+        :param section:  if given, the name of one of FIELD_SECTIONS or
+            TABLE_SUPPRESSIONS
+
+        :return:  the list of items of the section, or if section is None,
+            a dictionary of section names to lists of items
+        """
+        if section == TABLE_SUPPRESSIONS:
+            return self.suppressed_tables.get(table, [])
+        sections = self.fields.get((table, field_name), {})
+        if section is not None:
+            return sections.get(section, [])
+        if table in self.suppressed_tables:
+            sections = dict(sections)
+            sections[TABLE_SUPPRESSIONS] = self.suppressed_tables[table]
+        return sections
+
+    def is_field_suppressed(self, table, field_name):
+        """ True if the field of the table, or the whole table, is suppressed. """
+        return (table in self.suppressed_tables or
+                bool(self.field(table, field_name, FIELD_SUPPRESSIONS)))
+
+    def is_table_suppressed(self, table):
+        """ True if the table is suppressed. """
+        return table in self.suppressed_tables
+
+    def change(self, change_number):
+        """ Get the change log item of a change number, or None. """
+        return self.changes.get(change_number)
+
+
+def load_document(dict_path):
+    """
+    Load the yaml document of a dictionary file.
+
+    The file is loaded with the libyaml loader, when it is available.
+
+    :param dict_path:  the path to a generated dictionary file
+
+    :return:  the loaded document
+    """
+    start = time.time()
+    with io.open(dict_path, 'rb') as dict_file:
+        document = yaml.load(dict_file, Loader=compiled_schema.SAFE_LOADER)
+    LOGGER.debug("Loaded %s in %.3f seconds", dict_path, time.time() - start)
+    return document
+
+
+def load(dict_path):
+    """
+    Load and index a dictionary file.
+
+    :param dict_path:  the path to a generated dictionary file
+
+    :return:  a DataDictionary
+    """
+    return DataDictionary(load_document(dict_path))
@@ -0,0 +1,124 @@
+"""
+Module providing compact row records for processed tab contents.
+
+A TabSchema is created once per tab from the field names of the header row
+and the tab's default field values.  Each row is stored as a slotted record
+holding a tuple of its cell values, instead of a dictionary holding a list
+for every cell.  Records provide a read only dictionary interface, so they can
+be used where the dictionaries were.
+"""
+# Python imports
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+# Third party imports
+
+# Project imports
+
+
+class _Marker(object):
+    """ A named placeholder stored in record values. """
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+# The field is not in the row, and has no default value
+MISSING = _Marker('MISSING')
+# The field is not in the row, and uses the tab's default value
+DEFAULT = _Marker('DEFAULT')
+
+
+class TabSchema(object):
+    """
+    The fields and default values shared by the rows of a tab.
+
+    Keys are ordered as the row dictionaries were: default fields first, then
+    any other header fields in column order.
+
+    :param fields:  the normalized field names of the header row
+    :param init_fields:  a dictionary of field names to default values.  Each
+        default value is a list holding the default cell value.
+    """
+
+    def __init__(self, fields, init_fields=None):
+        self.fields = fields
+        self.defaults = dict(init_fields or {})
+        self.keys = list(self.defaults)
+        for field in fields:
+            if field not in self.defaults and field not in self.keys:
+                self.keys.append(field)
+        self.key_index = {key: index for index, key in enumerate(self.keys)}
+
+        # the record slot each column is stored in
+        self.column_slots = [self.key_index[field] for field in fields]
+        self.template = [DEFAULT if key in self.defaults else MISSING for key in self.keys]
+
+    def record(self, row):
+        """
+        Create the record for a row of cell values.
+
+        :param row:  a list of the cell values of a row, in column order
+
+        :return:  a Row record
+        """
+        values = list(self.template)
+        slots = self.column_slots
+        for index, value in enumerate(row):
+            values[slots[index]] = value
+        return Row(self, tuple(values))
+
+
+class Row(Mapping):
+    """
+    A read only, dictionary like record of a processed row.
+
+    Reading a field returns a list holding the cell value, as the row
+    dictionaries did.  raw_items provides the cell values without the lists.
+    """
+    __slots__ = ('schema', 'values')
+
+    def __init__(self, schema, values):
+        self.schema = schema
+        self.values = values
+
+    def __getitem__(self, key):
+        value = self.values[self.schema.key_index[key]]
+        if value is MISSING:
+            raise KeyError(key)
+        if value is DEFAULT:
+            return self.schema.defaults[key]
+        return [value]
+
+    def __iter__(self):
+        for key, value in zip(self.schema.keys, self.values):
+            if value is not MISSING:
+                yield key
+
+    def __len__(self):
+        return len([value for value in self.values if value is not MISSING])
+
+    def __repr__(self):
+        return 'Row({!r})'.format(dict(self.items()))
+
+    def raw_items(self):
+        """
+        Get the fields and unwrapped cell values of the row.
+
+        :return:  a list of (field name, cell value) tuples in key order
+        """
+        defaults = self.schema.defaults
+        items = []
+        for key, value in zip(self.schema.keys, self.values):
+            if value is MISSING:
+                continue
+            if value is DEFAULT:
+                value = defaults[key][0]
+            items.append((key, value))
+        return items
@@ -4,22 +4,45 @@ Module responsible for creating a connection to and reading values from google s
 """
 
 # Python imports
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import copy
 import logging
 import os.path
 import pickle
+import socket
+import threading
+import time
 
 # Third party imports
 from future.utils import viewitems
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from google.oauth2 import service_account
 
 # Project imports
 from cdr_data_dictionary import constants as consts
+from cdr_data_dictionary import projection
 
 LOGGER = logging.getLogger(__name__)
 
+# Field mask limiting spreadsheets().get responses to cell values and links
+GRID_FIELDS = 'sheets(properties/title,data/rowData/values(formattedValue,hyperlink))'
+# Field mask limiting spreadsheets().get responses to the size of each tab
+SIZE_FIELDS = 'sheets.properties(title,gridProperties(rowCount,columnCount))'
+
+# Errors that cause a chunk of a tab to be read again.  HttpErrors are only
+# retried for the RETRY_STATUSES and server errors.
+RETRY_ERRORS = (HttpError, httplib2.HttpLib2Error, socket.error)
+# Http statuses below 500 that are retried
+RETRY_STATUSES = frozenset([429])
+# Seconds waited before the first retry.  Doubles with each retry.
+RETRY_DELAY = 1.0
+
 def create_drive_credentials(key_filepath):
     """
     Read or create user credentials as needed.
@@ -94,40 +117,589 @@ def create_meta_data_service(credentials=None):
     return build('drive', 'v3', credentials=credentials, cache_discovery=False)
 
 
-def read_sheet_values(service, args, render_option='FORMATTED_VALUE'):
+def _get_cell_ranges(args):
+    """
+    Determine which sections of the spreadsheet should be read.
+
+    :param args:  command line arguments describing which sheet to read.  It
+        can limit reading values to a range of values or to a tab within a sheet.
+
+    :return:  a list of A1 notation ranges.  Each range is a tab name or a
+        tab name and a range of cells within the tab.
+    """
+    if args.range is None and args.sheet_name is not consts.ALL:
+        return [args.sheet_name]
+
+    if args.sheet_name is consts.ALL:
+        return consts.SHEET_NAMES
+
+    return [args.sheet_name + '!' + args.range]
+
+
+def create_http_factory(credentials=None):
+    """
+    Use credentials to create a factory of authorized http clients.
+
+    The httplib2 client used by the built service objects is not thread safe.
+    Each thread making requests needs its own client.
+
+    :param credentials:  Credentials used to authorize the http clients.
+
+    :return:  a callable that creates a new authorized http client each
+        time it is called.
+    """
+    if not credentials:
+        raise RuntimeError("No credentials provided to create http clients")
+
+    def http_factory():
+        """ Create a new authorized http client. """
+        return AuthorizedHttp(credentials, http=httplib2.Http())
+
+    return http_factory
+
+
+def _thread_clients(http_factory):
+    """
+    Create a getter of http clients that are not shared between threads.
+
+    :param http_factory:  a callable creating thread safe http clients
+
+    :return:  a callable returning the http client owned by the calling
+        thread.  The client is created the first time the thread asks for it.
+    """
+    thread_data = threading.local()
+
+    def thread_http():
+        """ Get the http client owned by the current thread. """
+        http = getattr(thread_data, 'http', None)
+        if http is None:
+            http = http_factory()
+            thread_data.http = http
+        return http
+
+    return thread_http
+
+
+def _read_range(sheet, args, cell_range, render_option, http=None):
+    """
+    Read the values of a single range of the spreadsheet.
+
+    :param sheet:  The google sheets spreadsheets resource to use for reading
+    :param args:  command line arguments identifying the spreadsheet.
+    :param cell_range:  the tab name or range to read, in A1 notation
+    :param render_option:  how to read the spreadsheet values.
+    :param http:  the http client to execute the request with.  If None, the
+        client of the service object is used.
+
+    :return:  a tuple of the range and the list of rows read.
+    """
+    request = sheet.values().get(
+        spreadsheetId=args.spreadsheet_id,
+        range=cell_range,
+        majorDimension='ROWS',
+        valueRenderOption=render_option
+    )
+
+    if http is None:
+        result = request.execute()
+    else:
+        result = request.execute(http=http)
+
+    values = result.get('values', [])
+    return (cell_range, values)
+
+
+def _column_letters(column_count):
+    """
+    Get the A1 notation letters of a column.
+
+    :param column_count:  the one based column number
+
+    :return:  the column letters, such as 'A', 'Q', or 'AB'
+    """
+    letters = ''
+    while column_count > 0:
+        column_count, remainder = divmod(column_count - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def _quote_sheet_name(sheet_name):
+    """ Quote a sheet name for use in an A1 notation range. """
+    return "'" + sheet_name.replace("'", "''") + "'"
+
+
+def read_sheet_sizes(sheet, args):
+    """
+    Read the number of rows and columns of each tab.
+
+    :param sheet:  The google sheets spreadsheets resource to use for reading
+    :param args:  command line arguments identifying the spreadsheet.
+
+    :return:  a dictionary of tab names to a tuple of the row and column counts
+    """
+    result = sheet.get(spreadsheetId=args.spreadsheet_id, fields=SIZE_FIELDS).execute()
+
+    sizes = {}
+    for sheet_data in result.get('sheets', []):
+        properties = sheet_data.get('properties', {})
+        grid = properties.get('gridProperties', {})
+        sizes[properties.get('title')] = (grid.get('rowCount', 0), grid.get('columnCount', 0))
+    return sizes
+
+
+def partition_ranges(cell_list, sizes, chunk_rows):
+    """
+    Split tabs into ranges of at most chunk_rows rows.
+
+    :param cell_list:  the tab names to read
+    :param sizes:  a dictionary of tab names to their row and column counts
+    :param chunk_rows:  the maximum number of rows read by a single request
+
+    :return:  a list of (tab name, chunk range, chunk row count) tuples, in
+        reading order.  Tabs that fit in a single chunk, or whose size is
+        unknown, are read whole.
+    """
+    chunks = []
+    for cell_range in cell_list:
+        row_count, column_count = sizes.get(cell_range, (0, 0))
+        if row_count <= chunk_rows or not column_count:
+            chunks.append((cell_range, cell_range, row_count))
+            continue
+
+        sheet_name = _quote_sheet_name(cell_range)
+        last_column = _column_letters(column_count)
+        for first_row in range(1, row_count + 1, chunk_rows):
+            last_row = min(first_row + chunk_rows - 1, row_count)
+            chunk_range = '{}!A{}:{}{}'.format(sheet_name, first_row, last_column, last_row)
+            chunks.append((cell_range, chunk_range, last_row - first_row + 1))
+
+    return chunks
+
+
+def _is_transient(error):
+    """
+    Check whether a failed request may succeed if it is repeated.
+
+    Rate limits, server errors, and connection errors are transient.  Other
+    http errors, such as a missing range, fail the same way every time.
+
+    :param error:  one of the RETRY_ERRORS
+    """
+    if not isinstance(error, HttpError):
+        return True
+    status = int(getattr(error.resp, 'status', 0) or 0)
+    return status in RETRY_STATUSES or status >= 500
+
+
+def _read_chunk(sheet, args, chunk_range, render_option, http=None,
+                retries=consts.DEFAULT_CHUNK_RETRIES):
+    """
+    Read a single range, retrying it on its own if the request fails.
+
+    Only transient failures are retried.  Other failures are raised at once.
+
+    :param retries:  the number of times a failed request is repeated
+
+    :return:  the list of rows read
+    """
+    attempt = 0
+    while True:
+        try:
+            return _read_range(sheet, args, chunk_range, render_option, http)[1]
+        except RETRY_ERRORS as error:
+            if attempt >= retries or not _is_transient(error):
+                raise
+            delay = RETRY_DELAY * 2 ** attempt
+            attempt += 1
+            LOGGER.warning("Failed to read %s.  Retry %d of %d in %.1f seconds.",
+                           chunk_range, attempt, retries, delay, exc_info=True)
+            time.sleep(delay)
+
+
+def _assemble_chunks(cell_list, chunks, chunk_values):
+    """
+    Join the rows of each tab's chunks, in order.
+
+    Each chunk's trailing empty rows are omitted by the api.  All but the last
+    chunk of a tab are padded back to their full size, so the rows of later
+    chunks keep their position.
+
+    :return:  a list of (tab name, rows) tuples in the cell_list order
+    """
+    tab_rows = {cell_range: [] for cell_range in cell_list}
+    for (cell_range, _, row_count), values in zip(chunks, chunk_values):
+        rows = tab_rows[cell_range]
+        rows.extend(values)
+        rows.extend([] for _ in range(row_count - len(values)))
+
+    results = []
+    for cell_range in cell_list:
+        rows = tab_rows[cell_range]
+        while rows and not rows[-1]:
+            rows.pop()
+        results.append((cell_range, rows))
+    return results
+
+
+def read_sheet_values(service, args, render_option='FORMATTED_VALUE', http_factory=None,
+                      sizes=None):
     """
     Read the values of the spreadsheet.
 
+    If args.fetch_workers is greater than one and an http_factory is given,
+    the tabs are read concurrently by a pool of that many threads.  Each
+    thread reads with its own http client.
+
+    If args.chunk_rows is set and whole tabs are read, the size of each tab is
+    read first.  Tabs with more rows are read as A1 row ranges of at most that
+    many rows, which are read concurrently like tabs.  A failed chunk is
+    retried on its own.  The chunks of a tab are joined in order, so the
+    header row is only read with the first chunk.
+
     :param service:  The google sheets service to use for reading
     :param args:  command line arguments describing which sheet to read.  It
         can limit reading values to a range of values or to a tab within a sheet.
     :param render_option:  how to read the spreadsheet values.  May be either
         'FORMATTED_VALUE', 'UNFORMATTED_VALUE', 'FORMULA'.
+    :param http_factory:  a callable creating thread safe http clients.  Required
+        to read concurrently.
+    :param sizes:  the tab sizes from read_sheet_sizes, if they were already
+        read.  Only used to read chunks.
 
     :return a list of values read for each defined section of the sheet.  Sections
-        are tabs or ranges.
+        are tabs or ranges.  Sections are always returned in the requested order.
     """
     sheet = service.spreadsheets()
-
-    if args.range is None and args.sheet_name is not consts.ALL:
-        cell_list = [args.sheet_name]
-    elif args.sheet_name is consts.ALL:
-        cell_list = consts.SHEET_NAMES
+    cell_list = _get_cell_ranges(args)
+    chunk_rows = getattr(args, 'chunk_rows', None)
+
+    if chunk_rows and args.range is None:
+        if sizes is None:
+            sizes = read_sheet_sizes(sheet, args)
+        chunks = partition_ranges(cell_list, sizes, chunk_rows)
+        LOGGER.debug("Reading %d tabs as %d ranges", len(cell_list), len(chunks))
     else:
-        cell_list = [args.sheet_name + '!' + args.range]
+        chunks = None
+
+    reads = [chunk[1] for chunk in chunks] if chunks else cell_list
+    workers = min(getattr(args, 'fetch_workers', None) or 1, len(reads))
+
+    if workers < 2 or http_factory is None:
+        if chunks:
+            chunk_values = [_read_chunk(sheet, args, chunk_range, render_option)
+                            for chunk_range in reads]
+            return _assemble_chunks(cell_list, chunks, chunk_values)
+
+        return [_read_range(sheet, args, cell_range, render_option)
+                for cell_range in cell_list]
+
+    thread_http = _thread_clients(http_factory)
+
+    def read_range(cell_range):
+        """ Read a range with the http client owned by the current thread. """
+        return _read_range(sheet, args, cell_range, render_option, thread_http())
+
+    def read_chunk(chunk_range):
+        """ Read a chunk with the http client owned by the current thread. """
+        return _read_chunk(sheet, args, chunk_range, render_option, thread_http())
+
+    LOGGER.debug("Reading %d ranges with %d workers", len(reads), workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # map returns results in submission order, regardless of which
+        # request finishes first
+        if chunks:
+            chunk_values = list(executor.map(read_chunk, reads))
+            return _assemble_chunks(cell_list, chunks, chunk_values)
+
+        results = list(executor.map(read_range, cell_list))
+
+    return results
+
+
+def iter_sheet_tabs(service, args, http_factory=None):
+    """
+    Generator reading the values and formulas of the spreadsheet one tab at a time.
+
+    Each tab is read as read_sheet_values reads it, so --chunk-rows chunks
+    are still read concurrently within a tab.  The sections read are the
+    sections read_sheet_values reads, and the tab sizes used to read chunks
+    are read once.
+
+    Without chunks, args.fetch_workers tabs are read ahead concurrently.
+    Otherwise, the next tab is only read when the generator is advanced.
+    Either way, at most fetch_workers tabs are held before they are yielded.
+
+    :param service:  The google sheets service to use for reading
+    :param args:  command line arguments describing which sheet to read.
+    :param http_factory:  a callable creating thread safe http clients.  Required
+        to read concurrently.
+
+    :return:  yields a tuple of the form (tab_name, values, formulas) for each
+        section of the sheet, in the order of read_sheet_values.
+    """
+    sizes = None
+    if getattr(args, 'chunk_rows', None) and args.range is None:
+        sizes = read_sheet_sizes(service.spreadsheets(), args)
+
+    cell_list = _get_cell_ranges(args)
+    workers = min(getattr(args, 'fetch_workers', None) or 1, len(cell_list))
+    if sizes is None and workers > 1 and http_factory is not None:
+        sheet = service.spreadsheets()
+        thread_http = _thread_clients(http_factory)
+
+        def read_tab(cell_range):
+            """ Read a whole tab with the http client owned by the current thread. """
+            http = thread_http()
+            _, values = _read_range(sheet, args, cell_range, 'FORMATTED_VALUE', http)
+            _, formulas = _read_range(sheet, args, cell_range, 'FORMULA', http)
+            return (cell_range, values, formulas)
+
+        LOGGER.debug("Reading %d tabs ahead with %d workers", len(cell_list), workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for cell_range in cell_list:
+                pending.append(executor.submit(read_tab, cell_range))
+                if len(pending) >= workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        return
 
-    results = []
     for cell_range in cell_list:
-        result = sheet.values().get(
+        # each tab is read as the single section read_sheet_values reads for it
+        tab_args = copy.copy(args)
+        tab_args.sheet_name, _, tab_range = cell_range.partition('!')
+        tab_args.range = tab_range or None
+        if sizes is None:
+            tab_args.chunk_rows = None
+        values = read_sheet_values(service, tab_args, http_factory=http_factory, sizes=sizes)
+        formulas = read_sheet_values(service, tab_args, render_option='FORMULA',
+                                     http_factory=http_factory, sizes=sizes)
+        yield (values[0][0], values[0][1], formulas[0][1])
+
+
+def batch_read_sheet_values(service, args, render_option='FORMATTED_VALUE'):
+    """
+    Read the values of the spreadsheet using as few requests as possible.
+
+    All requested ranges are read with a single batchGet request.  If
+    args.batch_size is set, the ranges are split across requests of at most
+    that many ranges to keep each response under the payload limit.
+
+    :param service:  The google sheets service to use for reading
+    :param args:  command line arguments describing which sheet to read.  It
+        can limit reading values to a range of values or to a tab within a sheet.
+    :param render_option:  how to read the spreadsheet values.  May be either
+        'FORMATTED_VALUE', 'UNFORMATTED_VALUE', 'FORMULA'.
+
+    :return a list of values read for each defined section of the sheet.  Sections
+        are tabs or ranges.  Identical in form to the read_sheet_values output.
+    """
+    sheet = service.spreadsheets()
+    cell_list = _get_cell_ranges(args)
+    batch_size = getattr(args, 'batch_size', None) or len(cell_list)
+
+    results = []
+    for start in range(0, len(cell_list), batch_size):
+        batch = cell_list[start:start + batch_size]
+        result = sheet.values().batchGet(
             spreadsheetId=args.spreadsheet_id,
-            range=cell_range,
+            ranges=batch,
             majorDimension='ROWS',
             valueRenderOption=render_option
         ).execute()
 
-        values = result.get('values', [])
-        results.append((cell_range, values))
+        # value ranges are returned in the order they were requested.  the
+        # returned range names are normalized A1 notation, so the requested
+        # names are used to identify the tabs.
+        value_ranges = result.get('valueRanges', [])
+        for cell_range, value_range in zip(batch, value_ranges):
+            results.append((cell_range, value_range.get('values', [])))
+
+    LOGGER.debug("Read %d ranges using %d batch requests",
+                 len(results), (len(cell_list) + batch_size - 1) // batch_size)
+    return results
+
+
+def _pick_cell_value(cell):
+    """
+    Choose the value of a single grid data cell.
+
+    External hyperlinks replace the displayed value of the cell, as they do
+    when values are merged with formulas.  All other cells keep their
+    formatted value.
+
+    :param cell:  a CellData dictionary holding at most the formattedValue
+        and hyperlink fields.
+
+    :return:  the value of the cell
+    """
+    link = cell.get('hyperlink')
+    if link:
+        link = link.strip()
+        if link.startswith('http'):
+            return link
+
+    return cell.get('formattedValue', '')
+
+
+def _grid_rows(grid_data):
+    """
+    Turn the grid data of a range into rows of values.
+
+    Trailing empty cells and rows are removed, so the rows have the same
+    shape as rows read with values().get.
+
+    :param grid_data:  a GridData dictionary of the range
+
+    :return:  a list of rows.  Each row is a list of cell values.
+    """
+    rows = []
+    for row_data in grid_data.get('rowData', []):
+        row = [_pick_cell_value(cell) for cell in row_data.get('values', [])]
+        while row and row[-1] == '':
+            row.pop()
+        rows.append(row)
+
+    while rows and not rows[-1]:
+        rows.pop()
+
+    return rows
+
+
+def read_sheet_grid(service, args):
+    """
+    Read the values and hyperlinks of the spreadsheet in one pass.
+
+    The displayed value and hyperlink target of every cell are read together
+    with spreadsheets().get, limited by a field mask to just those fields.
+    External hyperlinks replace the displayed value of their cell, so the
+    values do not need to be merged with a second read of the formulas.
+    Unlike the formula merge, links added to a cell without the HYPERLINK
+    function are also used.
+
+    If args.batch_size is set, the ranges are split across requests of at most
+    that many ranges.
+
+    :param service:  The google sheets service to use for reading
+    :param args:  command line arguments describing which sheet to read.  It
+        can limit reading values to a range of values or to a tab within a sheet.
+
+    :return a list of values read for each defined section of the sheet.  Sections
+        are tabs or ranges.  Identical in form to the read_sheet_values output.
+    """
+    sheet = service.spreadsheets()
+    cell_list = _get_cell_ranges(args)
+    batch_size = getattr(args, 'batch_size', None) or len(cell_list)
+
+    results = []
+    for start in range(0, len(cell_list), batch_size):
+        batch = cell_list[start:start + batch_size]
+        result = sheet.get(
+            spreadsheetId=args.spreadsheet_id,
+            ranges=batch,
+            includeGridData=True,
+            fields=GRID_FIELDS
+        ).execute()
+
+        # sheets are returned in spreadsheet order, not request order.  each
+        # sheet holds the grid data of its requested ranges, in request order.
+        grids = {}
+        for sheet_data in result.get('sheets', []):
+            title = sheet_data.get('properties', {}).get('title')
+            grids[title] = list(sheet_data.get('data', []))
+
+        for cell_range in batch:
+            grid_data = grids[cell_range.split('!')[0]].pop(0)
+            results.append((cell_range, _grid_rows(grid_data)))
+
+    LOGGER.debug("Read %d ranges with hyperlinks using %d requests",
+                 len(results), (len(cell_list) + batch_size - 1) // batch_size)
+    return results
+
+
+def read_projected_ranges(service, args, select_columns):
+    """
+    Find the column ranges to read for a projection.
+
+    The header row of every tab is read with a single batch request.
 
+    :param service:  The google sheets service to use for reading
+    :param args:  command line arguments describing which sheet to read.
+    :param select_columns:  a callable taking a tab name and its header row
+        and returning a sorted list of the column indexes to read, or None to
+        read the whole tab.
+
+    :return:  a list of (tab name, column ranges) tuples.  The column ranges
+        are (first index, last index) tuples, or None to read the whole tab.
+    """
+    cell_list = _get_cell_ranges(args)
+    header_ranges = [_quote_sheet_name(cell_range) + '!1:1' for cell_range in cell_list]
+    result = service.spreadsheets().values().batchGet(
+        spreadsheetId=args.spreadsheet_id,
+        ranges=header_ranges,
+        majorDimension='ROWS',
+        valueRenderOption='FORMATTED_VALUE'
+    ).execute()
+
+    tab_ranges = []
+    for cell_range, value_range in zip(cell_list, result.get('valueRanges', [])):
+        header = (value_range.get('values') or [[]])[0]
+        indexes = select_columns(cell_range, header)
+        ranges = projection.column_ranges(indexes) if indexes is not None else None
+        tab_ranges.append((cell_range, ranges))
+    return tab_ranges
+
+
+def read_projected_values(service, args, tab_ranges, render_option='FORMATTED_VALUE'):
+    """
+    Read only the projected columns of each tab.
+
+    Every column range of every tab is read with a single batch request.
+    Values are returned at their original column positions, so the rows can
+    be used like rows read whole.
+
+    :param service:  The google sheets service to use for reading
+    :param args:  command line arguments identifying the spreadsheet.
+    :param tab_ranges:  the read_projected_ranges result
+    :param render_option:  how to read the spreadsheet values.
+
+    :return a list of values read for each tab.  Identical in form to the
+        read_sheet_values output.
+    """
+    requested = []
+    for cell_range, ranges in tab_ranges:
+        if ranges is None:
+            requested.append(cell_range)
+            continue
+        sheet_name = _quote_sheet_name(cell_range)
+        for first, last in ranges:
+            requested.append('{}!{}:{}'.format(sheet_name, _column_letters(first + 1),
+                                                _column_letters(last + 1)))
+
+    result = service.spreadsheets().values().batchGet(
+        spreadsheetId=args.spreadsheet_id,
+        ranges=requested,
+        majorDimension='ROWS',
+        valueRenderOption=render_option
+    ).execute()
+    range_values = [value_range.get('values', [])
+                    for value_range in result.get('valueRanges', [])]
+
+    results = []
+    position = 0
+    for cell_range, ranges in tab_ranges:
+        if ranges is None:
+            results.append((cell_range, range_values[position]))
+            position += 1
+            continue
+        rows = projection.join_column_ranges(
+            range_values[position:position + len(ranges)], ranges)
+        results.append((cell_range, rows))
+        position += len(ranges)
+
+    LOGGER.debug("Read %d tabs as %d column ranges", len(results), len(requested))
     return results
 
 
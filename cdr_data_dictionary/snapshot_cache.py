@@ -0,0 +1,204 @@
+"""
+Module responsible for caching the raw values read from the spreadsheet.
+
+Snapshots of the raw values and formulas are stored on disk, keyed by the
+spreadsheet id and the Google Drive version of the document.  An unchanged
+document can then be regenerated without reading it from the Sheets API again.
+The cache is limited in size.  The least recently used snapshots are evicted
+first.
+
+A snapshot is a gzipped file with one json line for each tab, holding the tab
+name, its values, and its formulas.  Tabs are written as they are read, so a
+snapshot of tabs read one at a time never holds every tab in memory.
+"""
+# Python imports
+import gzip
+import hashlib
+import json
+import logging
+import os
+
+# Third party imports
+
+# Project imports
+
+LOGGER = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = '.json.gz'
+
+
+def snapshot_key(args, meta_data):
+    """
+    Create the cache key identifying a snapshot.
+
+    The key changes whenever the document version changes, or when a
+    different part of the document is read, including a different column
+    projection.  Hyperlink fetches store values with their links already
+    applied and empty formulas, so they are keyed apart from other fetches.
+    Batch fetches store the same values and formulas as single range
+    fetches, and share their snapshots.
+
+    :param args:  command line arguments identifying the spreadsheet and the
+        sheet name, range, columns, and fetch mode that were read.
+    :param meta_data:  the flattened drive meta data for the spreadsheet.
+
+    :return:  a string safe to use as a file name.
+    """
+    selection = [args.sheet_name, args.range]
+    if getattr(args, 'columns', None):
+        selection.append(args.columns)
+    if getattr(args, 'hyperlink_fetch', False):
+        selection.append('hyperlink_fetch')
+    selection = json.dumps(selection)
+    digest = hashlib.sha1(selection.encode('utf-8')).hexdigest()[:12]
+    return '{}_{}_{}'.format(args.spreadsheet_id, meta_data.get('version'), digest)
+
+
+def _snapshot_path(cache_dir, key):
+    """ Get the file path of a snapshot. """
+    return os.path.join(cache_dir, key + SNAPSHOT_SUFFIX)
+
+
+def load_snapshot(cache_dir, key):
+    """
+    Read a cached snapshot.
+
+    Reading a snapshot marks it as the most recently used snapshot.
+
+    :param cache_dir:  directory holding the cached snapshots
+    :param key:  the snapshot key, from snapshot_key
+
+    :return:  a tuple of the values and formulas lists if the snapshot
+        exists.  Otherwise, None.
+    """
+    path = _snapshot_path(cache_dir, key)
+    values = []
+    formulas = []
+    try:
+        with gzip.open(path, 'rb') as snapshot:
+            for line in snapshot:
+                tab_name, tab_values, tab_formulas = json.loads(line.decode('utf-8'))
+                values.append((tab_name, tab_values))
+                formulas.append((tab_name, tab_formulas))
+    except (IOError, OSError, ValueError):
+        LOGGER.debug("No usable snapshot for: %s", key)
+        return None
+
+    # update the modified time so eviction is least recently used
+    os.utime(path, None)
+    LOGGER.info("Using cached snapshot: %s", path)
+    return (values, formulas)
+
+
+class SnapshotWriter(object):
+    """
+    Write a snapshot one tab at a time.
+
+    Tabs are written to a temporary file as they are added.  The snapshot is
+    only stored under its key when it is closed, so readers never see a
+    partially written snapshot.
+
+    :param cache_dir:  directory holding the cached snapshots
+    :param key:  the snapshot key, from snapshot_key
+    :param max_bytes:  the maximum size of the cache directory.  If None, the
+        cache is not limited.
+    """
+
+    def __init__(self, cache_dir, key, max_bytes=None):
+        try:
+            os.makedirs(cache_dir)
+        except OSError:
+            # path already exists.  moving on.
+            pass
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.path = _snapshot_path(cache_dir, key)
+        self.temp_path = self.path + '.tmp'
+        self.snapshot = gzip.open(self.temp_path, 'wb')
+
+    def write_tab(self, tab_name, values, formulas):
+        """
+        Add the values and formulas of a tab to the snapshot.
+
+        :param tab_name:  the name of the tab
+        :param values:  the rows of values read from the tab
+        :param formulas:  the rows of formulas read from the tab
+        """
+        line = json.dumps([tab_name, values, formulas]) + '\n'
+        self.snapshot.write(line.encode('utf-8'))
+
+    def close(self):
+        """
+        Store the snapshot in the cache and evict old snapshots if needed.
+
+        :return:  the path of the written snapshot.
+        """
+        self.snapshot.close()
+        # replacing keeps readers from seeing a partially written snapshot
+        os.rename(self.temp_path, self.path)
+        LOGGER.info("Cached snapshot: %s", self.path)
+
+        if self.max_bytes is not None:
+            evict(self.cache_dir, self.max_bytes, keep=self.path)
+
+        return self.path
+
+    def discard(self):
+        """ Remove a snapshot that was not completely written. """
+        self.snapshot.close()
+        os.remove(self.temp_path)
+
+
+def save_snapshot(cache_dir, key, values, formulas, max_bytes=None):
+    """
+    Write a snapshot to the cache and evict old snapshots if needed.
+
+    :param cache_dir:  directory holding the cached snapshots
+    :param key:  the snapshot key, from snapshot_key
+    :param values:  the [(tab_name, rows)] values read from the spreadsheet
+    :param formulas:  the [(tab_name, rows)] formulas read from the spreadsheet
+    :param max_bytes:  the maximum size of the cache directory.  If None, the
+        cache is not limited.
+
+    :return:  the path of the written snapshot.
+    """
+    writer = SnapshotWriter(cache_dir, key, max_bytes)
+    for (tab_name, tab_values), (_, tab_formulas) in zip(values, formulas):
+        writer.write_tab(tab_name, tab_values, tab_formulas)
+    return writer.close()
+
+
+def evict(cache_dir, max_bytes, keep=None):
+    """
+    Remove least recently used snapshots until the cache fits in max_bytes.
+
+    :param cache_dir:  directory holding the cached snapshots
+    :param max_bytes:  the maximum size of the cache directory
+    :param keep:  path of a snapshot that is never evicted
+
+    :return:  a list of evicted snapshot paths
+    """
+    snapshots = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(SNAPSHOT_SUFFIX):
+            path = os.path.join(cache_dir, name)
+            stats = os.stat(path)
+            snapshots.append((stats.st_mtime, stats.st_size, path))
+
+    # oldest first
+    snapshots.sort()
+    total = sum(size for _, size, _ in snapshots)
+
+    evicted = []
+    for _, size, path in snapshots:
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        os.remove(path)
+        total -= size
+        evicted.append(path)
+        LOGGER.info("Evicted cached snapshot: %s", path)
+
+    return evicted
@@ -0,0 +1,122 @@
+"""
+Module responsible for converting date and time values read from the spreadsheet.
+
+Values are parsed with the formats the spreadsheet and drive meta data are
+known to use before falling back to the much slower dateutil parser.  Results
+are memoized in a bounded cache, since the same dates repeat across many rows.
+"""
+# Python imports
+from collections import OrderedDict
+from datetime import datetime
+import logging
+
+# Third party imports
+from dateutil import parser as dt_parser
+
+# Project imports
+from cdr_data_dictionary import constants as consts
+
+LOGGER = logging.getLogger(__name__)
+
+# Maximum number of converted values remembered
+CACHE_SIZE = 4096
+
+# Formats tried, in order, before falling back to dateutil
+KNOWN_FORMATS = (
+    consts.DATE_FORMAT,
+    consts.DATETIME_FORMAT,
+    '%m/%d/%Y',
+    '%m/%d/%Y %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S.%fZ',
+    '%Y-%m-%dT%H:%M:%SZ',
+)
+
+
+class TemporalConverter(object):
+    """
+    Memoizing converter of date and time strings.
+
+    :param cache_size:  the maximum number of converted values remembered.
+        The least recently used values are forgotten first.
+    :param formats:  the strptime formats tried before falling back to
+        dateutil.
+    """
+
+    def __init__(self, cache_size=CACHE_SIZE, formats=KNOWN_FORMATS):
+        self.cache_size = cache_size
+        self.formats = formats
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+    def parse(self, value):
+        """
+        Parse a date or time string without memoization.
+
+        :param value:  the string to parse
+
+        :return:  the parsed datetime object
+
+        :raises ValueError:  raised if dateutil can not parse the value
+        :raises TypeError:  raised if the value is not a string
+        """
+        for dt_format in self.formats:
+            try:
+                return datetime.strptime(value, dt_format)
+            except ValueError:
+                continue
+
+        self.fallbacks += 1
+        return dt_parser.parse(value)
+
+    def convert(self, value, dt_format):
+        """
+        Convert a date or time string into the given output format.
+
+        :param value:  the string to convert
+        :param dt_format:  the strftime output format
+
+        :return:  the formatted date or time string
+        """
+        key = (value, dt_format)
+        try:
+            # re-inserting marks the value as most recently used
+            result = self.cache.pop(key)
+            self.cache[key] = result
+            self.hits += 1
+            return result
+        except KeyError:
+            self.misses += 1
+        except TypeError:
+            # unhashable values can not be memoized
+            return self.parse(value).strftime(dt_format)
+
+        result = self.parse(value).strftime(dt_format)
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def log_stats(self):
+        """ Log the cache hit rate and the number of dateutil fallbacks. """
+        lookups = self.hits + self.misses
+        hit_rate = 100.0 * self.hits / lookups if lookups else 0.0
+        LOGGER.debug("Temporal conversions: %d lookups, %.1f%% cache hits, "
+                     "%d dateutil fallbacks, %d cached values",
+                     lookups, hit_rate, self.fallbacks, len(self.cache))
+
+
+CONVERTER = TemporalConverter()
+
+
+def convert(value, dt_format):
+    """
+    Convert a date or time string with the shared converter.
+
+    :param value:  the string to convert
+    :param dt_format:  the strftime output format
+
+    :return:  the formatted date or time string
+    """
+    return CONVERTER.convert(value, dt_format)
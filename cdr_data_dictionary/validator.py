@@ -5,17 +5,37 @@ This modules uses a third party package, yamale, to validate the created
 yaml file against a schema defintion file.
 
 This implements a custom URL validator based on regular expressions.
+
+Run as a script, any number of files or glob patterns are validated with
+yamale, or with the compiled schema of the compiled_schema module when it is
+requested.  A report of each file is logged.
 """
 # Python imports
 from argparse import ArgumentParser
+import glob
+import io
+import logging
+import os
 import re
+import sys
 
 # Third party imports
+import yaml
 import yamale
 from yamale.validators import DefaultValidators, Validator
 
 # Project imports
+from cdr_data_dictionary import cdr_parser
+from cdr_data_dictionary import compiled_schema
 from cdr_data_dictionary import constants as consts
+from cdr_data_dictionary import yaml_logging
+
+LOGGER = logging.getLogger(__name__)
+
+# The schema definition of the meta data, which is never projected
+META_DATA_ITEM = 'meta_data_item'
+# An indented field definition of a schema item
+SCHEMA_FIELD_PATTERN = re.compile(r'^(?P<indent>\s+)(?P<field>[^\s:]+):\s+(?P<expression>.+?)\s*$')
 
 
 class URL(Validator):
@@ -46,6 +66,77 @@ def validate(schema_path, dict_path):
     yamale.validate(schema, data)
 
 
+def _optional(expression):
+    """ Make a yamale validator expression optional. """
+    if 'required=False' in expression:
+        return expression
+    if expression.endswith('()'):
+        return expression[:-1] + 'required=False)'
+    return expression[:-1] + ', required=False)'
+
+
+def _aggregatable(expression):
+    """ Make a yamale validator expression also accept a list of its values. """
+    element = expression.replace(', required=False', '').replace('required=False', '')
+    aggregated = 'any({}, list({}))'.format(element, element)
+    if 'required=False' in expression:
+        return _optional(aggregated)
+    return aggregated
+
+
+def project_schema(schema_path, fields, projected_path, aggregated=False):
+    """
+    Write a schema for a file generated with a column projection or with
+    aggregated items.
+
+    Item fields that are not projected become optional.  Projected fields
+    and meta data fields keep their validators, and fields that are not in
+    the schema are still reported.  Aggregated item fields also accept a
+    list of the values they accept.
+
+    :param schema_path:  The path to the schema defintion file.
+    :param fields:  the set of projected field names, or None if every
+        field is written
+    :param projected_path:  The path the projected schema is written to.
+        Its directory is created if it does not exist.
+    :param aggregated:  True if the file is generated with --aggregate
+
+    :return:  the projected_path
+    """
+    with io.open(schema_path, encoding='utf-8') as schema_file:
+        lines = schema_file.readlines()
+
+    projected = []
+    block = None
+    for line in lines:
+        if line[:1].strip():
+            # an unindented line starts a new schema definition
+            block = line.split(':')[0]
+
+        match = SCHEMA_FIELD_PATTERN.match(line)
+        if match and block != META_DATA_ITEM and 'include(' not in line:
+            expression = match.group('expression')
+            if aggregated:
+                expression = _aggregatable(expression)
+            if fields is not None and match.group('field') not in fields:
+                expression = _optional(expression)
+            line = u'{}{}: {}\n'.format(match.group('indent'), match.group('field'), expression)
+        projected.append(line)
+
+    projected_dir = os.path.dirname(projected_path)
+    if projected_dir:
+        try:
+            os.makedirs(projected_dir)
+        except OSError:
+            # path already exists.  moving on.
+            pass
+
+    with io.open(projected_path, 'w', encoding='utf-8') as projected_file:
+        projected_file.writelines(projected)
+
+    return projected_path
+
+
 def _parse_command_line(raw_args=None):
     """
     Parse the command line arguments.
@@ -56,7 +147,8 @@ def _parse_command_line(raw_args=None):
     parser = ArgumentParser(
         description=(
             'Yaml file generator validator.  Can be run separately or called from '
-            'this module.  Uses the Yamale pacakge to perform the validation.'
+            'this module.  Uses the Yamale pacakge, or a compiled schema, to '
+            'perform the validation.'
         )
     )
     parser.add_argument('-s', '--schema-file', dest='schema_file', action='store',
@@ -64,16 +156,110 @@ def _parse_command_line(raw_args=None):
                         help=('Path to the schema yaml file.  If not provided, '
                               'defaults to \'schema.yaml\' in the current directory.')
                        )
-    parser.add_argument('-y', '--yaml-file', dest='yaml_file', action='store',
-                        default='out.yaml',
-                        help=('Path to the yaml dictionary file.  If not '
+    parser.add_argument('-y', '--yaml-file', dest='yaml_files', action='store',
+                        nargs='+', default=['out.yaml'],
+                        help=('Paths or glob patterns of the yaml dictionary '
+                              'files.  Enclose patterns in quotes.  If not '
                               'provided, defaults to \'out.yaml\' in the '
                               'current directory.')
                        )
+    parser.add_argument('--max-errors', dest='max_errors', action='store',
+                        default=None, type=cdr_parser.positive_int,
+                        help=('Stop validating a file after this many schema '
+                              'errors are found.  Only used with --compiled.  If '
+                              'not provided, every error is reported.')
+                       )
+    parser.add_argument('--workers', dest='workers', action='store',
+                        default=1, type=cdr_parser.positive_int,
+                        help=('Number of processes validating the meta data '
+                              'and transformations sections of the files.  Only '
+                              'used with --compiled.  Defaults to 1, validating '
+                              'in this process.')
+                       )
+    parser.add_argument('--compiled', dest='compiled', action='store_true',
+                        help=('Validate with the compiled schema instead of '
+                              'yamale.  Much faster on large files.'))
+    parser.add_argument('-l', '--log-path', dest='log_path', action='store',
+                        default=consts.DEFAULT_VALIDATE_LOG,
+                        help='Path to the log file.  Defaults to {}.'.format(
+                            consts.DEFAULT_VALIDATE_LOG))
+    parser.add_argument('-c', '--console-log', dest='console_log', action='store_true',
+                        help='Log to the console as well as the log file.')
     args = parser.parse_args(raw_args)
     return args
 
 
+def expand_paths(patterns):
+    """
+    Expand glob patterns into the paths of files.
+
+    :param patterns:  a list of paths or glob patterns.  Paths not matching
+        a file are kept, so they are reported as missing.
+
+    :return:  a list of unique paths, in the order of the patterns.  The
+        paths matching each pattern are sorted.
+    """
+    paths = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def validate_all(schema_path, dict_paths, use_compiled=False, workers=1, max_errors=None):
+    """
+    Validate several yaml files and log a report of each.
+
+    :param schema_path:  The path to the schema defintion file.
+    :param dict_paths:  The paths to the files to validate.
+    :param use_compiled:  if True, validate the files with the compiled
+        schema.  Otherwise, each file is validated with yamale.
+    :param workers:  the number of worker processes.  Only used with the
+        compiled schema.
+    :param max_errors:  the number of errors reported for each file.  Only
+        used with the compiled schema.
+
+    :return:  True if every file is valid
+    """
+    if use_compiled:
+        results = compiled_schema.validate_files(schema_path, dict_paths, workers, max_errors)
+    else:
+        results = []
+        for dict_path in dict_paths:
+            try:
+                validate(schema_path, dict_path)
+            except ValueError as exc:
+                results.append((dict_path, str(exc).splitlines()[1:]))
+            except (IOError, OSError):
+                results.append((dict_path, ['File not found or unreadable: {}'.format(dict_path)]))
+            except yaml.YAMLError as exc:
+                # files that are not yaml are reported rather than stopping the other files
+                results.append((dict_path, [' '.join(str(exc).split())]))
+            else:
+                results.append((dict_path, []))
+
+    for dict_path, errors in results:
+        if errors:
+            LOGGER.error("%s:  %d schema errors", dict_path, len(errors))
+            for error in errors:
+                LOGGER.error("  %s", str(error).strip())
+        else:
+            LOGGER.info("%s:  valid", dict_path)
+    return not any(errors for _, errors in results)
+
+
+def main(raw_args=None):
+    """
+    Validate the yaml files named on the command line.
+
+    :return:  True if every file is valid
+    """
+    args = _parse_command_line(raw_args)
+    yaml_logging.setup_logging(args)
+    return validate_all(args.schema_file, expand_paths(args.yaml_files),
+                        args.compiled, args.workers, args.max_errors)
+
+
 if __name__ == '__main__':
-    ARGS = _parse_command_line()
-    validate(ARGS.schema_file, ARGS.yaml_file)
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,93 @@
+"""
+Module providing bounded per-column memoization of cell values.
+
+Many columns repeat the same few strings across thousands of rows.  Caching
+the processed form of each distinct value means it is processed and stored
+once, instead of once per row.
+"""
+# Python imports
+
+# Third party imports
+from future.utils import string_types
+
+# Project imports
+
+# Maximum number of distinct values remembered per column
+COLUMN_CACHE_SIZE = 10000
+
+
+class BoundedMemo(object):
+    """
+    Memo of computed results for the string values of a single column.
+
+    Once max_size distinct values are remembered, results for new values are
+    computed without being stored.  Values that are not strings are never
+    memoized, so values such as True and 1 can not share results.
+
+    :param max_size:  the maximum number of distinct values remembered.  Zero
+        disables memoization.
+    """
+
+    def __init__(self, max_size=COLUMN_CACHE_SIZE):
+        self.max_size = max_size
+        self.memo = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, value, compute):
+        """
+        Get the result computed for a value.
+
+        :param value:  the cell value
+        :param compute:  function computing the result from the value
+
+        :return:  the memoized or newly computed result
+        """
+        if not isinstance(value, string_types):
+            return compute(value)
+
+        try:
+            result = self.memo[value]
+            self.hits += 1
+            return result
+        except KeyError:
+            self.misses += 1
+
+        result = compute(value)
+        if len(self.memo) < self.max_size:
+            self.memo[value] = result
+        return result
+
+    def intern(self, value):
+        """
+        Get the stored copy of an equal value.
+
+        :param value:  the cell value
+
+        :return:  a single shared object for all equal string values
+        """
+        return self.lookup(value, _identity)
+
+
+def _identity(value):
+    """ Return the value unchanged. """
+    return value
+
+
+def summarize(memos):
+    """
+    Summarize the use of several memos.
+
+    :param memos:  an iterable of BoundedMemo objects
+
+    :return:  a tuple of the number of lookups, the number of hits, and the
+        number of distinct values remembered.
+    """
+    lookups = 0
+    hits = 0
+    distinct = 0
+    for memo in memos:
+        lookups += memo.hits + memo.misses
+        hits += memo.hits
+        distinct += len(memo.memo)
+    return lookups, hits, distinct
@@ -0,0 +1,491 @@
+"""
+Module responsible for serializing processed tab values into yaml text.
+
+Each yaml item is built as a single string and written to a buffered writer.
+The writer collects the text of many items and encodes it in large chunks,
+instead of encoding every fragment as it is written.
+"""
+# Python imports
+from collections import OrderedDict
+from contextlib import contextmanager
+import io
+import logging
+
+# Third party imports
+from future.utils import string_types, viewitems
+
+# Project imports
+from cdr_data_dictionary import constants as consts
+from cdr_data_dictionary import temporal
+from cdr_data_dictionary import value_cache
+
+LOGGER = logging.getLogger(__name__)
+
+# Number of characters collected before the text is encoded and written
+CHUNK_SIZE = 256 * 1024
+
+
+def _text(value):
+    """ Get the text of a value, as it is written to the yaml file. """
+    if isinstance(value, string_types):
+        return value
+    return str(value)
+
+
+def format_list_value(value):
+    """
+    Turn a list of values into a string to write to a yaml file.
+
+    :param value:  The value to possibly format as a list.
+
+    :returns: Either the unchanged value, or a string looking like a python
+        list.
+    """
+    result = value
+    if consts.NEWLINE in value:
+        split_values = value.split(consts.NEWLINE)
+        result = [val for val in split_values if not val.isspace()]
+        result = ["'" + val + "'" if not val.isdigit() else val for val in result]
+        result = ', '.join(result)
+        result = ''.join(['[', result, ']'])
+
+    return result
+
+
+def format_value(field_name, value):
+    """
+    Format a value as it is written to the yaml file.
+
+    :param field_name:  The name of the field the value is associated with.
+        It is used to determine how to write the value.
+    :param value:  The processed value to write.
+
+    :return:  the yaml text of the value, including the line ending.
+    """
+    try:
+        if field_name in consts.INTEGER_FIELDS or field_name in consts.BOOLEAN_FIELDS:
+            return _text(value) + '\n'
+
+        if field_name in consts.MULTIPLE_TYPES:
+            try:
+                int(value)
+                return _text(value) + '\n'
+            except ValueError:
+                return format_list_value(value) + '\n'
+
+        if field_name in consts.TEMPORAL_FIELDS:
+            if 'time' in field_name:
+                dt_str = temporal.convert(value, consts.DATETIME_FORMAT)
+            elif 'date' in field_name:
+                dt_str = temporal.convert(value, consts.DATE_FORMAT)
+            return dt_str + '\n'
+
+        if consts.NEWLINE in value:
+            return format_list_value(value) + '\n'
+
+        return "'" + value + "'\n"
+    except IndexError:
+        LOGGER.exception("can't write value for field %s", field_name)
+        return '  IndexError - cant write this value\n'
+    except UnicodeEncodeError:
+        LOGGER.exception("can't write value for field %s", field_name)
+        return '  UnicodeEncodeError - cant write this value\n'
+    except UnicodeDecodeError:
+        LOGGER.exception("can't write value for field %s", field_name)
+        return '  UnicodeDecodeError - cant write this value\n'
+    except TypeError:
+        return _text(value) + '\n'
+
+
+def format_meta_data(meta_data):
+    """
+    Format the meta data dictionary as the meta_data yaml object.
+
+    :param meta_data:  a dictionary of meta data values.  Everything in the
+        dictionary is written to the meta_data yaml object.
+
+    :return:  the yaml text of the meta data
+    """
+    parts = ['meta_data:\n  -\n']
+    for key, value in viewitems(meta_data):
+        parts.append('    ' + key + ': ')
+        parts.append(format_value(key, value))
+    return ''.join(parts)
+
+
+def format_sequence_header(sequence_name):
+    """
+    Format the header starting the yaml sequence of a tab.
+
+    :param sequence_name:  the generated sequence name of the tab.
+
+    :return:  the yaml text starting the sequence
+    """
+    return u'  - \n    ' + sequence_name + u':\n'
+
+
+def item_parts(fields, value_dict, index, process_value):
+    """
+    Get the text fragments of a single yaml sequence item.
+
+    :param fields:  the list of fields of the tab
+    :param value_dict:  a dictionary of field names to a list holding the
+        unprocessed value of the field.
+    :param index:  identifier for the column grouped by.  Identifies the first
+        field that is written for the item.
+    :param process_value:  function used to clean each value before it is
+        formatted.
+
+    :return:  a list of text fragments.  Joined, they form the item.
+    """
+    grouping_field = fields[index]
+    grouping_value = value_dict.get(grouping_field)[0]
+
+    # marks this as a yaml sequence
+    parts = ['      - \n', '        ' + grouping_field + ':  ']
+    if grouping_field in consts.INTEGER_FIELDS or grouping_field in consts.BOOLEAN_FIELDS:
+        parts.append(grouping_value + '\n')
+    else:
+        parts.append("'" + grouping_value + "'\n")
+
+    for key, value in viewitems(value_dict):
+        if key == grouping_field:
+            continue
+        parts.append('        ' + key + ':  ')
+        sub_value = process_value(value[0])
+        if sub_value or isinstance(sub_value, bool):
+            parts.append(format_value(key, sub_value))
+        else:
+            parts.append('\n')
+
+    parts.append('\n')
+    return parts
+
+
+def format_item(fields, value_dict, index, process_value):
+    """
+    Format a single yaml sequence item in one pass.
+
+    :param fields:  the list of fields of the tab
+    :param value_dict:  a dictionary of field names to a list holding the
+        unprocessed value of the field.
+    :param index:  identifier for the column grouped by.  Identifies the first
+        field that is written for the item.
+    :param process_value:  function used to clean each value before it is
+        formatted.
+
+    :return:  the yaml text of the item
+    """
+    return ''.join(item_parts(fields, value_dict, index, process_value))
+
+
+def _format_plain(value):
+    """ Format an integer or boolean field value. """
+    return _text(value) + '\n'
+
+
+def _format_multiple(value):
+    """ Format a field value that may be an integer or a list. """
+    try:
+        int(value)
+    except ValueError:
+        return format_list_value(value) + '\n'
+    except TypeError:
+        pass
+    return _text(value) + '\n'
+
+
+def _temporal_formatter(dt_format):
+    """ Create a formatter for a temporal field using a fixed output format. """
+    def format_temporal(value):
+        """ Format a date or time field value. """
+        try:
+            return temporal.convert(value, dt_format) + '\n'
+        except TypeError:
+            return _text(value) + '\n'
+
+    return format_temporal
+
+
+def _format_text(value):
+    """ Format a string field value as a quoted string or a list. """
+    try:
+        if consts.NEWLINE in value:
+            return format_list_value(value) + '\n'
+    except TypeError:
+        return _text(value) + '\n'
+    return "'" + value + "'\n"
+
+
+def compile_formatter(field_name):
+    """
+    Resolve how values of a field are formatted.
+
+    The checks format_value makes for every value are made once per field.
+
+    :param field_name:  the name of the field
+
+    :return:  a function taking a processed value and returning its yaml text,
+        identical to format_value(field_name, value).
+    """
+    if field_name in consts.INTEGER_FIELDS or field_name in consts.BOOLEAN_FIELDS:
+        return _format_plain
+
+    if field_name in consts.MULTIPLE_TYPES:
+        return _format_multiple
+
+    if field_name in consts.TEMPORAL_FIELDS:
+        if 'time' in field_name:
+            return _temporal_formatter(consts.DATETIME_FORMAT)
+        return _temporal_formatter(consts.DATE_FORMAT)
+
+    return _format_text
+
+
+def _list_element(element):
+    """ Format an element of a value written as a list, as format_list_value does. """
+    return element if element.isdigit() else "'" + element + "'"
+
+
+def format_value_list(formatter, values):
+    """
+    Format several processed values of a field as a single yaml list.
+
+    Values written as lists are split into their elements.  Repeated
+    elements are written once, in the order they are first found.
+
+    :param formatter:  the compiled formatter of the field
+    :param values:  the processed values.  Values formatted as lists are
+        flattened into the single list.
+
+    :return:  the yaml text of the list, including the line ending.
+    """
+    # element to True if it was split from a value written as a list
+    elements = OrderedDict()
+    for value in values:
+        if isinstance(value, string_types) and consts.NEWLINE in value:
+            for element in value.split(consts.NEWLINE):
+                if not element.isspace():
+                    elements.setdefault(element, True)
+        else:
+            elements.setdefault(value, False)
+
+    texts = [_list_element(element) if split else formatter(element)[:-1]
+             for element, split in viewitems(elements)]
+    return '[' + ', '.join(text for text in texts if text) + ']\n'
+
+
+class TabPlan(object):
+    """
+    Compiled plan for writing the items of a tab.
+
+    The grouping field and each column's formatter are resolved once, when
+    the plan is created, instead of for every value written.  The yaml text of
+    each distinct value is memoized per column, so repeated values are only
+    processed and formatted once.
+
+    :param fields:  the list of fields of the tab
+    :param index:  identifier for the column grouped by.  Identifies the first
+        field that is written for each item.
+    :param process_value:  function used to clean each value before it is
+        formatted.
+    :param cache_size:  the maximum number of distinct values memoized per
+        column.  Zero disables memoization.
+    """
+
+    def __init__(self, fields, index, process_value, cache_size=value_cache.COLUMN_CACHE_SIZE):
+        self.grouping_field = fields[index]
+        self.process_value = process_value
+        self.cache_size = cache_size
+        self.item_start = '      - \n        ' + self.grouping_field + ':  '
+        self.quote_grouping = not (self.grouping_field in consts.INTEGER_FIELDS or
+                                   self.grouping_field in consts.BOOLEAN_FIELDS)
+        self.columns = {}
+        self.memos = []
+        for field in fields:
+            self._compile(field)
+
+    def _compile(self, field):
+        """ Create and store the memoized formatting function of a column. """
+        key_text = '        ' + field + ':  '
+        formatter = compile_formatter(field)
+        process_value = self.process_value
+
+        def format_cell(value):
+            """ Format the key and unprocessed value of a cell. """
+            sub_value = process_value(value)
+            if sub_value or isinstance(sub_value, bool):
+                return key_text + formatter(sub_value)
+            return key_text + '\n'
+
+        def format_cells(values):
+            """ Format the key and several unprocessed values of a cell. """
+            sub_values = [process_value(value) for value in values]
+            sub_values = [sub_value for sub_value in sub_values
+                          if sub_value or isinstance(sub_value, bool)]
+            if not sub_values:
+                return key_text + '\n'
+            if len(sub_values) == 1:
+                return key_text + formatter(sub_values[0])
+            return key_text + format_value_list(formatter, sub_values)
+
+        memo = value_cache.BoundedMemo(self.cache_size)
+        self.memos.append(memo)
+        column = (memo.lookup, format_cell, format_cells)
+        self.columns[field] = column
+        return column
+
+    def _start_item(self, grouping_value, value_texts):
+        """ Get the text fragments starting an item. """
+        if self.quote_grouping:
+            grouping_text = "'" + grouping_value + "'"
+        else:
+            grouping_text = grouping_value
+        if value_texts is not None:
+            value_texts[self.grouping_field] = grouping_text
+        return [self.item_start, grouping_text + '\n']
+
+    @staticmethod
+    def _add_value_text(value_texts, key, cell_text):
+        """ Keep the value text of a formatted cell, without its key and line ending. """
+        # cells start with an eight space indent, the key, and ':  '
+        value_texts[key] = cell_text[len(key) + 11:-1]
+
+    def format_item(self, value_dict, value_texts=None):
+        """
+        Format a single yaml sequence item.
+
+        :param value_dict:  a dictionary of field names to a list holding the
+            unprocessed value of the field, or a records.Row.
+        :param value_texts:  if given, a dictionary filled with each field
+            name and the yaml text written for its value.  Used to check the
+            item without parsing its text.
+
+        :return:  the yaml text of the item, identical to format_item
+        """
+        grouping_field = self.grouping_field
+        parts = self._start_item(value_dict.get(grouping_field)[0], value_texts)
+
+        raw_items = getattr(value_dict, 'raw_items', None)
+        if raw_items is not None:
+            cells = raw_items()
+        else:
+            cells = ((key, value[0]) for key, value in viewitems(value_dict))
+
+        columns = self.columns
+        for key, value in cells:
+            if key == grouping_field:
+                continue
+            # fields missing from the header, such as default fields, are
+            # compiled the first time they are seen
+            lookup, format_cell, _ = columns.get(key) or self._compile(key)
+            cell_text = lookup(value, format_cell)
+            parts.append(cell_text)
+            if value_texts is not None:
+                self._add_value_text(value_texts, key, cell_text)
+
+        parts.append('\n')
+        return ''.join(parts)
+
+    def format_group(self, group, value_texts=None):
+        """
+        Format a single yaml sequence item for a group of aggregated rows.
+
+        Fields with a single unique value are written exactly as format_item
+        writes them.  Fields with several unique values are written as a list.
+
+        :param group:  an aggregate.Group of the rows sharing a grouping value
+        :param value_texts:  if given, a dictionary filled with each field
+            name and the yaml text written for its value.
+
+        :return:  the yaml text of the item
+        """
+        parts = self._start_item(group.group_value, value_texts)
+
+        columns = self.columns
+        for key, values in group.value_lists():
+            if key == self.grouping_field:
+                continue
+            lookup, format_cell, format_cells = columns.get(key) or self._compile(key)
+            if len(values) == 1:
+                cell_text = lookup(values[0], format_cell)
+            else:
+                cell_text = format_cells(values)
+            parts.append(cell_text)
+            if value_texts is not None:
+                self._add_value_text(value_texts, key, cell_text)
+
+        parts.append('\n')
+        return ''.join(parts)
+
+    def cache_stats(self):
+        """
+        Get the use of the column memos.
+
+        :return:  a tuple of the number of lookups, the number of hits, and the
+            number of distinct values remembered.
+        """
+        return value_cache.summarize(self.memos)
+
+
+class ChunkedWriter(object):
+    """
+    Buffered text writer for a binary stream.
+
+    Text is collected until chunk_size characters are waiting, then encoded
+    and written to the stream at once.
+    """
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE, encoding='utf-8'):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self.chunks_written = 0
+        self._parts = []
+        self._size = 0
+
+    def write(self, text):
+        """
+        Queue text to be written.
+
+        :param text:  the text to write
+        """
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """ Encode and write all of the queued text. """
+        if self._parts:
+            self.stream.write(''.join(self._parts).encode(self.encoding))
+            self.chunks_written += 1
+            self._parts = []
+            self._size = 0
+
+    def write_encoded(self, data):
+        """
+        Write text that is already encoded, after the queued text.
+
+        :param data:  the encoded text to write
+        """
+        self.flush()
+        self.stream.write(data)
+        self.chunks_written += 1
+
+
+@contextmanager
+def open_writer(filepath, chunk_size=CHUNK_SIZE):
+    """
+    Open a yaml file for chunked writing.
+
+    :param filepath:  the file to write.  It is replaced if it exists.
+    :param chunk_size:  number of characters collected before each write.
+
+    :return:  yields a ChunkedWriter.  Remaining text is written when the
+        context exits.
+    """
+    with io.open(filepath, 'wb') as stream:
+        writer = ChunkedWriter(stream, chunk_size)
+        yield writer
+        writer.flush()
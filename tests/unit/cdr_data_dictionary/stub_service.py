@@ -0,0 +1,178 @@
+"""
+Local stand-ins for the google api service objects.
+
+The stubs answer requests from in memory tab contents and count the
+requests that are executed, so the number of round trips made by the
+service module can be verified without network access.
+"""
+# Python imports
+import re
+import threading
+import time
+
+# Third party imports
+from googleapiclient.errors import HttpError
+import httplib2
+
+# Project imports
+
+
+ROW_RANGE = re.compile(r".*!A(\d+):[A-Z]+(\d+)$")
+HEADER_RANGE = re.compile(r".*!1:1$")
+COLUMN_RANGE = re.compile(r".*!([A-Z]+):([A-Z]+)$")
+
+
+def _column_index(letters):
+    """ The zero based index of A1 notation column letters. """
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+class StubRequest(object):
+    """ A request that is only counted when it is executed. """
+
+    def __init__(self, stub, method, kwargs, response):
+        self.stub = stub
+        self.method = method
+        self.kwargs = kwargs
+        self.response = response
+
+    def execute(self, http=None, num_retries=0):
+        """ Record the request and return the canned response. """
+        time.sleep(self.stub.delays.get(self.kwargs.get('range'), 0))
+        with self.stub.lock:
+            self.stub.calls.append((self.method, self.kwargs))
+            self.stub.http_clients.append(http)
+            failures = self.stub.failures.get(self.kwargs.get('range'), 0)
+            if failures:
+                self.stub.failures[self.kwargs['range']] = failures - 1
+                raise HttpError(httplib2.Response({'status': self.stub.failure_status}),
+                                b'failed')
+        return self.response()
+
+
+class StubSheetsService(object):
+    """
+    Stub of the sheets v4 service.
+
+    :param tabs:  a dictionary of tab names to a dictionary of render options
+        to the rows read with that render option.  A render option missing
+        from the dictionary falls back to the 'FORMATTED_VALUE' rows.  The
+        'GRID' entry holds the rowData returned by spreadsheets().get.
+    :param delays:  an optional dictionary of ranges to the number of seconds
+        a request for that range takes to execute.
+    :param sheet_order:  an optional list of the tab names in spreadsheet
+        order.  spreadsheets().get returns sheets in this order.
+    :param failures:  an optional dictionary of ranges to the number of times
+        a request for that range fails before it succeeds.
+    :param failure_status:  the http status of the failed requests
+    """
+
+    def __init__(self, tabs, delays=None, sheet_order=None, failures=None, failure_status=503):
+        self.tabs = tabs
+        self.delays = delays or {}
+        self.sheet_order = sheet_order or list(tabs)
+        self.failures = failures or {}
+        self.failure_status = failure_status
+        self.calls = []
+        self.http_clients = []
+        self.lock = threading.Lock()
+
+    def spreadsheets(self):
+        """ Mimic the service resource chain. """
+        return StubSpreadsheets(self)
+
+    def values(self):
+        """ Mimic the service resource chain. """
+        return self
+
+    def _rows(self, cell_range, render_option):
+        tab_name = cell_range.split('!')[0]
+        if tab_name.startswith("'"):
+            tab_name = tab_name[1:-1].replace("''", "'")
+        renders = self.tabs[tab_name]
+        rows = renders.get(render_option, renders.get('FORMATTED_VALUE', []))
+
+        # row ranges return their rows, without trailing empty rows
+        match = ROW_RANGE.match(cell_range)
+        if match:
+            rows = rows[int(match.group(1)) - 1:int(match.group(2))]
+        elif HEADER_RANGE.match(cell_range):
+            rows = rows[:1]
+
+        # column ranges return their columns, without trailing empty values
+        match = COLUMN_RANGE.match(cell_range)
+        if match:
+            first = _column_index(match.group(1))
+            last = _column_index(match.group(2))
+            rows = [row[first:last + 1] for row in rows]
+            for row in rows:
+                while row and row[-1] == '':
+                    row.pop()
+
+        while rows and not rows[-1]:
+            rows = rows[:-1]
+        return rows
+
+    def get(self, **kwargs):
+        """ Mimic spreadsheets().values().get """
+        def response():
+            rows = self._rows(kwargs['range'], kwargs['valueRenderOption'])
+            return {'range': kwargs['range'], 'values': rows}
+
+        return StubRequest(self, 'get', kwargs, response)
+
+    def batchGet(self, **kwargs):  # pylint: disable=invalid-name
+        """ Mimic spreadsheets().values().batchGet """
+        def response():
+            value_ranges = []
+            for cell_range in kwargs['ranges']:
+                rows = self._rows(cell_range, kwargs['valueRenderOption'])
+                value_ranges.append({'range': cell_range, 'values': rows})
+            return {'valueRanges': value_ranges}
+
+        return StubRequest(self, 'batchGet', kwargs, response)
+
+    def count(self, method=None):
+        """ The number of executed requests, optionally for a single method. """
+        return len([call for call in self.calls if method is None or call[0] == method])
+
+
+class StubSpreadsheets(object):
+    """ Stub of the spreadsheets resource of the sheets v4 service. """
+
+    def __init__(self, stub):
+        self.stub = stub
+
+    def values(self):
+        """ Mimic the service resource chain. """
+        return self.stub
+
+    def get(self, **kwargs):
+        """ Mimic spreadsheets().get, reading either tab sizes or grid data """
+        if not kwargs.get('includeGridData'):
+            return StubRequest(self.stub, 'spreadsheets.get', kwargs, self._sizes)
+
+        def response():
+            requested = [cell_range.split('!')[0] for cell_range in kwargs['ranges']]
+            sheets = []
+            for tab_name in self.stub.sheet_order:
+                if tab_name in requested:
+                    data = [{'rowData': self.stub.tabs[tab_name]['GRID']}
+                            for name in requested if name == tab_name]
+                    sheets.append({'properties': {'title': tab_name}, 'data': data})
+            return {'sheets': sheets}
+
+        return StubRequest(self.stub, 'spreadsheets.get', kwargs, response)
+
+    def _sizes(self):
+        """ The properties of each tab.  Tabs have ten empty rows at the end. """
+        sheets = []
+        for tab_name in self.stub.sheet_order:
+            rows = self.stub.tabs[tab_name].get('FORMATTED_VALUE', [])
+            grid = {'rowCount': len(rows) + 10,
+                    'columnCount': max([len(row) for row in rows] or [0])}
+            sheets.append({'properties': {'title': tab_name, 'gridProperties': grid}})
+        return {'sheets': sheets}
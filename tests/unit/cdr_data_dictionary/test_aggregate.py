@@ -0,0 +1,164 @@
+# Python imports
+from argparse import Namespace
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+
+# Third party imports
+
+# Project imports
+import cdr_data_dictionary.aggregate as aggregate
+import cdr_data_dictionary.compiled_schema as compiled_schema
+import cdr_data_dictionary.constants as consts
+import cdr_data_dictionary.generate_yaml as gen
+import cdr_data_dictionary.validator as validator
+import cdr_data_dictionary.yaml_serializer as ser
+
+
+class AggregateTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.values = [
+            ['Relevant OMOP Table', 'Field Name', 'Notes', 'Concept ID'],
+            ['observation', 'value_source_concept_id', 'a', '1585250'],
+            ['observation', 'observation_source_concept_id', 'a', '1585250'],
+            ['measurement', 'value_source_concept_id', 'b', '903133'],
+            ['observation', 'value_source_concept_id', '', '1585250'],
+        ]
+
+    def test_group_rows(self):
+        # pre conditions
+        fields, rows = gen.sequentially_process_tab_contents(self.values)
+
+        # test
+        groups = aggregate.group_rows(rows, 'concept_id')
+
+        # post conditions
+        self.assertEqual([group.group_value for group in groups], ['1585250', '903133'])
+        self.assertEqual([group.rows for group in groups], [3, 1])
+        self.assertEqual(groups[0].value_lists(), [
+            ('relevant_omop_table', ['observation']),
+            ('field_name', ['value_source_concept_id', 'observation_source_concept_id']),
+            ('notes', ['a', '']),
+            ('concept_id', ['1585250']),
+        ])
+        self.assertEqual(groups[1].get('notes'), ['b'])
+        self.assertIsNone(groups[1].get('unknown'))
+
+    def test_group_rows_from_dictionaries(self):
+        # pre conditions
+        rows = [{'id': ['1'], 'name': ['a']},
+                {'id': ['1'], 'name': ['b']},
+                {'name': ['c']}]
+
+        # test
+        groups = aggregate.group_rows(rows, 'id')
+
+        # post conditions
+        self.assertEqual([group.group_value for group in groups], ['1', ''])
+        self.assertEqual(groups[0].get('name'), ['a', 'b'])
+
+    def test_format_group(self):
+        # pre conditions
+        fields, rows = gen.sequentially_process_tab_contents(self.values)
+        groups = aggregate.group_rows(rows, 'concept_id')
+        plan = ser.TabPlan(fields, 3, gen._process_value)
+
+        # test
+        items = [plan.format_group(group) for group in groups]
+
+        # post conditions
+        self.assertEqual(items[0], (
+            '      - \n'
+            '        concept_id:  1585250\n'
+            "        relevant_omop_table:  'observation'\n"
+            "        field_name:  ['value_source_concept_id', 'observation_source_concept_id']\n"
+            "        notes:  'a'\n"
+            '\n'))
+        self.assertEqual(items[1], plan.format_item(rows[2]))
+
+    def test_format_value_list_flattens(self):
+        # pre conditions
+        formatter = ser.compile_formatter(consts.INPUT_CONCEPT_ID_FIELD)
+
+        # test
+        text = ser.format_value_list(formatter, ['10' + consts.NEWLINE + 'a', '12'])
+
+        # post conditions
+        self.assertEqual(text, "[10, 'a', 12]\n")
+
+    def test_format_value_list_dedupes_elements(self):
+        # pre conditions
+        formatter = ser.compile_formatter('notes')
+
+        # test
+        text = ser.format_value_list(formatter, ['a' + consts.NEWLINE + 'b', 'b', 'x',
+                                                 '[see note]', 'x'])
+
+        # post conditions
+        self.assertEqual(text, "['a', 'b', 'x', '[see note]']\n")
+
+    def test_aggregated_file_validates(self):
+        # pre conditions
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        schema_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   '..', '..', '..', 'cdr_data_dictionary', 'schema.yaml')
+        settings = Namespace(column_id=None, incremental=False, aggregate=True,
+                             output_file=os.path.join(temp_dir, 'out.yaml'))
+        meta_data = copy.copy(consts.INIT_META_DATA_VALUES)
+        meta_data.update({'version': '12', 'cdr_version': 'R2019Q4R3',
+                          'created_time': '2019-06-01T10:11:12.000Z',
+                          'modified_time': '2019-06-02T10:11:12.000Z'})
+        values = [
+            (consts.PROGRAM_CUSTOM_CONCEPT_IDS_TAB_NAME, [
+                ['Relevant OMOP Table', 'Concept ID', 'Concept Name', 'Concept Code'],
+                ['observation', '2000000001', 'Race', 'WhatRaceEthnicity_GeneralizedPopulation'],
+                ['observation', '2000000001', 'Race', 'WhatRaceEthnicity_RaceEthnicityNoneOfThese'],
+            ]),
+            (consts.CHANGE_LOG_TAB_NAME, [
+                ['Change Number', 'Change Description', 'Date Requested', 'Date Completed'],
+                ['C001', 'Edited descriptions', '5/29/2019', '6/6/2019'],
+                ['C001', 'Removed fields', '5/30/2019', '6/6/2019'],
+            ]),
+        ]
+        gen.create_yaml_file(settings, values, meta_data)
+        aggregated_schema = validator.project_schema(
+            schema_path, None, os.path.join(temp_dir, 'schemas', 'out_schema.yaml'),
+            aggregated=True)
+
+        # test
+        [(_, errors)] = compiled_schema.validate_files(aggregated_schema, [settings.output_file])
+        [(_, schema_errors)] = compiled_schema.validate_files(schema_path,
+                                                              [settings.output_file])
+
+        # post conditions
+        with open(settings.output_file) as yaml_file:
+            self.assertIn("concept_code:  ['WhatRaceEthnicity_GeneralizedPopulation', "
+                          "'WhatRaceEthnicity_RaceEthnicityNoneOfThese']", yaml_file.read())
+        self.assertEqual(errors, [])
+        validator.validate(aggregated_schema, settings.output_file)
+        # the schema of row items does not accept the aggregated lists
+        self.assertEqual(len(schema_errors), 2)
+
+    def test_create_yaml_file_aggregate(self):
+        # pre conditions
+        settings = Namespace(column_id=None, aggregate=True)
+
+        # test
+        _, _, groups, group_by = gen._create_yaml_file(
+            settings, consts.CONCEPT_SUPPRESSIONS_TAB_NAME, self.values)
+
+        # post conditions
+        self.assertEqual(group_by, 3)
+        self.assertEqual(len(groups), 2)
+        self.assertEqual(groups[0].get('field_name'),
+                         ['value_source_concept_id', 'observation_source_concept_id'])
@@ -0,0 +1,184 @@
+# Python imports
+import csv
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+# Third party imports
+from mock import patch
+
+# Project imports
+import cdr_data_dictionary.apply_dictionary as apply_dictionary
+import cdr_data_dictionary.query as query
+
+
+class ApplyDictionaryTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.dictionary = query.DataDictionary({
+            'transformations': [
+                {'table_suppressions': [{'relevant_omop_table': 'note'}]},
+                {'field_suppressions': [
+                    {'relevant_omop_table': 'observation', 'field_name': 'value_source_value'},
+                ]},
+                {'concept_suppressions': [
+                    {'concept_id': 1585250, 'relevant_omop_table': 'observation',
+                     'field_name': 'observation_source_value'},
+                    {'concept_id': 4013886, 'relevant_omop_table': 'condition_occurrence'},
+                ]},
+                {'concept_generalizations': [
+                    {'concept_id': 1585838, 'relevant_omop_table': 'observation',
+                     'field_name': 'observation_source_value', 'input_concept_id': 903096,
+                     'fields_affected': 'value_source_concept_id, value_source_value',
+                     'generalized_output_concept_id': 2000000002},
+                    {'concept_id': 1585845, 'relevant_omop_table': 'observation',
+                     'field_name': 'observation_source_value',
+                     'input_concept_id': [903096, 1585847],
+                     'fields_affected': 'value_source_concept_id, value_source_value',
+                     'generalized_output_concept_id': 2000000009},
+                ]},
+            ],
+        })
+        self.input_dir = tempfile.mkdtemp()
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.input_dir)
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+        self.header = ['observation_id', 'observation_source_concept_id',
+                       'value_source_concept_id', 'value_source_value', 'observation_concept_id']
+        self.rows = [
+            ['1', '1585838', '903096', 'PMI_Skip', '0'],
+            ['2', '1585845', '903096', 'PMI_Skip', '4013886'],
+            ['3', '1585250', '1585251', 'Yes', '0'],
+            ['4', '1585845', '1585847', 'Ten', '0'],
+            ['5', '1585838', '1585847', 'Ten', '0'],
+            ['6', '1585251', '1585250', 'No'],
+        ]
+        self._write('observation.csv', [self.header] + self.rows)
+        self._write('note.csv', [['note_id', 'note_text'], ['1', 'text']])
+
+    def _write(self, name, rows):
+        with io.open(os.path.join(self.input_dir, name), 'w', newline='') as csv_file:
+            csv.writer(csv_file, lineterminator='\n').writerows(rows)
+
+    def _read(self, name):
+        with io.open(os.path.join(self.output_dir, name), newline='') as csv_file:
+            return list(csv.reader(csv_file))
+
+    def test_table_rules(self):
+        # test
+        rules = apply_dictionary.TableRules(self.dictionary, 'observation', self.header)
+
+        # post conditions
+        self.assertEqual(rules.concept_columns, [1, 2, 4])
+        self.assertEqual(rules.suppressed, set(['1585250']))
+        self.assertEqual(rules.blank_columns, [3])
+        self.assertEqual(rules.generalizations, [
+            (2, 1, {('1585838', '903096'): '2000000002', ('1585845', '903096'): '2000000009',
+                    ('1585845', '1585847'): '2000000009'})])
+
+    def test_chained_generalizations(self):
+        # pre conditions
+        self.dictionary.sections[query.CONCEPT_GENERALIZATIONS].append(
+            {'concept_id': 1585845, 'relevant_omop_table': 'observation',
+             'field_name': 'observation_source_value', 'input_concept_id': 2000000009,
+             'fields_affected': 'value_source_concept_id', 'generalized_output_concept_id': 903079})
+
+        # test
+        rules = apply_dictionary.TableRules(self.dictionary, 'observation', self.header)
+
+        # post conditions
+        mapping = rules.generalizations[0][2]
+        self.assertEqual(mapping[('1585845', '903096')], '903079')
+        self.assertEqual(mapping[('1585845', '2000000009')], '903079')
+        self.assertEqual(mapping[('1585838', '903096')], '2000000002')
+
+    def test_apply_directory(self):
+        # test
+        reports = apply_dictionary.apply_directory(self.dictionary, self.input_dir,
+                                                   self.output_dir, chunk_rows=2)
+
+        # post conditions
+        self.assertEqual([report.table for report in reports], ['note', 'observation'])
+        self.assertTrue(reports[0].suppressed)
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, 'note.csv')))
+        report = reports[1]
+        self.assertEqual((report.rows, report.kept, report.dropped, report.generalized),
+                         (6, 4, 2, 3))
+        self.assertEqual(self._read('observation.csv'), [
+            self.header,
+            ['1', '1585838', '2000000002', '', '0'],
+            ['2', '1585845', '2000000009', '', '4013886'],
+            ['4', '1585845', '2000000009', '', '0'],
+            ['5', '1585838', '1585847', '', '0'],
+        ])
+
+    def test_apply_directory_workers(self):
+        # pre conditions
+        apply_dictionary.apply_directory(self.dictionary, self.input_dir, self.output_dir)
+        expected = self._read('observation.csv')
+
+        # test
+        reports = apply_dictionary.apply_directory(self.dictionary, self.input_dir,
+                                                   self.output_dir, chunk_rows=1, workers=2)
+
+        # post conditions
+        self.assertEqual(self._read('observation.csv'), expected)
+        self.assertEqual(reports[1].kept, 4)
+
+    def test_apply_chunk(self):
+        # pre conditions
+        apply_dictionary._init_worker(self.dictionary)
+        self.addCleanup(apply_dictionary._WORKER_STATE.clear)
+        rules = apply_dictionary.TableRules(self.dictionary, 'observation', self.header)
+
+        expected = rules.apply([list(row) for row in self.rows])
+
+        # test
+        first = apply_dictionary.apply_chunk(('observation', self.header, self.rows[:3]))
+        second = apply_dictionary.apply_chunk(('observation', self.header, self.rows[3:]))
+
+        # post conditions
+        self.assertEqual(first[0] + second[0], expected[0])
+        self.assertEqual((first[1] + second[1], first[2] + second[2]), expected[1:])
+        # the rules of a table are built once in each worker
+        self.assertEqual(len(apply_dictionary._WORKER_STATE), 2)
+
+    @patch('cdr_data_dictionary.apply_dictionary.time')
+    def test_apply_file_empty(self, mock_time):
+        # pre conditions
+        mock_time.time.side_effect = [10.0, 12.5]
+        self._write('person.csv', [])
+
+        # test
+        report = apply_dictionary.apply_file(self.dictionary,
+                                             os.path.join(self.input_dir, 'person.csv'),
+                                             os.path.join(self.output_dir, 'person.csv'))
+
+        # post conditions
+        self.assertEqual((report.rows, report.seconds), (0, 2.5))
+
+    def test_parse_command_line(self):
+        # test
+        args = apply_dictionary._parse_command_line(
+            ['-d', 'out.yaml', '-i', 'in', '-o', 'out', '--workers', '3'])
+
+        # post conditions
+        self.assertEqual((args.dictionary_file, args.input_dir, args.output_dir),
+                         ('out.yaml', 'in', 'out'))
+        self.assertEqual(args.workers, 3)
+        self.assertEqual(args.chunk_rows, apply_dictionary.consts.DEFAULT_APPLY_CHUNK_ROWS)
+        self.assertRaises(SystemExit, apply_dictionary._parse_command_line,
+                          ['-d', 'out.yaml', '-i', 'in', '-o', 'out', '--chunk-rows', '0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
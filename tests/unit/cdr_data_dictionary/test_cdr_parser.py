@@ -33,10 +33,29 @@ class CDRParserTest(unittest.TestCase):
             'range': None,
             'output_file': self.output_file,
             'column_id': None,
+            'aggregate': False,
+            'columns': None,
             'schema_file': 'cdr_data_dictionary/schema.yaml',
+            'max_errors': None,
+            'cross_check': False,
+            'generalization_map': False,
+            'binary_snapshot': False,
             'log_path': consts.DEFAULT_LOG,
             'console_log': False,
-            'cdr_version': self.cdr_version
+            'cdr_version': self.cdr_version,
+            'batch_fetch': False,
+            'batch_size': None,
+            'hyperlink_fetch': False,
+            'fetch_workers': 1,
+            'chunk_rows': None,
+            'workers': 1,
+            'pipeline_depth': None,
+            'cache_dir': consts.DEFAULT_CACHE_DIR,
+            'cache_size': consts.DEFAULT_CACHE_SIZE_MB,
+            'use_cache': True,
+            'refresh': False,
+            'incremental': False,
+            'manifest_file': consts.DEFAULT_MANIFEST,
         }
 
 
@@ -49,9 +68,29 @@ class CDRParserTest(unittest.TestCase):
             '--sheet-name', "Change Log",
             '--range', 'A1:M30',
             '--group-by', 'c',
+            '--aggregate',
+            '--columns', 'relevant_omop_table, Concept ID',
+            '--columns', 'Change Log=change_number',
             '--schema-file', 'test_schema.yaml',
+            '--max-errors', '10',
+            '--cross-check',
+            '--generalization-map',
+            '--binary-snapshot',
             '--log-path', 'log.log',
             '--console-log',
+            '--batch-fetch',
+            '--batch-size', '4',
+            '--hyperlink-fetch',
+            '--fetch-workers', '5',
+            '--chunk-rows', '5000',
+            '--workers', '4',
+            '--pipeline-depth', '2',
+            '--cache-dir', 'snapshots',
+            '--cache-size', '10',
+            '--no-cache',
+            '--refresh',
+            '--incremental',
+            '--manifest-file', 'manifest.json',
         ]
  
         # test
@@ -62,9 +101,29 @@ class CDRParserTest(unittest.TestCase):
         expected['sheet_name'] = "Change Log"
         expected['range'] = 'A1:M30'
         expected['column_id'] = 2
+        expected['aggregate'] = True
+        expected['columns'] = [(None, ['relevant_omop_table', 'concept_id']),
+                               ('Change Log', ['change_number'])]
         expected['schema_file'] = 'test_schema.yaml'
+        expected['max_errors'] = 10
+        expected['cross_check'] = True
+        expected['generalization_map'] = True
+        expected['binary_snapshot'] = True
         expected['log_path'] = 'log.log'
         expected['console_log'] = True
+        expected['batch_fetch'] = True
+        expected['batch_size'] = 4
+        expected['hyperlink_fetch'] = True
+        expected['fetch_workers'] = 5
+        expected['chunk_rows'] = 5000
+        expected['workers'] = 4
+        expected['pipeline_depth'] = 2
+        expected['cache_dir'] = 'snapshots'
+        expected['cache_size'] = 10
+        expected['use_cache'] = False
+        expected['refresh'] = True
+        expected['incremental'] = True
+        expected['manifest_file'] = 'manifest.json'
 
         self.assertEqual(expected, vars(settings))
 
@@ -160,3 +219,15 @@ class CDRParserTest(unittest.TestCase):
             ArgumentTypeError,
             c_parse.ascii_to_index,
             column)
+
+    def test_positive_int(self):
+        # test
+        number = c_parse.positive_int('3')
+
+        # post_condition
+        self.assertEqual(number, 3)
+
+    def test_positive_int_error(self):
+        # test
+        self.assertRaises(ArgumentTypeError, c_parse.positive_int, '0')
+        self.assertRaises(ArgumentTypeError, c_parse.positive_int, 'three')
@@ -0,0 +1,113 @@
+# Python imports
+import unittest
+
+# Third party imports
+import numpy as np
+
+# Project imports
+import cdr_data_dictionary.classify as classify
+import cdr_data_dictionary.query as query
+
+
+class ConceptClassifierTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.document = {
+            'transformations': [
+                {'concept_suppressions': [
+                    {'concept_id': 1585250},
+                    {'concept_id': [1585251, 903096]},
+                ]},
+                {'concept_generalizations': [
+                    {'concept_id': 1585838, 'input_concept_id': 1585839,
+                     'generalized_output_concept_id': 2000000002},
+                    {'concept_id': 1585838, 'input_concept_id': 903079,
+                     'generalized_output_concept_id': 2000000002},
+                    {'concept_id': 1585845, 'input_concept_id': [903079, 1585847],
+                     'generalized_output_concept_id': 2000000009},
+                    {'concept_id': 1585845, 'input_concept_id': 903096,
+                     'generalized_output_concept_id': 2000000009},
+                ]},
+            ],
+        }
+        self.classifier = classify.ConceptClassifier.from_dictionary(
+            query.DataDictionary(self.document))
+
+    def test_classify(self):
+        # pre conditions
+        ids = [1585250, 1585839, 903079, 5, 903096, 1585847 + (1 << classify.FILTER_BITS)]
+
+        # test
+        status, outputs = self.classifier.classify(ids)
+
+        # post conditions
+        self.assertEqual(status.dtype, np.int8)
+        self.assertEqual(outputs.dtype, np.int64)
+        self.assertEqual(status.tolist(), [classify.SUPPRESSED, classify.GENERALIZED,
+                                           classify.GENERALIZED, classify.UNTOUCHED,
+                                           classify.SUPPRESSED, classify.UNTOUCHED])
+        self.assertEqual(outputs.tolist(), [-1, 2000000002, 2000000002, -1, -1, -1])
+        self.assertEqual(self.classifier.counts(status),
+                         {'untouched': 2, 'suppressed': 2, 'generalized': 2})
+
+    def test_classify_scoped(self):
+        # pre conditions
+        ids = np.array([903079, 903079, 1585839, 903096], dtype=np.int64)
+        scopes = np.array([1585838, 1585845, 1585845, 1585845], dtype=np.int64)
+
+        # test
+        status, outputs = self.classifier.classify(ids, scopes)
+
+        # post conditions
+        self.assertEqual(status.tolist(), [classify.GENERALIZED, classify.GENERALIZED,
+                                           classify.UNTOUCHED, classify.SUPPRESSED])
+        self.assertEqual(outputs.tolist(), [2000000002, 2000000009, -1, -1])
+
+    def test_classify_scoped_range(self):
+        # test
+        self.assertRaises(ValueError, self.classifier.classify, [1], [-1])
+        self.assertRaises(ValueError, self.classifier.classify, [1 << 32], [1])
+
+    def test_classify_empty(self):
+        # pre conditions
+        classifier = classify.ConceptClassifier([], [])
+
+        # test
+        status, outputs = classifier.classify([1585250, 2])
+        empty_status, _ = self.classifier.classify([])
+
+        # post conditions
+        self.assertEqual(status.tolist(), [classify.UNTOUCHED, classify.UNTOUCHED])
+        self.assertEqual(outputs.tolist(), [-1, -1])
+        self.assertEqual(len(empty_status), 0)
+
+    def test_matches_lookups(self):
+        # pre conditions
+        dictionary = query.DataDictionary(self.document)
+        random = np.random.RandomState(0)
+        known = [1585250, 1585251, 903096, 1585839, 903079, 1585847]
+        ids = np.concatenate([random.randint(0, 3 << classify.FILTER_BITS, size=1000),
+                              random.choice(known, size=1000)])
+
+        # test
+        status, outputs = self.classifier.classify(ids)
+
+        # post conditions
+        for concept_id, concept_status, output_id in zip(ids.tolist(), status.tolist(),
+                                                         outputs.tolist()):
+            if dictionary.is_suppressed(concept_id):
+                self.assertEqual((concept_status, output_id), (classify.SUPPRESSED, -1))
+            else:
+                expected = dictionary.generalized_output(concept_id, default=-1)
+                self.assertEqual(output_id, expected)
+                self.assertEqual(concept_status == classify.GENERALIZED, expected != -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
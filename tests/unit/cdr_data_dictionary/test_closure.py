@@ -0,0 +1,118 @@
+# Python imports
+from argparse import Namespace
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+
+# Third party imports
+
+# Project imports
+import cdr_data_dictionary.closure as closure
+import cdr_data_dictionary.constants as consts
+import cdr_data_dictionary.generate_yaml as gen
+import cdr_data_dictionary.query as query
+
+
+class ClosureTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def test_final_outputs(self):
+        # pre conditions
+        outputs = {1: 2, 2: 3, 3: 4, 5: 5, 6: 5, 7: 4}
+
+        # test
+        finals, cycles = closure.final_outputs(outputs)
+
+        # post conditions
+        self.assertEqual(finals, {1: 4, 2: 4, 3: 4, 5: 5, 6: 5, 7: 4})
+        self.assertEqual(cycles, [])
+
+    def test_final_outputs_cycles(self):
+        # pre conditions
+        outputs = {1: 2, 2: 3, 3: 1, 4: 2, 5: 6}
+
+        # test
+        finals, cycles = closure.final_outputs(outputs)
+
+        # post conditions
+        self.assertEqual(finals, {5: 6})
+        self.assertEqual(len(cycles), 1)
+        self.assertEqual(sorted(cycles[0]), [1, 2, 3])
+
+    def test_generalization_closure(self):
+        # pre conditions
+        dictionary = query.DataDictionary({
+            'transformations': [
+                {'concept_generalizations': [
+                    {'concept_id': 1585838, 'input_concept_id': [903096, 1585839],
+                     'generalized_output_concept_id': 2000000002},
+                    {'concept_id': 1585838, 'input_concept_id': 2000000002,
+                     'generalized_output_concept_id': 2000000010},
+                    {'concept_id': 1585845, 'input_concept_id': 903096,
+                     'generalized_output_concept_id': 2000000009},
+                    {'concept_id': 1585845, 'input_concept_id': 2000000009,
+                     'generalized_output_concept_id': 903096},
+                ]},
+            ],
+        })
+
+        # test
+        result = closure.GeneralizationClosure(dictionary)
+
+        # post conditions
+        self.assertEqual(result.final_output(1585839), 2000000010)
+        self.assertEqual(result.final_output(903096), 2000000010)
+        self.assertEqual(result.final_output(1585839, 1585838), 2000000010)
+        self.assertIsNone(result.final_output(903096, 1585845))
+        self.assertEqual(result.final_output(5, default=-1), -1)
+        self.assertEqual(result.cycles, [])
+        self.assertEqual([scope for scope, _ in result.scoped_cycles], [1585845])
+
+    def test_write_and_load(self):
+        # pre conditions
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        settings = Namespace(column_id=None, incremental=False,
+                             output_file=os.path.join(temp_dir, 'out.yaml'))
+        meta_data = copy.copy(consts.INIT_META_DATA_VALUES)
+        meta_data.update({'version': '12', 'cdr_version': 'R2019Q4R3'})
+        values = [
+            (consts.CONCEPT_GENERALIZATIONS_TAB_NAME, [
+                ['Relevant OMOP Table', 'Field Name', 'Concept Name', 'Concept ID',
+                 'Input Concept ID', 'Generalized Output Concept ID'],
+                ['observation', 'observation_source_concept_id', 'Name', '1585838',
+                 '1585839', '2000000002'],
+                ['observation', 'observation_source_concept_id', 'Name', '1585838',
+                 '2000000002', '2000000010'],
+            ]),
+        ]
+        gen.create_yaml_file(settings, values, meta_data)
+
+        # test
+        closure.write_closure(settings.output_file)
+        closure_file = os.path.join(temp_dir, 'out' + closure.CLOSURE_SUFFIX)
+        outputs, scoped_outputs = closure.load_closure(closure_file, settings.output_file)
+
+        # post conditions
+        self.assertEqual(outputs, {1585839: 2000000010, 2000000002: 2000000010})
+        self.assertEqual(scoped_outputs[(1585838, 1585839)], 2000000010)
+        # an already loaded document gives the same lookup file
+        shared_file = os.path.join(temp_dir, 'shared' + closure.CLOSURE_SUFFIX)
+        closure.write_closure(settings.output_file, shared_file,
+                              document=query.load_document(settings.output_file))
+        self.assertEqual(closure.load_closure(shared_file, settings.output_file),
+                         (outputs, scoped_outputs))
+        with open(settings.output_file, 'a') as yaml_file:
+            yaml_file.write('\n')
+        self.assertRaises(ValueError, closure.load_closure, closure_file, settings.output_file)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,407 @@
+# Python imports
+from argparse import Namespace
+import copy
+from datetime import date
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+# Third party imports
+import yaml
+
+# Project imports
+import cdr_data_dictionary.compiled_schema as compiled_schema
+import cdr_data_dictionary.constants as consts
+import cdr_data_dictionary.generate_yaml as gen
+import cdr_data_dictionary.validator as validator
+
+SCHEMA = u"""meta_data: list(include('meta_data_item'))
+
+transformations: list(include('change_logs'),
+                      include('clean_conformance_rules'))
+
+---
+change_logs:
+    change_log: any(null(), list(include('change_item_dict')))
+
+clean_conformance_rules:
+    cleaning_&_conformance: list(include('clean_conform_item_dict'))
+
+meta_data_item:
+    version: any(int(), null())
+    cdr_version: str()
+
+change_item_dict:
+    change_number: any(list(str()), str(), null())
+    date_requested: day(min='2017-01-01')
+    priority: int(max=3, required=False)
+
+clean_conform_item_dict:
+    rule_name: any(str(), url(), null())
+    notes: any(str(), null())
+"""
+
+
+class CompiledSchemaTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.schema_path = os.path.join(self.temp_dir, 'schema.yaml')
+        with io.open(self.schema_path, 'w', encoding='utf-8') as schema_file:
+            schema_file.write(SCHEMA)
+        self.addCleanup(compiled_schema._SCHEMAS.pop, self.schema_path, None)
+        self.schema = compiled_schema.load_schema(self.schema_path)
+
+    def _item(self, **fields):
+        return dict(fields)
+
+    def test_compile_follows_yamale(self):
+        # pre conditions
+        values = [
+            ('any(list(int()), int(), null())', [[1, 2], 1, None, True], ['a', [1, 'a']]),
+            ('url()', ['https://github.com/all-of-us/curation'], ['curation', 1]),
+            ("day(min='2017-01-01')", [date(2017, 1, 1)], [date(2016, 12, 31), '2017-01-01']),
+            ('str(max=3)', ['abc'], ['abcd', 1]),
+            ("enum('a', 'b')", ['a'], ['c']),
+        ]
+
+        for expression, accepted, rejected in values:
+            # test
+            rule = self.schema.compile(expression)
+
+            # post conditions
+            for value in accepted:
+                self.assertTrue(rule.accepts(value), (expression, value))
+            for value in rejected:
+                self.assertFalse(rule.accepts(value), (expression, value))
+                self.assertTrue(list(rule.explain(value)), (expression, value))
+
+    def test_compile_unknown_validator(self):
+        # test
+        self.assertRaises(SyntaxError, self.schema.compile, 'float()')
+
+    def test_section_rows(self):
+        # pre conditions
+        item_validator = compiled_schema.ItemValidator(self.schema_path)
+        check = item_validator.section('change_log')
+
+        # test
+        check(self._item(change_number="'C001'", date_requested='2019-05-29'))
+        check(self._item(change_number="'C002'", date_requested='2016-05-29'))
+        check(self._item(change_number="'C003'", date_requested='2019-05-29', priority='4'))
+
+        # post conditions
+        errors = item_validator.collector.errors
+        self.assertEqual([(error.section, error.row, error.field) for error in errors],
+                         [('change_log', 3, 'date_requested'),
+                          ('change_log', 4, 'priority')])
+        self.assertTrue(str(errors[0]).startswith('change_log row 3: date_requested: '))
+        self.assertRaises(compiled_schema.SchemaValidationError, item_validator.raise_errors)
+
+    def test_aggregated_items(self):
+        # pre conditions
+        item_validator = compiled_schema.ItemValidator(self.schema_path)
+        check = item_validator.section('change_log', aggregated=True)
+
+        # test
+        check(self._item(date_requested='2016-05-29'))
+
+        # post conditions
+        error = item_validator.collector.errors[0]
+        self.assertEqual(error.item, 1)
+        self.assertIsNone(error.row)
+        self.assertTrue(str(error).startswith('change_log item 1: '))
+
+    def test_max_errors(self):
+        # pre conditions
+        item_validator = compiled_schema.ItemValidator(self.schema_path, max_errors=2)
+        check = item_validator.section('change_log')
+
+        # test
+        for _ in range(5):
+            check(self._item(date_requested='2016-05-29', priority='4'))
+
+        # post conditions
+        self.assertEqual(len(item_validator.collector.errors), 2)
+        self.assertEqual([error.row for error in item_validator.collector.errors], [2, 2])
+
+    def test_load_scalar(self):
+        # post conditions
+        self.assertEqual(compiled_schema.load_scalar('1585250'), 1585250)
+        self.assertEqual(compiled_schema.load_scalar('0'), 0)
+        self.assertEqual(compiled_schema.load_scalar("'it''s'"), "it's")
+        # only ascii digits are integers, as they are for the yaml loader
+        for text in [u'\u00b2', u'\u0661\u0662', '012']:
+            self.assertEqual(compiled_schema.load_scalar(text),
+                             yaml.load(text, Loader=compiled_schema.SAFE_LOADER))
+        self.assertEqual(compiled_schema.load_scalar(u'\u00b2'), u'\u00b2')
+
+    def test_invalid_items(self):
+        # pre conditions
+        item_validator = compiled_schema.ItemValidator(self.schema_path)
+        check = item_validator.section('cleaning_&_conformance')
+
+        # test
+        check(self._item(rule_name="'clean'", notes="'it is'"))
+        check(self._item(rule_name="'clean'", notes="'it's'"))
+
+        # post conditions
+        errors = item_validator.collector.errors
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].row, 3)
+        self.assertIn('Not valid yaml', errors[0].message)
+
+    def test_undefined_section(self):
+        # pre conditions
+        item_validator = compiled_schema.ItemValidator(self.schema_path)
+
+        # test
+        check = item_validator.section('wearables')
+        check(self._item(notes="'ignored'"))
+
+        # post conditions
+        errors = item_validator.collector.errors
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].section, 'wearables')
+
+    def test_meta_data(self):
+        # pre conditions
+        item_validator = compiled_schema.ItemValidator(self.schema_path)
+
+        # test
+        item_validator.check_meta_data('meta_data:\n  -\n    version:  12\n')
+
+        # post conditions
+        errors = item_validator.collector.errors
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].section, 'meta_data')
+        self.assertEqual(errors[0].field, 'cdr_version')
+
+
+class ItemValidationTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.schema_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                        '..', '..', '..', 'cdr_data_dictionary',
+                                        'schema.yaml')
+        self.meta_data = copy.copy(consts.INIT_META_DATA_VALUES)
+        self.meta_data.update({'version': '12', 'cdr_version': 'R2019Q4R3',
+                               'created_time': '2019-06-01T10:11:12.000Z',
+                               'modified_time': '2019-06-02T10:11:12.000Z'})
+        self.settings = Namespace(column_id=None, incremental=False,
+                                  output_file=os.path.join(self.temp_dir, 'out.yaml'))
+        self.values = [
+            (consts.CHANGE_LOG_TAB_NAME, [
+                ['Change Number', 'Change Description', 'Date Requested', 'Date Completed'],
+                ['C001', u'Edited \u201cdescriptions\u201d\nfor fields', '5/29/2019', '6/6/2019'],
+                ['C002', 'Removed fields', '5/29/2016', '6/6/2019'],
+            ]),
+            (consts.CLEANING_CONFORMANCE_TAB_NAME, [
+                ['Rule Name', 'Rule Description'],
+                ['clean_rule', 'curation'],
+            ]),
+        ]
+
+    def _validate_file(self):
+        try:
+            compiled_schema.validate_file(self.schema_path, self.settings.output_file)
+        except compiled_schema.SchemaValidationError as exc:
+            return [str(error) for error in exc.errors]
+        return []
+
+    def test_create_yaml_file(self):
+        # pre conditions
+        item_validator = compiled_schema.ItemValidator(self.schema_path)
+
+        # test
+        gen.create_yaml_file(self.settings, copy.deepcopy(self.values), self.meta_data,
+                             item_validator)
+
+        # post conditions
+        errors = [str(error) for error in item_validator.collector.errors]
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith('change_log row 3: date_requested: '))
+        self.assertEqual(errors, self._validate_file())
+        self.assertRaises(ValueError, validator.validate,
+                          self.schema_path, self.settings.output_file)
+
+    def test_valid_file(self):
+        # pre conditions
+        del self.values[0][1][2]
+        item_validator = compiled_schema.ItemValidator(self.schema_path)
+
+        # test
+        gen.create_yaml_file(self.settings, copy.deepcopy(self.values), self.meta_data,
+                             item_validator)
+
+        # post conditions
+        self.assertEqual(item_validator.collector.errors, [])
+        self.assertEqual(self._validate_file(), [])
+        validator.validate(self.schema_path, self.settings.output_file)
+
+    def test_pipelined_file(self):
+        # pre conditions
+        self.settings.pipeline_depth = 1
+        item_validator = compiled_schema.ItemValidator(self.schema_path)
+        tabs = [(tab_name, rows, []) for tab_name, rows in copy.deepcopy(self.values)]
+
+        # test
+        gen.write_pipelined_yaml_file(self.settings, iter(tabs), self.meta_data, item_validator)
+
+        # post conditions
+        errors = [str(error) for error in item_validator.collector.errors]
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors, self._validate_file())
+
+
+
+class BatchValidationTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.schema_path = os.path.join(self.temp_dir, 'schema.yaml')
+        with io.open(self.schema_path, 'w', encoding='utf-8') as schema_file:
+            schema_file.write(SCHEMA)
+        self.addCleanup(compiled_schema._SCHEMAS.pop, self.schema_path, None)
+        self.text = (u"meta_data:\n  -\n    version:  12\n    cdr_version:  'R2019Q4R3'\n\n"
+                     u"transformations:\n"
+                     u"  - \n    change_log:\n"
+                     u"      - \n        change_number:  'C001'\n        date_requested:  2016-05-29\n"
+                     u"      - \n        change_number:  'C002'\n        date_requested:  2019-05-29\n\n"
+                     u"  - \n    cleaning_&_conformance:\n"
+                     u"      - \n        rule_name:  'clean'\n        notes:  'it's'\n\n")
+
+    def _write(self, name, text):
+        path = os.path.join(self.temp_dir, name)
+        with io.open(path, 'w', encoding='utf-8', newline='') as dict_file:
+            dict_file.write(text)
+        return path
+
+    def test_split_document(self):
+        # test
+        shards = compiled_schema.split_document(self.text)
+
+        # post conditions
+        kinds = [kind for kind, _ in shards]
+        self.assertEqual(kinds, [compiled_schema.HEAD_SHARD, compiled_schema.SECTION_SHARD,
+                                 compiled_schema.SECTION_SHARD])
+        self.assertTrue(shards[0][1].endswith('transformations:\n'))
+        # section shards keep the line numbers of the file
+        self.assertEqual(shards[2][1].split('\n')[16], '    cleaning_&_conformance:')
+        self.assertEqual(self.text.split('\n')[16], '    cleaning_&_conformance:')
+
+    def test_split_single_document(self):
+        # pre conditions
+        texts = [u'meta_data:\n  -\n    version:  12\n',
+                 u'---\n' + self.text]
+
+        for text in texts:
+            # test
+            shards = compiled_schema.split_document(text)
+
+            # post conditions
+            self.assertEqual(shards, [(compiled_schema.DOCUMENT_SHARD, text)])
+
+    def test_validate_files(self):
+        # pre conditions
+        paths = [self._write('lf.yaml', self.text),
+                 self._write('crlf.yaml', self.text.replace('\n', '\r\n'))]
+
+        # test
+        results = compiled_schema.validate_files(self.schema_path, paths)
+
+        # post conditions
+        self.assertEqual([path for path, _ in results], paths)
+        for _, errors in results:
+            self.assertEqual([(error.section, error.row) for error in errors],
+                             [('change_log', 2), (None, None)])
+            self.assertIn('Not valid yaml', errors[1].message)
+            self.assertIn('line 20', errors[1].message)
+
+    def test_validate_files_missing_file(self):
+        # pre conditions
+        paths = [os.path.join(self.temp_dir, 'nope.yaml'), self._write('lf.yaml', self.text)]
+
+        # test
+        results = compiled_schema.validate_files(self.schema_path, paths)
+
+        # post conditions
+        self.assertEqual([path for path, _ in results], paths)
+        [missing_error] = results[0][1]
+        self.assertEqual(missing_error.section, None)
+        self.assertIn('File not found or unreadable', str(missing_error))
+        # the other files are still validated
+        self.assertEqual(len(results[1][1]), 2)
+
+    def test_validate_files_workers(self):
+        # pre conditions
+        paths = [self._write('{}.yaml'.format(index), self.text) for index in range(3)]
+        expected = compiled_schema.validate_files(self.schema_path, paths)
+
+        # test
+        results = compiled_schema.validate_files(self.schema_path, paths, workers=2,
+                                                 max_errors=1)
+
+        # post conditions
+        self.assertEqual([path for path, _ in results], paths)
+        for (_, errors), (_, expected_errors) in zip(results, expected):
+            self.assertEqual([str(error) for error in errors], [str(expected_errors[0])])
+
+    def test_validator_main(self):
+        # pre conditions
+        self._write('valid.yaml', self.text.replace("'it's'", "'it is'").replace('2016', '2017'))
+        self._write('invalid.yaml', self.text)
+        pattern = os.path.join(self.temp_dir, '*valid.yaml')
+
+        # test
+        expanded = validator.expand_paths([pattern, pattern])
+        log_args = ['-l', os.path.join(self.temp_dir, 'validator.log')]
+        with self.assertLogs(validator.LOGGER, level='INFO') as logs:
+            valid = validator.main(['-s', self.schema_path, '-y', expanded[1]] + log_args)
+            invalid = validator.main(['-s', self.schema_path, '-y', pattern] + log_args)
+        compiled_valid = validator.main(['-s', self.schema_path, '-y', expanded[1],
+                                         '--compiled'] + log_args)
+        compiled_invalid = validator.main(['-s', self.schema_path, '-y', pattern,
+                                           '--compiled', '--workers', '2'] + log_args)
+        missing = validator.main(['-s', self.schema_path, '-y', expanded[1],
+                                  os.path.join(self.temp_dir, 'nope.yaml'), '--compiled'] + log_args)
+
+        # post conditions
+        self.assertEqual([os.path.basename(path) for path in expanded],
+                         ['invalid.yaml', 'valid.yaml'])
+        self.assertTrue(valid)
+        self.assertFalse(invalid)
+        self.assertTrue(compiled_valid)
+        self.assertFalse(compiled_invalid)
+        self.assertFalse(missing)
+        self.assertIn('INFO:{}:{}:  valid'.format(validator.LOGGER.name, expanded[1]), logs.output)
+        self.assertTrue(any(line.startswith('ERROR:{}:{}:  '.format(validator.LOGGER.name, expanded[0]))
+                            for line in logs.output))
+
+
+if __name__ == '__main__':
+    unittest.main()
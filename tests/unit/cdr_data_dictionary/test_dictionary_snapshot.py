@@ -0,0 +1,149 @@
+# Python imports
+from argparse import Namespace
+import copy
+import datetime
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+# Third party imports
+import yaml
+
+# Project imports
+import cdr_data_dictionary.constants as consts
+import cdr_data_dictionary.dictionary_snapshot as dictionary_snapshot
+import cdr_data_dictionary.generate_yaml as gen
+
+
+class DictionarySnapshotTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.snapshot_file = os.path.join(self.temp_dir, 'out.cdrdd')
+        self.document = {
+            'meta_data': [{'version': 12, 'name': 'Dictionary',
+                           'modified_time': datetime.datetime(2020, 2, 5, 20, 25, 10)}],
+            'transformations': [
+                {'change_log': [
+                    {'change_number': 'C001', 'date_requested': datetime.date(2019, 5, 29),
+                     'ratio': 0.25},
+                ]},
+                {'field_generalizations': None},
+                {'concept_suppressions': [
+                    {'concept_id': 1585250, 'concept_name': u'Erb’s palsy',
+                     'transformed': True, 'field_name': None},
+                    {'concept_id': [1585251, 'varies', 2 ** 40], 'transformed': False,
+                     'extra': 'Erb’s palsy'},
+                ]},
+            ],
+        }
+
+    def test_round_trip(self):
+        # test
+        dictionary_snapshot.write_snapshot(self.document, self.snapshot_file, '0' * 64)
+        document = dictionary_snapshot.load_document(self.snapshot_file)
+
+        # post conditions
+        self.assertEqual(document, self.document)
+        items = document['transformations'][2]['concept_suppressions']
+        self.assertEqual(list(items[0]), ['concept_id', 'concept_name', 'transformed',
+                                          'field_name'])
+        self.assertNotIn('extra', items[0])
+
+    def test_load_dictionary(self):
+        # pre conditions
+        dictionary_snapshot.write_snapshot(self.document, self.snapshot_file, '0' * 64)
+
+        # test
+        dictionary = dictionary_snapshot.load(self.snapshot_file)
+
+        # post conditions
+        self.assertTrue(dictionary.is_suppressed(1585251))
+        self.assertEqual(dictionary.change('C001')['ratio'], 0.25)
+        self.assertEqual(dictionary.meta_data['version'], 12)
+
+    def test_unsupported_values(self):
+        # pre conditions
+        self.document['transformations'][2]['concept_suppressions'][0]['concept_id'] = [[1]]
+
+        # test
+        self.assertRaises(ValueError, dictionary_snapshot.write_snapshot, self.document,
+                          self.snapshot_file, '0' * 64)
+
+    def test_not_a_snapshot(self):
+        # pre conditions
+        with io.open(self.snapshot_file, 'wb') as snapshot_file:
+            snapshot_file.write(b'transformations:\n')
+
+        # test
+        self.assertRaises(ValueError, dictionary_snapshot.load_document, self.snapshot_file)
+
+    def test_write_file_snapshot(self):
+        # pre conditions
+        settings = Namespace(column_id=None, incremental=False,
+                             output_file=os.path.join(self.temp_dir, 'out.yaml'))
+        meta_data = copy.copy(consts.INIT_META_DATA_VALUES)
+        meta_data.update({'version': '12', 'cdr_version': 'R2019Q4R3'})
+        values = [
+            (consts.CONCEPT_SUPPRESSIONS_TAB_NAME, [
+                ['Relevant OMOP Table', 'Field Name', 'Concept Name', 'Concept ID'],
+                ['observation', 'observation_source_concept_id', 'Name', '1585250'],
+            ]),
+        ]
+        gen.create_yaml_file(settings, values, meta_data)
+        with io.open(settings.output_file, 'rb') as yaml_file:
+            expected = yaml.safe_load(yaml_file)
+
+        # test
+        dictionary_snapshot.write_file_snapshot(settings.output_file)
+        document = dictionary_snapshot.load_document(self.snapshot_file, settings.output_file)
+        shared_file = os.path.join(self.temp_dir, 'shared.cdrdd')
+        dictionary_snapshot.write_file_snapshot(settings.output_file, shared_file,
+                                                document=expected)
+
+        # post conditions
+        self.assertEqual(document, expected)
+        self.assertEqual(dictionary_snapshot.load_document(shared_file, settings.output_file),
+                         expected)
+        with io.open(settings.output_file, 'ab') as yaml_file:
+            yaml_file.write(b'\n')
+        self.assertRaises(ValueError, dictionary_snapshot.load_document, self.snapshot_file,
+                          settings.output_file)
+
+    def test_write_derived_files(self):
+        # pre conditions
+        settings = Namespace(column_id=None, incremental=False, generalization_map=False,
+                             binary_snapshot=True,
+                             output_file=os.path.join(self.temp_dir, 'out.yaml'))
+        meta_data = copy.copy(consts.INIT_META_DATA_VALUES)
+        meta_data.update({'version': '12', 'cdr_version': 'R2019Q4R3'})
+        values = [
+            (consts.CONCEPT_SUPPRESSIONS_TAB_NAME, [
+                ['Relevant OMOP Table', 'Field Name', 'Concept Name', 'Concept ID'],
+                ['observation', 'observation_source_concept_id', 'Name', '1585250'],
+            ]),
+        ]
+        gen.create_yaml_file(settings, values, meta_data)
+
+        # test
+        gen._write_derived_files(settings)
+
+        # post conditions
+        # files are only derived after they are validated, never while written
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['out.cdrdd', 'out.yaml'])
+        with io.open(settings.output_file, 'rb') as yaml_file:
+            self.assertEqual(dictionary_snapshot.load_document(self.snapshot_file),
+                             yaml.safe_load(yaml_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,14 @@
 # Python imports
+from argparse import Namespace
 from datetime import datetime
+import copy
+import os
+import shutil
+import tempfile
 import unittest
 
 # Third party imports
-from mock import ANY, call, patch, mock_open
+from mock import patch
 
 # Project imports
 import cdr_data_dictionary.constants as consts
@@ -100,12 +105,112 @@ class GenerateYAMLTest(unittest.TestCase):
         self.assertEqual(fields, expected_fields)
         self.assertEqual(concepts, expected_vals)
 
+    def test_stream_tab_contents_is_lazy(self):
+        # pre-conditions
+        consumed = []
+
+        def rows():
+            yield ['Field One', 'Field Two']
+            index = 0
+            while True:
+                consumed.append(index)
+                yield ['val_{}'.format(index), str(index)]
+                index += 1
+
+        # test
+        fields, concepts = gen.stream_tab_contents(rows(), {'field_three': ['']})
+        first = next(concepts)
+
+        # post conditions
+        self.assertEqual(fields, ['field_one', 'field_two'])
+        self.assertEqual(first, {'field_one': ['val_0'], 'field_two': ['0'],
+                                 'field_three': ['']})
+        self.assertEqual(consumed, [0])
+
+    def test_iter_merged_values_release(self):
+        # pre-conditions
+        link = 'https://github.com/all-of-us/curation'
+        values = [
+            ('Tab One', [['Rule Name'], ['cleaning rule']]),
+            ('Tab Two', [['Rule Name'], ['other rule']]),
+        ]
+        formulas = [
+            ('Tab Two', [['Rule Name'], ['other rule']]),
+            ('Tab One', [['Rule Name'], ['=HYPERLINK("{}","cleaning rule")'.format(link)]]),
+        ]
+
+        # test
+        merged = gen.iter_merged_values(values, formulas, release=True)
+        first_name, first_rows = next(merged)
+        first_rows = list(first_rows)
+
+        # post conditions
+        self.assertEqual(first_name, 'Tab One')
+        self.assertEqual(first_rows, [['Rule Name'], [link]])
+        # the first tab is no longer referenced by the input lists
+        self.assertEqual([name for name, _ in values], ['Tab Two'])
+        self.assertEqual([name for name, _ in formulas], ['Tab Two'])
+
+        second_name, second_rows = next(merged)
+        self.assertEqual((second_name, list(second_rows)),
+                         ('Tab Two', [['Rule Name'], ['other rule']]))
+        self.assertEqual(values, [])
+        self.assertEqual(formulas, [])
+
+    def test_iter_merged_values_matches_merge(self):
+        # pre-conditions
+        link = 'https://github.com/all-of-us/curation'
+        values = [('Tab One', [['Rule Name', 'Notes'], ['cleaning rule', 'note'], ['other']])]
+        formulas = [('Tab One', [['Rule Name', 'Notes'],
+                                 ['=HYPERLINK("{}","cleaning rule")'.format(link), 'note'],
+                                 ['=HYPERLINK("#gid=1","other")']])]
+
+        # test
+        streamed = [(name, list(rows)) for name, rows in
+                    gen.iter_merged_values(copy.deepcopy(values), copy.deepcopy(formulas))]
+        merged = gen.merge_values_and_formulas(values, formulas)
+
+        # post conditions
+        self.assertEqual(streamed, merged)
+
+    def test_merge_tab(self):
+        # pre-conditions
+        link = 'https://github.com/all-of-us/curation'
+        values = [['Rule Name', 'Count', 'Notes'], ['rule', '10', 'note'], ['other']]
+        formulas = [['Rule Name', 'Count', 'Notes'],
+                    ['=HYPERLINK(" {} ","rule")'.format(link), 10, '=CONCAT("no","te")'],
+                    ['=HYPERLINK("#gid=1","other")'],
+                    ['=HYPERLINK("{}","missing row")'.format(link)]]
+
+        # test
+        merged = gen.merge_tab(values, formulas)
+
+        # post conditions
+        self.assertIs(merged, values)
+        self.assertEqual(merged, [['Rule Name', 'Count', 'Notes'], [link, '10', 'note'], ['other']])
+
+    def test_merge_values_and_formulas_by_name(self):
+        # pre-conditions
+        link = 'https://github.com/all-of-us/curation'
+        values = [('Tab One', [['one']]), ('Tab Two', [['two']]), ('Tab Three', [['three']])]
+        formulas = [('Tab Three', [['three']]),
+                    ('Tab One', [['=HYPERLINK("{}","one")'.format(link)]]),
+                    ('Tab Two', [['two']])]
+
+        # test
+        merged = gen.merge_values_and_formulas(values, formulas)
+
+        # post conditions
+        self.assertEqual(merged, [('Tab One', [[link]]), ('Tab Two', [['two']]),
+                                  ('Tab Three', [['three']])])
+
     @patch('cdr_data_dictionary.generate_yaml.LOGGER')
     def test_write_yaml_file_list(self, mock_logging):
         # pre-conditions
         self.maxDiff = None
         today_time = self.today + " 09:45:33"
-        mock_file = mock_open()
+        temp_dir = tempfile.mkdtemp()
+        filepath = os.path.join(temp_dir, 'out.yaml')
         meta_data = {
             consts.CREATED_TIME_FIELD: today_time,
             consts.CONCEPT_ID_FIELD: 80,
@@ -132,43 +237,207 @@ class GenerateYAMLTest(unittest.TestCase):
         index = 3
 
         # test
-        with patch('cdr_data_dictionary.generate_yaml.codecs.open', mock_file):
-            gen.write_yaml_file(mock_file, meta_data, [fields], [values], [sequence_name], [index])
-
-        # post conditions
-        expected_calls = [
-             call().write('meta_data:\n  -\n'),
-             call().write('    {}: '.format(consts.CREATED_TIME_FIELD)),
-             call().write(today_time + '\n'),
-             call().write('    {}: '.format(consts.CONCEPT_ID_FIELD)),
-             call().write(80),
-             call().write('\n'),
-             call().write('    cdr_version: '),
-             call().write("'R2019Q8R1'\n"),
-             call().write('\n'),
-             call().write('transformations:\n'),
-             call().write('  - \n    change log and concepts:\n'),
-             call().write('      - \n'),
-             call().write('        {}:  '.format(name)),
-             call().write("'phony_field'\n"),
-             call().write('        {}:  '.format(consts.REGISTERED_TRANSFORM_FIELD)),
-             call().write(True),
-             call().write('\n'),
-             call().write('        {}:  '.format(none_exc)),
-             call().write('\n'),
-             call().write('        {}:  '.format(consts.DATE_REQUESTED_FIELD)),
-             call().write(self.today + '\n'),
-             call().write('        {}:  '.format(int_exc)),
-             call().write("'20'\n"),
-             call().write('        {}:  '.format(false)),
-             call().write('False\n'),
-             call().write('        {}:  '.format(consts.CONCEPT_ID_FIELD)),
-             call().write(u'33'),
-             call().write('\n'),
-             call().write('\n'),
-        ]
+        try:
+            gen.write_yaml_file(filepath, meta_data, [fields], [values], [sequence_name], [index])
+            with open(filepath, 'rb') as yaml:
+                contents = yaml.read().decode('utf-8')
+        finally:
+            shutil.rmtree(temp_dir)
 
-        result_calls = mock_file.mock_calls[2:-1]
+        # post conditions
+        expected = ''.join([
+            'meta_data:\n  -\n',
+            '    {}: '.format(consts.CREATED_TIME_FIELD),
+            today_time + '\n',
+            '    {}: '.format(consts.CONCEPT_ID_FIELD),
+            '80\n',
+            '    cdr_version: ',
+            "'R2019Q8R1'\n",
+            '\n',
+            'transformations:\n',
+            '  - \n    change log and concepts:\n',
+            '      - \n',
+            '        {}:  '.format(name),
+            "'phony_field'\n",
+            '        {}:  '.format(consts.CONCEPT_ID_FIELD),
+            '33\n',
+            '        {}:  '.format(consts.DATE_REQUESTED_FIELD),
+            self.today + '\n',
+            '        {}:  '.format(consts.REGISTERED_TRANSFORM_FIELD),
+            'True\n',
+            '        {}:  '.format(none_exc),
+            '\n',
+            '        {}:  '.format(int_exc),
+            "'20'\n",
+            '        {}:  '.format(false),
+            'False\n',
+            '\n',
+        ])
 
-        self.assertEqual(result_calls, expected_calls)
+        self.assertEqual(contents, expected)
         self.assertTrue(mock_logging.info.called)
+
+
+class IncrementalYAMLTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.full_file = os.path.join(self.temp_dir, 'full.yaml')
+        self.settings = Namespace(column_id=None,
+                                  incremental=True,
+                                  output_file=os.path.join(self.temp_dir, 'inc.yaml'),
+                                  manifest_file=os.path.join(self.temp_dir, 'manifest.json'))
+        self.meta_data = copy.copy(consts.INIT_META_DATA_VALUES)
+        self.meta_data.update({'version': '12', 'cdr_version': 'R2019Q4R3',
+                               'modified_time': '2020-02-05T20:25:10.000Z'})
+        self.values = [
+            (consts.CHANGE_LOG_TAB_NAME, [
+                ['Change Number', 'Change Description', 'Date Requested', 'Date Completed'],
+                ['C001', u'Edited \u201cdescriptions\u201d\nfor fields', '5/29/2019', '6/6/2019'],
+            ]),
+            (consts.CONCEPT_SUPPRESSIONS_TAB_NAME, [
+                ['Relevant OMOP Table', 'Field Name', 'Concept Name', 'Concept ID'],
+                ['observation', 'observation_source_concept_id', "Donor's name", '1585250'],
+                ['observation', 'value_source_concept_id', 'Other', '1585251'],
+            ]),
+            (consts.CONCEPT_GENERALIZATIONS_TAB_NAME, [
+                ['Relevant OMOP Table', 'Field Name', 'Concept Name', 'Concept ID',
+                 'Input Concept ID', 'Generalized Output Concept ID'],
+                ['observation', 'value_source_concept_id', 'Education', '1585940',
+                 '1585941\n1585942', '2000000007'],
+            ]),
+            (consts.WEARABLES_TAB_NAME, [
+                ['Table', 'Level', 'Field', 'Data Type', 'Affected by Privacy Methodology'],
+                ['steps_intraday', 'person', 'person_id', 'integer', 'No'],
+            ]),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _full_run(self, values):
+        settings = Namespace(column_id=None, incremental=False, output_file=self.full_file)
+        gen.create_yaml_file(settings, copy.deepcopy(values), self.meta_data)
+        with open(self.full_file, 'rb') as full:
+            return full.read()
+
+    def _incremental_run(self, values):
+        regenerated = gen.write_incremental_yaml_file(self.settings, copy.deepcopy(values),
+                                                      self.meta_data)
+        with open(self.settings.output_file, 'rb') as inc:
+            return regenerated, inc.read()
+
+    def test_incremental_first_run(self):
+        # test
+        regenerated, contents = self._incremental_run(self.values)
+
+        # post conditions
+        self.assertEqual(regenerated, [tab for tab, _ in self.values])
+        self.assertEqual(contents, self._full_run(self.values))
+
+    def test_incremental_changed_tab(self):
+        # pre conditions
+        self._incremental_run(self.values)
+        self.meta_data['version'] = '13'
+        self.values[1][1].append(['person', 'gender_concept_id', 'Other', '1585252'])
+
+        # test
+        regenerated, contents = self._incremental_run(self.values)
+
+        # post conditions
+        self.assertEqual(regenerated, [consts.CONCEPT_SUPPRESSIONS_TAB_NAME])
+        self.assertEqual(contents, self._full_run(self.values))
+
+    def test_incremental_unchanged(self):
+        # pre conditions
+        self._incremental_run(self.values)
+
+        # test
+        regenerated, contents = self._incremental_run(self.values)
+
+        # post conditions
+        self.assertEqual(regenerated, [])
+        self.assertEqual(contents, self._full_run(self.values))
+
+
+
+class ParallelYAMLTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.meta_data = copy.copy(consts.INIT_META_DATA_VALUES)
+        self.meta_data.update({'version': '12', 'cdr_version': 'R2019Q4R3'})
+        self.values = [
+            (consts.CHANGE_LOG_TAB_NAME, [
+                ['Change Number', 'Change Description', 'Date Requested', 'Date Completed'],
+                ['C001', u'Edited \u201cdescriptions\u201d\nfor fields', '5/29/2019', '6/6/2019'],
+            ]),
+            (consts.CONCEPT_SUPPRESSIONS_TAB_NAME, [
+                ['Relevant OMOP Table', 'Field Name', 'Concept Name', 'Concept ID'],
+                ['observation', 'observation_source_concept_id', "Donor's name", '1585250'],
+                ['observation', 'value_source_concept_id', 'Other', '1585251'],
+                [],
+                ['measurement', 'value_source_concept_id', 'Other', '1585251'],
+                ['observation', 'value_source_concept_id', 'Height', '903133'],
+            ]),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _run(self, write, name, **kwargs):
+        settings = Namespace(column_id=None, incremental=False, workers=2,
+                             output_file=os.path.join(self.temp_dir, name))
+        for key, value in kwargs.items():
+            setattr(settings, key, value)
+        write(settings, copy.deepcopy(self.values))
+        with open(settings.output_file, 'rb') as yaml_file:
+            return yaml_file.read()
+
+    def _serial(self, settings, values):
+        gen.create_yaml_file(settings, values, self.meta_data)
+
+    def _parallel(self, settings, values):
+        gen.write_parallel_yaml_file(settings, values, self.meta_data, chunk_rows=2)
+
+    def test_tab_tasks(self):
+        # pre conditions
+        settings = Namespace(column_id=None)
+        tab_name, rows = self.values[1]
+
+        # test
+        tasks = gen._tab_tasks(settings, tab_name, rows, 2)
+
+        # post conditions
+        self.assertEqual([task[2] for task in tasks],
+                         [[rows[0]] + rows[1:3], [rows[0]] + rows[3:5], [rows[0], rows[5]]])
+        self.assertEqual([task[3] for task in tasks], [True, False, False])
+        self.assertEqual(len(gen._tab_tasks(settings, tab_name, rows, 5)), 1)
+        settings.aggregate = True
+        self.assertEqual(len(gen._tab_tasks(settings, tab_name, rows, 2)), 1)
+
+    def test_write_parallel_yaml_file(self):
+        # test
+        contents = self._run(self._parallel, 'parallel.yaml')
+
+        # post conditions
+        self.assertEqual(contents, self._run(self._serial, 'serial.yaml'))
+
+    def test_write_parallel_yaml_file_aggregate(self):
+        # test
+        contents = self._run(self._parallel, 'parallel.yaml', aggregate=True)
+
+        # post conditions
+        self.assertEqual(contents, self._run(self._serial, 'serial.yaml', aggregate=True))
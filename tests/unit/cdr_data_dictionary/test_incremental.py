@@ -0,0 +1,83 @@
+# Python imports
+from argparse import Namespace
+import os
+import shutil
+import tempfile
+import unittest
+
+# Third party imports
+
+# Project imports
+import cdr_data_dictionary.constants as consts
+import cdr_data_dictionary.incremental as inc
+
+
+class IncrementalTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.manifest_path = os.path.join(self.temp_dir, 'state', 'manifest.json')
+        self.output_file = os.path.join(self.temp_dir, 'out.yaml')
+        self.settings = Namespace(column_id=None)
+        self.rows = [['Change Number'], ['C001']]
+        self.sections = [{'tab_name': consts.CHANGE_LOG_TAB_NAME,
+                          'fingerprint': 'abc', 'start': 10, 'end': 20}]
+
+        with open(self.output_file, 'wb') as output:
+            output.write(b'meta_data: ...')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_fingerprint(self):
+        # test
+        first = inc.fingerprint(consts.CHANGE_LOG_TAB_NAME, self.rows, self.settings)
+        same = inc.fingerprint(consts.CHANGE_LOG_TAB_NAME, [['Change Number'], ['C001']],
+                               self.settings)
+        changed = inc.fingerprint(consts.CHANGE_LOG_TAB_NAME, [['Change Number'], ['C002']],
+                                  self.settings)
+        regrouped = inc.fingerprint(consts.CHANGE_LOG_TAB_NAME, self.rows,
+                                    Namespace(column_id=2))
+
+        # post conditions
+        self.assertEqual(first, same)
+        self.assertNotEqual(first, changed)
+        self.assertNotEqual(first, regrouped)
+
+    def test_save_and_load_manifest(self):
+        # test
+        inc.save_manifest(self.manifest_path, self.output_file,
+                          inc.file_hash(self.output_file), self.sections)
+        manifest = inc.load_manifest(self.manifest_path)
+
+        # post conditions
+        self.assertEqual(manifest['sections'], self.sections)
+        self.assertEqual(inc.previous_sections(manifest),
+                         {consts.CHANGE_LOG_TAB_NAME: self.sections[0]})
+
+    def test_load_manifest_changed_output(self):
+        # pre conditions
+        inc.save_manifest(self.manifest_path, self.output_file,
+                          inc.file_hash(self.output_file), self.sections)
+        with open(self.output_file, 'ab') as output:
+            output.write(b'edited by hand')
+
+        # test
+        manifest = inc.load_manifest(self.manifest_path)
+
+        # post conditions
+        self.assertEqual(manifest, None)
+        self.assertEqual(inc.previous_sections(manifest), {})
+
+    def test_load_manifest_missing(self):
+        # test
+        manifest = inc.load_manifest(self.manifest_path)
+
+        # post conditions
+        self.assertEqual(manifest, None)
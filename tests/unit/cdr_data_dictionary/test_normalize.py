@@ -0,0 +1,114 @@
+# Python imports
+import unittest
+
+# Third party imports
+from hypothesis import given, settings, strategies as st
+
+# Project imports
+import cdr_data_dictionary.constants as consts
+import cdr_data_dictionary.normalize as norm
+
+
+def legacy_process_value(value):
+    """
+    The chained replacement implementation of generate_yaml._process_value
+    the normalization engine replaces.  Used as the reference behavior.
+    """
+    result = None
+    try:
+        value = value.replace(u'\u00AD', '-')
+        value = value.replace(u'\u2010', '-')
+        value = value.replace(u'\u2019', "'")
+        value = value.replace(u'\u201c', '"')
+        value = value.replace(u'\u201d', '"')
+        result = value
+    except AttributeError:
+        if isinstance(value, int):
+            result = str(value)
+
+    if result:
+        result = result.strip()
+        result = result.replace('\r\n', consts.NEWLINE)
+        result = result.replace('\n', consts.NEWLINE)
+        result = result.replace('\r', consts.NEWLINE)
+        result = result.replace("'", "''")
+        result = result.strip()
+
+        if result.lower() in ['yes', 'y', 'true', 't']:
+            return True
+
+        if result.lower() in ['no', 'n', 'false', 'f']:
+            return False
+
+    return result
+
+
+# text built mostly from the characters the normalization treats specially
+SPECIAL_TEXT = st.text(
+    alphabet=st.one_of(
+        st.sampled_from([u'\u00AD', u'\u2010', u'\u2019', u'\u201c', u'\u201d', u"'",
+                         u'\r', u'\n', u' ', u'\t', u'\u00a0', u'\u2028', u'\x1c',
+                         u'y', u'Y', u'e', u's', u'n', u'N', u'o', u't', u'T', u'r',
+                         u'u', u'f', u'a', u'l', u'E', u'\u0130']),
+        st.characters()),
+    max_size=30)
+
+
+class NormalizeTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    @settings(max_examples=2000, deadline=None)
+    @given(SPECIAL_TEXT)
+    def test_normalize_value_matches_legacy(self, value):
+        # test
+        result = norm.normalize_value(value)
+
+        # post conditions
+        expected = legacy_process_value(value)
+        self.assertEqual(result, expected)
+        self.assertEqual(type(result), type(expected))
+
+    @settings(max_examples=200, deadline=None)
+    @given(st.one_of(st.integers(), st.booleans(), st.none()))
+    def test_normalize_other_matches_legacy(self, value):
+        # test
+        result = norm.normalize_value(value)
+
+        # post conditions
+        expected = legacy_process_value(value)
+        self.assertEqual(result, expected)
+        self.assertEqual(type(result), type(expected))
+
+    @settings(max_examples=200, deadline=None)
+    @given(st.lists(st.one_of(SPECIAL_TEXT, st.integers(), st.none())))
+    def test_normalize_column(self, values):
+        # test
+        results = norm.normalize_column(values)
+
+        # post conditions
+        self.assertEqual(results, [legacy_process_value(value) for value in values])
+
+    def test_normalize_value(self):
+        # test
+        results = [norm.normalize_value(value) for value in
+                   [u' Donor\u2019s name\r\nand \u201cstatus\u201d ', 'Yes', ' n ', '', '\n']]
+
+        # post conditions
+        expected = [u"Donor''s name" + consts.NEWLINE + u'and "status"', True, False, '', '']
+        self.assertEqual(results, expected)
+
+    def test_normalize_other_logs_error(self):
+        # test
+        with self.assertLogs(norm.LOGGER, level='ERROR') as logs:
+            result = norm.normalize_value(12)
+
+        # post conditions
+        self.assertEqual(result, '12')
+        self.assertEqual(logs.output,
+                         ['ERROR:cdr_data_dictionary.normalize:Attribute error encountered '
+                          'for: [12] (int)'])
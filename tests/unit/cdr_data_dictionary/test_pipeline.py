@@ -0,0 +1,287 @@
+# Python imports
+from argparse import Namespace
+import copy
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+# Third party imports
+from mock import patch
+
+# Project imports
+import cdr_data_dictionary.constants as consts
+import cdr_data_dictionary.generate_yaml as gen
+import cdr_data_dictionary.pipeline as pipeline
+import cdr_data_dictionary.service as service
+import cdr_data_dictionary.snapshot_cache as snapshot_cache
+from stub_service import StubSheetsService
+
+
+class PipelineTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.meta_data = copy.copy(consts.INIT_META_DATA_VALUES)
+        self.meta_data.update({'version': '12', 'cdr_version': 'R2019Q4R3'})
+        link = 'https://github.com/all-of-us/curation'
+        self.values = [
+            (consts.CHANGE_LOG_TAB_NAME, [
+                ['Change Number', 'Change Description', 'Date Requested', 'Date Completed'],
+                ['C001', u'Edited \u201cdescriptions\u201d\nfor fields', '5/29/2019', '6/6/2019'],
+            ]),
+            (consts.CONCEPT_SUPPRESSIONS_TAB_NAME, [
+                ['Relevant OMOP Table', 'Field Name', 'Concept Name', 'Concept ID'],
+                ['observation', 'observation_source_concept_id', "Donor's name", '1585250'],
+                ['observation', 'value_source_concept_id', 'Other', '1585251'],
+            ]),
+            (consts.CLEANING_CONFORMANCE_TAB_NAME, [
+                ['Rule Name', 'Rule Description'],
+                ['clean_rule', 'curation'],
+            ]),
+        ]
+        self.formulas = [
+            (consts.CLEANING_CONFORMANCE_TAB_NAME, [
+                ['Rule Name', 'Rule Description'],
+                ['clean_rule', '=HYPERLINK("{}","curation")'.format(link)],
+            ]),
+            (consts.CHANGE_LOG_TAB_NAME, [
+                ['Change Number', 'Change Description', 'Date Requested', 'Date Completed'],
+                ['C001', u'Edited \u201cdescriptions\u201d\nfor fields', 43614, 43622],
+            ]),
+            (consts.CONCEPT_SUPPRESSIONS_TAB_NAME, [
+                ['Relevant OMOP Table', 'Field Name', 'Concept Name', 'Concept ID'],
+                ['observation', 'observation_source_concept_id', "Donor's name", 1585250],
+                ['observation', 'value_source_concept_id', 'Other', 1585251],
+            ]),
+        ]
+
+    def _settings(self, name, **kwargs):
+        settings = Namespace(column_id=None, incremental=False, pipeline_depth=1,
+                             output_file=os.path.join(self.temp_dir, name))
+        for key, value in kwargs.items():
+            setattr(settings, key, value)
+        return settings
+
+    def _read(self, settings):
+        with open(settings.output_file, 'rb') as yaml_file:
+            return yaml_file.read()
+
+    def test_run_stages_keeps_order(self):
+        # pre conditions
+        def slow_on_even(item):
+            time.sleep(0.02 if item % 2 == 0 else 0)
+            return item * 10
+
+        # test
+        results = list(pipeline.run_stages(range(8), [slow_on_even, str], depth=2))
+
+        # post conditions
+        self.assertEqual(results, [str(item * 10) for item in range(8)])
+
+    def test_run_stages_bounds_items_in_flight(self):
+        # pre conditions
+        produced = []
+        in_flight = []
+
+        def source():
+            for item in range(20):
+                produced.append(item)
+                yield item
+
+        # test
+        for item in pipeline.run_stages(source(), [lambda item: item], depth=1):
+            time.sleep(0.01)
+            in_flight.append(len(produced) - item)
+
+        # post conditions
+        # a queue of one before and after the stage, one item in the stage,
+        # one waiting in the source, and the item being consumed
+        self.assertLessEqual(max(in_flight), 5)
+        self.assertEqual(len(produced), 20)
+
+    def test_run_stages_raises_stage_error(self):
+        # pre conditions
+        threads = threading.active_count()
+
+        def fail_on_three(item):
+            if item == 3:
+                raise ValueError('bad item')
+            return item
+
+        # test
+        results = []
+        with self.assertRaises(ValueError):
+            for item in pipeline.run_stages(range(100), [fail_on_three], depth=1):
+                results.append(item)
+
+        # post conditions
+        self.assertEqual(results, [0, 1, 2])
+        self.assertEqual(threading.active_count(), threads)
+
+    def test_run_stages_stops_when_consumer_stops(self):
+        # pre conditions
+        threads = threading.active_count()
+        items = pipeline.run_stages(range(100), [lambda item: item], depth=1)
+
+        # test
+        first = next(items)
+        items.close()
+
+        # post conditions
+        self.assertEqual(first, 0)
+        self.assertEqual(threading.active_count(), threads)
+
+    def test_write_pipelined_yaml_file_matches_create(self):
+        # pre conditions
+        full = self._settings('full.yaml')
+        piped = self._settings('piped.yaml', pipeline_depth=2)
+        gen.create_yaml_file(full, gen.iter_merged_values(
+            copy.deepcopy(self.values), copy.deepcopy(self.formulas)), self.meta_data)
+
+        # test
+        gen.write_pipelined_yaml_file(piped, gen.iter_tab_pairs(
+            copy.deepcopy(self.values), copy.deepcopy(self.formulas)), self.meta_data)
+
+        # post conditions
+        self.assertIn(b'https://github.com/all-of-us/curation', self._read(piped))
+        self.assertEqual(self._read(piped), self._read(full))
+
+    def test_write_pipelined_yaml_file_aggregate(self):
+        # pre conditions
+        full = self._settings('full.yaml', aggregate=True)
+        piped = self._settings('piped.yaml', aggregate=True)
+        gen.create_yaml_file(full, gen.iter_merged_values(
+            copy.deepcopy(self.values), copy.deepcopy(self.formulas)), self.meta_data)
+
+        # test
+        gen.write_pipelined_yaml_file(piped, gen.iter_tab_pairs(
+            copy.deepcopy(self.values), copy.deepcopy(self.formulas)), self.meta_data)
+
+        # post conditions
+        self.assertEqual(self._read(piped), self._read(full))
+
+    def test_iter_tab_pairs_release(self):
+        # pre conditions
+        values = copy.deepcopy(self.values)
+        formulas = copy.deepcopy(self.formulas)
+
+        # test
+        pairs = list(gen.iter_tab_pairs(values, formulas))
+
+        # post conditions
+        self.assertEqual([pair[0] for pair in pairs], [tab for tab, _ in self.values])
+        self.assertEqual(pairs[2][2], self.formulas[0][1])
+        self.assertEqual(values, [])
+        self.assertEqual(formulas, [])
+
+    def test_iter_sheet_tabs(self):
+        # pre conditions
+        tabs = dict((tab_name, {'FORMATTED_VALUE': [], 'FORMULA': []})
+                    for tab_name in consts.SHEET_NAMES)
+        for tab_name, rows in self.values:
+            tabs[tab_name] = {'FORMATTED_VALUE': rows}
+        for tab_name, rows in self.formulas:
+            tabs[tab_name]['FORMULA'] = rows
+        stub = StubSheetsService(tabs)
+        args = Namespace(spreadsheet_id='abc123', sheet_name=consts.ALL, range=None,
+                         fetch_workers=1, chunk_rows=None)
+
+        # test
+        reads = service.iter_sheet_tabs(stub, args)
+        first = next(reads)
+
+        # post conditions
+        self.assertEqual(first, (consts.CHANGE_LOG_TAB_NAME, self.values[0][1],
+                                 self.formulas[1][1]))
+        # later tabs are only read when they are needed
+        self.assertEqual(stub.count('get'), 2)
+        self.assertEqual(len(list(reads)), len(consts.SHEET_NAMES) - 1)
+        self.assertEqual(stub.count('get'), 2 * len(consts.SHEET_NAMES))
+
+    def _stub_tabs(self):
+        tabs = dict((tab_name, {'FORMATTED_VALUE': [], 'FORMULA': []})
+                    for tab_name in consts.SHEET_NAMES)
+        for tab_name, rows in self.values:
+            tabs[tab_name] = {'FORMATTED_VALUE': rows}
+        for tab_name, rows in self.formulas:
+            tabs[tab_name]['FORMULA'] = rows
+        return StubSheetsService(tabs)
+
+    def test_iter_sheet_tabs_chunked(self):
+        # pre conditions
+        stub = self._stub_tabs()
+        args = Namespace(spreadsheet_id='abc123', sheet_name=consts.ALL, range=None,
+                         fetch_workers=1, chunk_rows=1)
+
+        # test
+        tabs = list(service.iter_sheet_tabs(stub, args))
+
+        # post conditions
+        values = service.read_sheet_values(stub, args)
+        formulas = service.read_sheet_values(stub, args, render_option='FORMULA')
+        self.assertEqual(tabs, list(gen.iter_tab_pairs(values, formulas)))
+        # the tab sizes are read once for every tab, and once for each of
+        # the two whole spreadsheet reads
+        self.assertEqual(stub.count('spreadsheets.get'), 3)
+
+    def test_iter_sheet_tabs_read_ahead(self):
+        # pre conditions
+        stub = self._stub_tabs()
+        args = Namespace(spreadsheet_id='abc123', sheet_name=consts.ALL, range=None,
+                         fetch_workers=3, chunk_rows=None)
+        expected = list(service.iter_sheet_tabs(self._stub_tabs(), args))
+
+        # test
+        reads = service.iter_sheet_tabs(stub, args, http_factory=object)
+        first = next(reads)
+
+        # post conditions
+        # at most fetch_workers tabs are read before the first is yielded
+        self.assertLessEqual(stub.count('get'), 2 * 3)
+        self.assertEqual([first] + list(reads), expected)
+        self.assertEqual(stub.count('get'), 2 * len(consts.SHEET_NAMES))
+        self.assertNotIn(None, stub.http_clients)
+
+    def test_iter_sheet_tabs_range(self):
+        # pre conditions
+        stub = self._stub_tabs()
+        args = Namespace(spreadsheet_id='abc123', sheet_name=consts.ALL, range='A1:B2',
+                         fetch_workers=1, chunk_rows=None)
+
+        # test
+        tabs = list(service.iter_sheet_tabs(stub, args))
+
+        # post conditions
+        # every tab is read whole, as read_sheet_values reads it
+        ranges = [kwargs['range'] for method, kwargs in stub.calls if method == 'get']
+        self.assertEqual(ranges[::2], consts.SHEET_NAMES)
+        self.assertEqual([tab[0] for tab in tabs],
+                         [tab_name for tab_name, _ in service.read_sheet_values(stub, args)])
+
+    def test_iter_spreadsheet_tabs_snapshot(self):
+        # pre conditions
+        stub = self._stub_tabs()
+        args = Namespace(spreadsheet_id='abc123', sheet_name=consts.ALL, range=None,
+                         fetch_workers=1, chunk_rows=None)
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        writer = snapshot_cache.SnapshotWriter(cache_dir, 'key')
+
+        # test
+        with patch.object(service, 'create_spreadsheets_service', return_value=stub), \
+                patch.object(service, 'create_http_factory', return_value=None):
+            tabs = list(gen._iter_spreadsheet_tabs(args, None, writer))
+
+        # post conditions
+        values, formulas = snapshot_cache.load_snapshot(cache_dir, 'key')
+        self.assertEqual([(tab_name, rows) for tab_name, rows, _ in tabs], values)
+        self.assertEqual([(tab_name, rows) for tab_name, _, rows in tabs], formulas)
@@ -0,0 +1,190 @@
+# Python imports
+from argparse import Namespace
+import os
+import shutil
+import tempfile
+import unittest
+
+# Third party imports
+
+# Project imports
+import cdr_data_dictionary.constants as consts
+import cdr_data_dictionary.generate_yaml as gen
+import cdr_data_dictionary.projection as projection
+import cdr_data_dictionary.service as service
+import cdr_data_dictionary.validator as validator
+from stub_service import StubSheetsService
+
+
+class ProjectionTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.tab_name = consts.CONCEPT_SUPPRESSIONS_TAB_NAME
+        self.values = [
+            ['Relevant OMOP Table', 'Field Name', 'Concept Name', 'Concept ID', 'Notes'],
+            ['observation', 'value_source_concept_id', 'Other', '1585250', 'note'],
+            ['observation', '', 'Blank', '903133'],
+            [],
+            ['', '', 'Name only'],
+            ['measurement', 'value_source_concept_id', 'Height', '903134', ''],
+            ['', '', 'Name only', '', 'note'],
+        ]
+        self.columns = [(None, ['relevant_omop_table', 'notes']),
+                        (consts.CHANGE_LOG_TAB_NAME, ['change_number'])]
+        self.settings = Namespace(column_id=None, columns=self.columns)
+
+    def test_projected_fields(self):
+        # post conditions
+        self.assertEqual(projection.projected_fields(self.columns, self.tab_name),
+                         set(['relevant_omop_table', 'notes']))
+        self.assertEqual(projection.projected_fields(self.columns, consts.CHANGE_LOG_TAB_NAME),
+                         set(['change_number']))
+        self.assertIsNone(projection.projected_fields(None, self.tab_name))
+        self.assertEqual(projection.all_projected_fields(self.columns),
+                         set(['relevant_omop_table', 'notes', 'change_number']))
+
+    def test_project_rows(self):
+        # pre conditions
+        fields = gen._process_field_names(self.values[0])
+        indexes = projection.column_indexes(fields, set(['relevant_omop_table']), 3)
+
+        # test
+        rows = list(projection.project_rows(self.values, indexes))
+
+        # post conditions
+        self.assertEqual(indexes, [0, 3])
+        self.assertEqual(rows, [['Relevant OMOP Table', 'Concept ID'],
+                                ['observation', '1585250'],
+                                ['observation', '903133'],
+                                [],
+                                [],
+                                ['measurement', '903134']])
+
+    def test_column_ranges(self):
+        # post conditions
+        self.assertEqual(projection.column_ranges([0, 1, 3, 5, 6, 7]),
+                         [(0, 1), (3, 3), (5, 7)])
+
+    def test_create_yaml_file_projection(self):
+        # test
+        _, fields, rows, group_by = gen._create_yaml_file(
+            self.settings, self.tab_name, self.values)
+        rows = list(rows)
+
+        # post conditions
+        self.assertEqual(fields, ['relevant_omop_table', 'concept_id', 'notes'])
+        self.assertEqual(group_by, 1)
+        self.assertEqual(rows[0], {'relevant_omop_table': ['observation'],
+                                   'concept_id': ['1585250'], 'notes': ['note']})
+        # defaults of fields that are not projected are removed
+        self.assertEqual(set(rows[1]), set(['relevant_omop_table', 'concept_id']))
+        self.assertEqual(len(rows), 6)
+
+    def test_missing_fields_warnings(self):
+        # pre conditions
+        self.settings.columns = [(None, ['change_number']),
+                                 (consts.FIELD_SUPPRESSIONS_TAB_NAME, ['missing_field'])]
+
+        # test
+        with self.assertLogs(projection.LOGGER, level='DEBUG') as global_logs:
+            gen._create_yaml_file(self.settings, self.tab_name, self.values)
+        with self.assertLogs(projection.LOGGER, level='DEBUG') as tab_logs:
+            gen._create_yaml_file(self.settings, consts.FIELD_SUPPRESSIONS_TAB_NAME,
+                                  self.values)
+
+        # post conditions
+        # fields of a specification for every tab are only logged at debug level
+        self.assertEqual([record.levelname for record in global_logs.records], ['DEBUG'])
+        self.assertEqual([record.levelname for record in tab_logs.records], ['WARNING'])
+        self.assertIn('missing_field', tab_logs.output[0])
+
+    def test_read_projected_values_matches_projection(self):
+        # pre conditions
+        stub = StubSheetsService({self.tab_name: {'FORMATTED_VALUE': self.values}})
+        args = Namespace(spreadsheet_id='abc123', sheet_name=self.tab_name, range=None,
+                         columns=self.columns, column_id=None)
+
+        # test
+        tab_ranges = service.read_projected_ranges(stub, args, gen.select_columns(args))
+        fetched = service.read_projected_values(stub, args, tab_ranges)
+
+        # post conditions
+        self.assertEqual(tab_ranges, [(self.tab_name, [(0, 0), (3, 4)])])
+        _, rows = fetched[0]
+        self.assertEqual(rows[0], ['Relevant OMOP Table', '', '', 'Concept ID', 'Notes'])
+        self.assertEqual(stub.count('batchGet'), 2)
+        requested = stub.calls[-1][1]['ranges']
+        self.assertEqual(requested, ["'{}'!A:A".format(self.tab_name),
+                                     "'{}'!D:E".format(self.tab_name)])
+        # processing the fetched columns writes the same yaml as processing
+        # the whole tab
+        self.assertEqual(gen._render_section(self.settings, self.tab_name, rows),
+                         gen._render_section(self.settings, self.tab_name, self.values))
+
+    def test_project_schema(self):
+        # pre conditions
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        schema_path = os.path.join(temp_dir, 'schema.yaml')
+        with open(schema_path, 'w') as schema_file:
+            schema_file.write("meta_data: list(include('meta_data_item'))\n"
+                              "items: list(include('item'))\n"
+                              "---\n"
+                              "meta_data_item:\n"
+                              "    name: any(str(), null())\n"
+                              "item:\n"
+                              "    concept_id: any(int(), null())\n"
+                              "    notes: str()\n"
+                              "    flag: bool()\n"
+                              "    extra: str(required=False)\n")
+        data_path = os.path.join(temp_dir, 'data.yaml')
+        with open(data_path, 'w') as data_file:
+            data_file.write("meta_data:\n  -\n    name: 'dictionary'\n"
+                            "items:\n  -\n    concept_id: 1\n")
+
+        # test
+        projected = validator.project_schema(schema_path, set(['concept_id']),
+                                             os.path.join(temp_dir, 'projected.yaml'))
+
+        # post conditions
+        with open(projected) as projected_file:
+            lines = projected_file.read().splitlines()
+        self.assertIn("    name: any(str(), null())", lines)
+        self.assertIn("    concept_id: any(int(), null())", lines)
+        self.assertIn("    notes: str(required=False)", lines)
+        self.assertIn("    flag: bool(required=False)", lines)
+        self.assertIn("    extra: str(required=False)", lines)
+        self.assertRaises(ValueError, validator.validate, schema_path, data_path)
+        validator.validate(projected, data_path)
+
+    def test_project_schema_aggregated(self):
+        # pre conditions
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        schema_path = os.path.join(temp_dir, 'schema.yaml')
+        with open(schema_path, 'w') as schema_file:
+            schema_file.write("meta_data: list(include('meta_data_item'))\n"
+                              "---\n"
+                              "meta_data_item:\n"
+                              "    name: any(str(), null())\n"
+                              "item:\n"
+                              "    flag: bool()\n"
+                              "    extra: str(required=False)\n")
+
+        # test
+        projected = validator.project_schema(schema_path, None,
+                                             os.path.join(temp_dir, 'schemas', 'projected.yaml'),
+                                             aggregated=True)
+
+        # post conditions
+        with open(projected) as projected_file:
+            lines = projected_file.read().splitlines()
+        self.assertIn("    name: any(str(), null())", lines)
+        self.assertIn("    flag: any(bool(), list(bool()))", lines)
+        self.assertIn("    extra: any(str(), list(str()), required=False)", lines)
@@ -0,0 +1,149 @@
+# Python imports
+from argparse import Namespace
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+
+# Third party imports
+
+# Project imports
+import cdr_data_dictionary.constants as consts
+import cdr_data_dictionary.generate_yaml as gen
+import cdr_data_dictionary.query as query
+
+
+class QueryTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.document = {
+            'meta_data': [{'version': 12, 'cdr_version': 'R2019Q4R3'}],
+            'transformations': [
+                {'change_log': [{'change_number': 'C001', 'completed_by': 'KCT'}]},
+                {'available_fields': [
+                    {'relevant_omop_table': 'observation', 'field_name': 'value_source_concept_id',
+                     'description': 'answer'},
+                    {'relevant_omop_table': ['person', 'ds_person'], 'field_name': 'person_id'},
+                ]},
+                {'table_suppressions': [{'relevant_omop_table': 'note'}]},
+                {'field_suppressions': [
+                    {'relevant_omop_table': 'observation', 'field_name': 'value_source_value'},
+                ]},
+                {'concept_suppressions': [
+                    {'concept_id': 1585250, 'field_name': 'observation_source_concept_id'},
+                    {'concept_id': [1585251, '1585252'], 'field_name': 'value_source_concept_id'},
+                    {'concept_id': 'varies'},
+                ]},
+                {'field_generalizations': None},
+                {'concept_generalizations': [
+                    {'concept_id': 1585838, 'input_concept_id': 1585839,
+                     'generalized_output_concept_id': 2000000002},
+                    {'concept_id': 1585838, 'input_concept_id': 903096,
+                     'generalized_output_concept_id': 2000000002},
+                    {'concept_id': 1585845, 'input_concept_id': [903096, 1585847],
+                     'generalized_output_concept_id': 2000000009},
+                    {'concept_id': 1585899, 'input_concept_id': [1585900, 1585901],
+                     'generalized_output_concept_id': [2000000003, 1585900]},
+                ]},
+            ],
+        }
+
+    def test_concept_ids(self):
+        # test
+        values = [query.concept_ids(value) for value in
+                  [None, 1585250, '1585250 ', [1, 'varies', True], 'http://athena.ohdsi.org']]
+
+        # post conditions
+        self.assertEqual(values, [[], [1585250], [1585250], [1], []])
+
+    def test_suppressions(self):
+        # test
+        dictionary = query.DataDictionary(self.document)
+
+        # post conditions
+        self.assertTrue(dictionary.is_suppressed(1585250))
+        self.assertTrue(dictionary.is_suppressed(1585252))
+        self.assertFalse(dictionary.is_suppressed(1585253))
+        self.assertEqual(dictionary.suppressions(1585251)[0]['field_name'],
+                         'value_source_concept_id')
+        self.assertEqual(len(dictionary.suppressed_concepts), 3)
+
+    def test_generalizations(self):
+        # test
+        dictionary = query.DataDictionary(self.document)
+
+        # post conditions
+        self.assertEqual(dictionary.generalized_output(1585839), 2000000002)
+        self.assertEqual(dictionary.generalized_output(903096), 2000000002)
+        self.assertEqual(dictionary.generalized_output(903096, 1585845), 2000000009)
+        self.assertEqual(dictionary.generalized_output(1585839, 1585845, default=-1), -1)
+        self.assertEqual(dictionary.generalized_outputs[903096], [2000000002, 2000000009])
+        # several outputs do not say which input has which output
+        self.assertIsNone(dictionary.generalized_output(1585900))
+        self.assertEqual(len(dictionary.generalization_rules(1585900)), 1)
+        self.assertEqual(len(dictionary.generalizations(1585838)), 2)
+
+    def test_fields(self):
+        # test
+        dictionary = query.DataDictionary(self.document)
+
+        # post conditions
+        field = dictionary.field('observation', 'value_source_concept_id')
+        self.assertEqual(list(field), [query.AVAILABLE_FIELDS])
+        self.assertEqual(field[query.AVAILABLE_FIELDS][0]['description'], 'answer')
+        self.assertEqual(len(dictionary.field('ds_person', 'person_id', query.AVAILABLE_FIELDS)), 1)
+        self.assertEqual(dictionary.field('person', 'gender', query.FIELD_SUPPRESSIONS), [])
+        self.assertTrue(dictionary.is_field_suppressed('observation', 'value_source_value'))
+        self.assertFalse(dictionary.is_field_suppressed('observation', 'value_source_concept_id'))
+        self.assertTrue(dictionary.is_field_suppressed('note', 'note_text'))
+        self.assertEqual(list(dictionary.field('note', 'note_text')), [query.TABLE_SUPPRESSIONS])
+        self.assertTrue(dictionary.is_table_suppressed('note'))
+
+    def test_changes(self):
+        # test
+        dictionary = query.DataDictionary(self.document)
+
+        # post conditions
+        self.assertEqual(dictionary.change('C001')['completed_by'], 'KCT')
+        self.assertIsNone(dictionary.change('C002'))
+        self.assertEqual(dictionary.meta_data['version'], 12)
+
+    def test_load(self):
+        # pre conditions
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        settings = Namespace(column_id=None, incremental=False,
+                             output_file=os.path.join(temp_dir, 'out.yaml'))
+        meta_data = copy.copy(consts.INIT_META_DATA_VALUES)
+        meta_data.update({'version': '12', 'cdr_version': 'R2019Q4R3'})
+        values = [
+            (consts.CONCEPT_SUPPRESSIONS_TAB_NAME, [
+                ['Relevant OMOP Table', 'Field Name', 'Concept Name', 'Concept ID'],
+                ['observation', 'observation_source_concept_id', 'Name', '1585250'],
+            ]),
+            (consts.CONCEPT_GENERALIZATIONS_TAB_NAME, [
+                ['Relevant OMOP Table', 'Field Name', 'Concept Name', 'Concept ID',
+                 'Input Concept ID', 'Generalized Output Concept ID'],
+                ['observation', 'observation_source_concept_id', 'Name', '1585838',
+                 '1585839', '2000000002'],
+            ]),
+        ]
+        gen.create_yaml_file(settings, values, meta_data)
+
+        # test
+        dictionary = query.load(settings.output_file)
+
+        # post conditions
+        self.assertTrue(dictionary.is_suppressed(1585250))
+        self.assertEqual(dictionary.generalized_output(1585839, 1585838), 2000000002)
+
+
+if __name__ == '__main__':
+    unittest.main()
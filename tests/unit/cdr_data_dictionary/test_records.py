@@ -0,0 +1,92 @@
+# Python imports
+import copy
+import unittest
+
+# Third party imports
+
+# Project imports
+import cdr_data_dictionary.records as records
+
+
+def legacy_row(fields, row, init_fields):
+    """ Build a row dictionary the way rows were stored before records. """
+    new_dict = copy.copy(init_fields)
+    for index, val in enumerate(row):
+        new_dict[fields[index]] = [val]
+    return new_dict
+
+
+class RecordsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.fields = ['field_one', 'field_two', 'field_three', 'field_four']
+        self.init_fields = {'field_three': [''], 'field_five': ['']}
+        self.schema = records.TabSchema(self.fields, self.init_fields)
+
+    def test_schema_keys(self):
+        # post conditions
+        self.assertEqual(self.schema.keys,
+                         ['field_three', 'field_five', 'field_one', 'field_two', 'field_four'])
+        self.assertEqual(self.schema.column_slots, [2, 3, 0, 4])
+
+    def test_record_matches_dictionary(self):
+        # pre conditions
+        rows = [
+            ['a', 'b', 'c', 'd'],
+            ['a', 'b'],
+            [],
+            ['a', 'b', 'c'],
+        ]
+
+        for row in rows:
+            # test
+            record = self.schema.record(row)
+            expected = legacy_row(self.fields, row, self.init_fields)
+
+            # post conditions
+            self.assertEqual(record, expected)
+            self.assertEqual(list(record), list(expected))
+            self.assertEqual(len(record), len(expected))
+            self.assertEqual(list(record.items()), list(expected.items()))
+            self.assertEqual(record.raw_items(),
+                             [(key, value[0]) for key, value in expected.items()])
+
+    def test_missing_fields(self):
+        # pre conditions
+        record = self.schema.record(['a'])
+
+        # post conditions
+        self.assertNotIn('field_two', record)
+        self.assertIn('field_three', record)
+        self.assertIsNone(record.get('field_two'))
+        self.assertEqual(record.get('field_three'), [''])
+        self.assertRaises(KeyError, lambda: record['field_two'])
+        self.assertRaises(KeyError, lambda: record['unknown'])
+
+    def test_duplicate_fields(self):
+        # pre conditions
+        fields = ['field_one', 'field_two', 'field_one']
+        schema = records.TabSchema(fields)
+
+        # test
+        record = schema.record(['a', 'b', 'c'])
+
+        # post conditions
+        self.assertEqual(schema.keys, ['field_one', 'field_two'])
+        self.assertEqual(record, legacy_row(fields, ['a', 'b', 'c'], {}))
+        self.assertEqual(list(record.items()), [('field_one', ['c']), ('field_two', ['b'])])
+
+    def test_rows_share_schema(self):
+        # test
+        first = self.schema.record(['a'])
+        second = self.schema.record(['b'])
+
+        # post conditions
+        self.assertIs(first.schema, second.schema)
+        self.assertIsInstance(first.values, tuple)
@@ -0,0 +1,335 @@
+# Python imports
+from argparse import Namespace
+import io
+import json
+import os
+import threading
+import unittest
+
+# Third party imports
+from mock import patch
+
+# Project imports
+import cdr_data_dictionary.constants as consts
+import cdr_data_dictionary.generate_yaml as gen
+import cdr_data_dictionary.service as service
+from stub_service import StubSheetsService
+
+
+class ServiceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.tabs = {}
+        for index, name in enumerate(consts.SHEET_NAMES):
+            self.tabs[name] = {
+                'FORMATTED_VALUE': [['Field One', 'Field Two'], [name, str(index)]],
+                'FORMULA': [['Field One', 'Field Two'], [name, '=ROW()']],
+            }
+        self.stub = StubSheetsService(self.tabs)
+        self.args = Namespace(spreadsheet_id='abc123', sheet_name=consts.ALL,
+                              range=None, batch_size=None,
+                              fetch_workers=1)
+
+    def test_read_sheet_values(self):
+        # test
+        results = service.read_sheet_values(self.stub, self.args)
+
+        # post conditions
+        expected = [(name, self.tabs[name]['FORMATTED_VALUE']) for name in consts.SHEET_NAMES]
+        self.assertEqual(results, expected)
+        self.assertEqual(self.stub.count('get'), len(consts.SHEET_NAMES))
+
+    def test_batch_read_sheet_values(self):
+        # test
+        values = service.batch_read_sheet_values(self.stub, self.args)
+        formulas = service.batch_read_sheet_values(self.stub, self.args, 'FORMULA')
+
+        # post conditions
+        self.assertEqual(values, service.read_sheet_values(self.stub, self.args))
+        self.assertEqual(formulas, service.read_sheet_values(self.stub, self.args, 'FORMULA'))
+        self.assertEqual(self.stub.count('batchGet'), 2)
+
+    def test_batch_read_sheet_values_batch_size(self):
+        # pre conditions
+        self.args.batch_size = 4
+
+        # test
+        values = service.batch_read_sheet_values(self.stub, self.args)
+
+        # post conditions
+        self.assertEqual([tab for tab, _ in values], consts.SHEET_NAMES)
+        self.assertEqual(self.stub.count(), 3)
+        self.assertEqual([len(kwargs['ranges']) for _, kwargs in self.stub.calls], [4, 4, 2])
+
+    def test_batch_read_sheet_values_single_range(self):
+        # pre conditions
+        self.args.sheet_name = consts.WEARABLES_TAB_NAME
+        self.args.range = 'A1:F20'
+
+        # test
+        values = service.batch_read_sheet_values(self.stub, self.args)
+
+        # post conditions
+        expected = [(consts.WEARABLES_TAB_NAME + '!A1:F20',
+                     self.tabs[consts.WEARABLES_TAB_NAME]['FORMATTED_VALUE'])]
+        self.assertEqual(values, expected)
+        self.assertEqual(self.stub.count('batchGet'), 1)
+
+    def test_read_sheet_values_concurrently(self):
+        # pre conditions
+        # the first tabs take the longest, so requests finish out of order
+        delays = {}
+        for index, name in enumerate(consts.SHEET_NAMES):
+            delays[name] = 0.002 * (len(consts.SHEET_NAMES) - index)
+        self.stub = StubSheetsService(self.tabs, delays)
+        self.args.fetch_workers = 4
+
+        clients = []
+        owners = []
+        lock = threading.Lock()
+
+        def http_factory():
+            client = object()
+            with lock:
+                clients.append(client)
+                owners.append(threading.current_thread())
+            return client
+
+        # test
+        values = service.read_sheet_values(self.stub, self.args,
+                                           http_factory=http_factory)
+
+        # post conditions
+        expected = [(name, self.tabs[name]['FORMATTED_VALUE']) for name in consts.SHEET_NAMES]
+        self.assertEqual(values, expected)
+        self.assertEqual(self.stub.count('get'), len(consts.SHEET_NAMES))
+        # one client per worker thread, and every request used one of them
+        self.assertTrue(1 <= len(clients) <= 4)
+        self.assertEqual(len(set(owners)), len(clients))
+        self.assertTrue(all(http in clients for http in self.stub.http_clients))
+
+    def test_read_sheet_values_without_http_factory(self):
+        # pre conditions
+        self.args.fetch_workers = 4
+
+        # test
+        values = service.read_sheet_values(self.stub, self.args)
+
+        # post conditions
+        self.assertEqual([tab for tab, _ in values], consts.SHEET_NAMES)
+        self.assertEqual(self.stub.http_clients, [None] * len(consts.SHEET_NAMES))
+
+
+class HyperlinkFetchTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        # hyperlink_sheet.json is a synthetic fixture, written by hand in the
+        # shape of a values.get response.  It was not captured from the api.
+        fixture = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               'fixtures', 'hyperlink_sheet.json')
+        with io.open(fixture, encoding='utf-8') as fixture_file:
+            synthetic = json.load(fixture_file)
+
+        self.stub = StubSheetsService(synthetic['tabs'],
+                                      sheet_order=synthetic['spreadsheet_order'])
+        self.args = Namespace(spreadsheet_id='abc123', sheet_name=consts.ALL,
+                              range=None, batch_size=None, fetch_workers=1)
+        # requested in a different order than the spreadsheet order
+        self.sheet_names = [consts.CHANGE_LOG_TAB_NAME, consts.CLEANING_CONFORMANCE_TAB_NAME]
+
+    def _two_pass(self):
+        values = service.read_sheet_values(self.stub, self.args)
+        formulas = service.read_sheet_values(self.stub, self.args, render_option='FORMULA')
+        return gen.merge_values_and_formulas(values, formulas)
+
+    def test_read_sheet_grid_matches_merge(self):
+        # test
+        with patch.object(consts, 'SHEET_NAMES', self.sheet_names):
+            merged = self._two_pass()
+            grid = service.read_sheet_grid(self.stub, self.args)
+
+        # post conditions
+        self.assertEqual(grid, merged)
+        self.assertEqual([tab_name for tab_name, _ in grid], self.sheet_names)
+        self.assertEqual(self.stub.count('get'), 4)
+        self.assertEqual(self.stub.count('spreadsheets.get'), 1)
+        _, kwargs = self.stub.calls[-1]
+        self.assertEqual(kwargs['fields'], service.GRID_FIELDS)
+        self.assertTrue(kwargs['includeGridData'])
+
+    def test_read_sheet_grid_yaml_matches_merge(self):
+        # pre conditions
+        settings = Namespace(column_id=None)
+
+        # test
+        with patch.object(consts, 'SHEET_NAMES', self.sheet_names):
+            merged = self._two_pass()
+            grid = service.read_sheet_grid(self.stub, self.args)
+
+        # post conditions
+        for (tab_name, merged_rows), (_, grid_rows) in zip(merged, grid):
+            self.assertEqual(gen._render_section(settings, tab_name, grid_rows),
+                             gen._render_section(settings, tab_name, merged_rows))
+
+    def test_read_sheet_grid_batch_size(self):
+        # pre conditions
+        self.args.batch_size = 1
+
+        # test
+        with patch.object(consts, 'SHEET_NAMES', self.sheet_names):
+            grid = service.read_sheet_grid(self.stub, self.args)
+
+        # post conditions
+        self.assertEqual([tab_name for tab_name, _ in grid], self.sheet_names)
+        self.assertEqual(self.stub.count('spreadsheets.get'), 2)
+
+    def test_pick_cell_value(self):
+        # post conditions
+        self.assertEqual(service._pick_cell_value({}), '')
+        self.assertEqual(service._pick_cell_value({'formattedValue': 'a'}), 'a')
+        self.assertEqual(service._pick_cell_value(
+            {'formattedValue': 'a', 'hyperlink': ' https://x.org '}), 'https://x.org')
+        self.assertEqual(service._pick_cell_value(
+            {'formattedValue': 'a', 'hyperlink': '#gid=1'}), 'a')
+
+
+class ChunkedFetchTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.tab_name = consts.CONCEPT_SUPPRESSIONS_TAB_NAME
+        rows = [['Concept ID', 'Concept Name', 'Notes']]
+        rows.extend([str(index), 'concept {}'.format(index)] for index in range(1, 23))
+        # empty rows at the end of the first chunk must keep later rows in place
+        rows[3] = []
+        rows[4] = []
+        self.rows = rows
+        self.tabs = {
+            self.tab_name: {'FORMATTED_VALUE': rows},
+            consts.CHANGE_LOG_TAB_NAME: {'FORMATTED_VALUE': [['Change Number'], ['1']]},
+        }
+        self.stub = StubSheetsService(self.tabs)
+        self.args = Namespace(spreadsheet_id='abc123', sheet_name=consts.ALL,
+                              range=None, batch_size=None, fetch_workers=1,
+                              chunk_rows=5)
+        self.sheet_names = [self.tab_name, consts.CHANGE_LOG_TAB_NAME]
+
+    def test_column_letters(self):
+        # post conditions
+        self.assertEqual([service._column_letters(count) for count in [1, 17, 26, 27, 52, 53]],
+                         ['A', 'Q', 'Z', 'AA', 'AZ', 'BA'])
+
+    def test_partition_ranges(self):
+        # test
+        chunks = service.partition_ranges(['Concept (Row) Suppressions', 'Change Log'],
+                                          {'Concept (Row) Suppressions': (12000, 17),
+                                           'Change Log': (100, 6)}, 5000)
+
+        # post conditions
+        self.assertEqual(chunks, [
+            ('Concept (Row) Suppressions', "'Concept (Row) Suppressions'!A1:Q5000", 5000),
+            ('Concept (Row) Suppressions', "'Concept (Row) Suppressions'!A5001:Q10000", 5000),
+            ('Concept (Row) Suppressions', "'Concept (Row) Suppressions'!A10001:Q12000", 2000),
+            ('Change Log', 'Change Log', 100),
+        ])
+
+    def test_read_sheet_values_chunked(self):
+        # test
+        with patch.object(consts, 'SHEET_NAMES', self.sheet_names):
+            results = service.read_sheet_values(self.stub, self.args)
+
+        # post conditions
+        self.assertEqual(results, [(self.tab_name, self.rows),
+                                   (consts.CHANGE_LOG_TAB_NAME, [['Change Number'], ['1']])])
+        # one size request, seven chunks of the 33 row tab, and three chunks
+        # of the 12 row tab
+        self.assertEqual(self.stub.count('spreadsheets.get'), 1)
+        self.assertEqual(self.stub.count('get'), 10)
+
+    def test_read_sheet_values_chunked_concurrently(self):
+        # pre conditions
+        self.args.fetch_workers = 3
+
+        # test
+        with patch.object(consts, 'SHEET_NAMES', self.sheet_names):
+            results = service.read_sheet_values(self.stub, self.args, http_factory=object)
+
+        # post conditions
+        self.assertEqual(results[0], (self.tab_name, self.rows))
+        self.assertEqual(self.stub.count('get'), 10)
+
+    @patch.object(service, 'RETRY_DELAY', 0)
+    def test_read_sheet_values_chunk_retry(self):
+        # pre conditions
+        chunk_range = "'{}'!A6:C10".format(self.tab_name)
+        self.stub.failures[chunk_range] = 2
+
+        # test
+        with patch.object(consts, 'SHEET_NAMES', self.sheet_names):
+            results = service.read_sheet_values(self.stub, self.args)
+
+        # post conditions
+        self.assertEqual(results[0], (self.tab_name, self.rows))
+        ranges = [kwargs['range'] for method, kwargs in self.stub.calls if method == 'get']
+        # only the failed chunk is read again
+        self.assertEqual(ranges.count(chunk_range), 3)
+        self.assertEqual(len(ranges), 12)
+
+    @patch.object(service, 'RETRY_DELAY', 0)
+    def test_read_sheet_values_chunk_retries_exhausted(self):
+        # pre conditions
+        self.stub.failures["'{}'!A6:C10".format(self.tab_name)] = 4
+
+        # test
+        with patch.object(consts, 'SHEET_NAMES', self.sheet_names):
+            self.assertRaises(service.HttpError, service.read_sheet_values,
+                              self.stub, self.args)
+
+    @patch.object(service, 'RETRY_DELAY', 0)
+    def test_read_sheet_values_chunk_not_found(self):
+        # pre conditions
+        chunk_range = "'{}'!A6:C10".format(self.tab_name)
+        self.stub.failures[chunk_range] = 1
+        self.stub.failure_status = 404
+
+        # test
+        with patch.object(consts, 'SHEET_NAMES', self.sheet_names):
+            self.assertRaises(service.HttpError, service.read_sheet_values,
+                              self.stub, self.args)
+
+        # post conditions
+        ranges = [kwargs['range'] for method, kwargs in self.stub.calls if method == 'get']
+        self.assertEqual(ranges.count(chunk_range), 1)
+
+    @patch.object(service, 'RETRY_DELAY', 0)
+    def test_read_sheet_values_chunk_rate_limited(self):
+        # pre conditions
+        chunk_range = "'{}'!A6:C10".format(self.tab_name)
+        self.stub.failures[chunk_range] = 1
+        self.stub.failure_status = 429
+
+        # test
+        with patch.object(consts, 'SHEET_NAMES', self.sheet_names):
+            results = service.read_sheet_values(self.stub, self.args)
+
+        # post conditions
+        self.assertEqual(results[0], (self.tab_name, self.rows))
+        ranges = [kwargs['range'] for method, kwargs in self.stub.calls if method == 'get']
+        self.assertEqual(ranges.count(chunk_range), 2)
@@ -0,0 +1,119 @@
+# Python imports
+from argparse import Namespace
+import os
+import shutil
+import tempfile
+import unittest
+
+# Third party imports
+
+# Project imports
+import cdr_data_dictionary.constants as consts
+import cdr_data_dictionary.snapshot_cache as cache
+
+
+class SnapshotCacheTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.args = Namespace(spreadsheet_id='abc123', sheet_name=consts.ALL, range=None)
+        self.values = [(consts.CHANGE_LOG_TAB_NAME, [['Change Number'], [u'C001’']])]
+        self.formulas = [(consts.CHANGE_LOG_TAB_NAME, [['Change Number'], ['=HYPERLINK("a","b")']])]
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_snapshot_key(self):
+        # test
+        key = cache.snapshot_key(self.args, {'version': '2571'})
+        same = cache.snapshot_key(self.args, {'version': '2571'})
+        newer = cache.snapshot_key(self.args, {'version': '2572'})
+        self.args.sheet_name = consts.WEARABLES_TAB_NAME
+        other_tab = cache.snapshot_key(self.args, {'version': '2571'})
+
+        # post conditions
+        self.assertTrue(key.startswith('abc123_2571_'))
+        self.assertEqual(key, same)
+        self.assertNotEqual(key, newer)
+        self.assertNotEqual(key, other_tab)
+
+    def test_snapshot_key_fetch_mode(self):
+        # test
+        key = cache.snapshot_key(self.args, {'version': '2571'})
+        self.args.batch_fetch = True
+        batch = cache.snapshot_key(self.args, {'version': '2571'})
+        self.args.batch_fetch = False
+        self.args.hyperlink_fetch = True
+        hyperlink = cache.snapshot_key(self.args, {'version': '2571'})
+
+        # post conditions
+        # batch fetches read the same values and formulas
+        self.assertEqual(key, batch)
+        # hyperlink fetches store merged values without formulas
+        self.assertNotEqual(key, hyperlink)
+
+    def test_save_and_load_snapshot(self):
+        # test
+        cache.save_snapshot(self.cache_dir, 'key', self.values, self.formulas)
+        snapshot = cache.load_snapshot(self.cache_dir, 'key')
+
+        # post conditions
+        self.assertEqual(snapshot, (self.values, self.formulas))
+
+    def test_snapshot_writer(self):
+        # pre conditions
+        writer = cache.SnapshotWriter(self.cache_dir, 'key')
+        writer.write_tab(consts.CHANGE_LOG_TAB_NAME, self.values[0][1], self.formulas[0][1])
+
+        # test
+        partial = cache.load_snapshot(self.cache_dir, 'key')
+        writer.close()
+        snapshot = cache.load_snapshot(self.cache_dir, 'key')
+
+        # post conditions
+        # snapshots are only readable once every tab is written
+        self.assertEqual(partial, None)
+        self.assertEqual(snapshot, (self.values, self.formulas))
+
+    def test_snapshot_writer_discard(self):
+        # pre conditions
+        writer = cache.SnapshotWriter(self.cache_dir, 'key')
+        writer.write_tab(consts.CHANGE_LOG_TAB_NAME, self.values[0][1], self.formulas[0][1])
+
+        # test
+        writer.discard()
+
+        # post conditions
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_load_snapshot_missing(self):
+        # test
+        snapshot = cache.load_snapshot(self.cache_dir, 'key')
+
+        # post conditions
+        self.assertEqual(snapshot, None)
+
+    def test_evict_least_recently_used(self):
+        # pre conditions
+        for index, key in enumerate(['first', 'second', 'third']):
+            path = cache.save_snapshot(self.cache_dir, key, self.values, self.formulas)
+            os.utime(path, (1000 + index, 1000 + index))
+        size = os.path.getsize(path)
+
+        # reading a snapshot makes it the most recently used
+        cache.load_snapshot(self.cache_dir, 'first')
+
+        # test
+        path = cache.save_snapshot(self.cache_dir, 'fourth', self.values,
+                                   self.formulas, max_bytes=size * 2 + 16)
+
+        # post conditions
+        remaining = sorted(os.listdir(self.cache_dir))
+        expected = ['first' + cache.SNAPSHOT_SUFFIX, 'fourth' + cache.SNAPSHOT_SUFFIX]
+        self.assertEqual(remaining, expected)
@@ -0,0 +1,67 @@
+# Python imports
+import unittest
+
+# Third party imports
+from dateutil import parser as dt_parser
+
+# Project imports
+import cdr_data_dictionary.constants as consts
+import cdr_data_dictionary.temporal as temporal
+
+
+class TemporalTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.converter = temporal.TemporalConverter(cache_size=3)
+
+    def test_convert_matches_dateutil(self):
+        # pre conditions
+        values = ['2019-05-29', '5/29/2019', '05/29/2019', '2019-01-15 18:38:57',
+                  '1/15/2019 18:38:57', '2020-02-05T20:25:10.000Z', '2020-02-05T20:25:10Z',
+                  '13/05/2019', 'May 29, 2019', '2019-5-9']
+
+        for value in values:
+            for dt_format in (consts.DATE_FORMAT, consts.DATETIME_FORMAT):
+                # test
+                result = self.converter.convert(value, dt_format)
+
+                # post conditions
+                self.assertEqual(result, dt_parser.parse(value).strftime(dt_format), value)
+
+        # only the values without a known format used dateutil
+        self.assertEqual(self.converter.fallbacks, 4)
+
+    def test_convert_memoizes(self):
+        # test
+        for _ in range(3):
+            self.converter.convert('5/29/2019', consts.DATE_FORMAT)
+
+        # post conditions
+        self.assertEqual(self.converter.misses, 1)
+        self.assertEqual(self.converter.hits, 2)
+
+    def test_cache_is_bounded(self):
+        # test
+        for day in range(1, 6):
+            self.converter.convert('5/{}/2019'.format(day), consts.DATE_FORMAT)
+        # the most recently used values are still cached
+        self.converter.convert('5/5/2019', consts.DATE_FORMAT)
+
+        # post conditions
+        self.assertEqual(len(self.converter.cache), 3)
+        self.assertEqual(self.converter.hits, 1)
+        self.assertEqual(list(self.converter.cache)[-1], ('5/5/2019', consts.DATE_FORMAT))
+
+    def test_convert_errors(self):
+        # test
+        self.assertRaises(ValueError, self.converter.convert, 'not a date', consts.DATE_FORMAT)
+        self.assertRaises(TypeError, self.converter.convert, True, consts.DATE_FORMAT)
+
+        # post conditions
+        self.assertEqual(len(self.converter.cache), 0)
@@ -0,0 +1,85 @@
+# Python imports
+import unittest
+
+# Third party imports
+
+# Project imports
+import cdr_data_dictionary.value_cache as cache
+
+
+class ValueCacheTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def setUp(self):
+        self.calls = []
+
+    def compute(self, value):
+        self.calls.append(value)
+        return u'{}!'.format(value)
+
+    def test_lookup_memoizes(self):
+        # pre conditions
+        memo = cache.BoundedMemo()
+
+        # test
+        results = [memo.lookup(value, self.compute) for value in ['a', 'b', 'a', 'a']]
+
+        # post conditions
+        self.assertEqual(results, ['a!', 'b!', 'a!', 'a!'])
+        self.assertEqual(self.calls, ['a', 'b'])
+        self.assertEqual((memo.hits, memo.misses), (2, 2))
+
+    def test_lookup_is_bounded(self):
+        # pre conditions
+        memo = cache.BoundedMemo(max_size=2)
+
+        # test
+        for value in ['a', 'b', 'c', 'c', 'a']:
+            memo.lookup(value, self.compute)
+
+        # post conditions
+        self.assertEqual(sorted(memo.memo), ['a', 'b'])
+        self.assertEqual(self.calls, ['a', 'b', 'c', 'c'])
+
+    def test_lookup_skips_non_strings(self):
+        # pre conditions
+        memo = cache.BoundedMemo()
+
+        # test
+        results = [memo.lookup(value, self.compute) for value in [True, 1, None, True]]
+
+        # post conditions
+        self.assertEqual(results, ['True!', '1!', 'None!', 'True!'])
+        self.assertEqual(memo.memo, {})
+
+    def test_intern(self):
+        # pre conditions
+        memo = cache.BoundedMemo()
+        first = ''.join(['observ', 'ation'])
+        second = ''.join(['observa', 'tion'])
+        self.assertFalse(first is second, "pre-condition failed")
+
+        # test
+        results = [memo.intern(first), memo.intern(second)]
+
+        # post conditions
+        self.assertTrue(results[0] is first)
+        self.assertTrue(results[1] is first)
+
+    def test_summarize(self):
+        # pre conditions
+        memos = [cache.BoundedMemo(), cache.BoundedMemo()]
+        memos[0].intern('a')
+        memos[0].intern('a')
+        memos[1].intern('b')
+
+        # test
+        summary = cache.summarize(memos)
+
+        # post conditions
+        self.assertEqual(summary, (3, 1, 2))
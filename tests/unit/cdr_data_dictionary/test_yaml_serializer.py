@@ -0,0 +1,107 @@
+# Python imports
+import io
+import unittest
+
+# Third party imports
+
+# Project imports
+import cdr_data_dictionary.constants as consts
+import cdr_data_dictionary.generate_yaml as gen
+import cdr_data_dictionary.yaml_serializer as ser
+
+
+class YAMLSerializerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n**************************************************************')
+        print(cls.__name__)
+        print('**************************************************************')
+
+    def test_format_value(self):
+        # test
+        integer = ser.format_value(consts.CONCEPT_ID_FIELD, '1585250')
+        boolean = ser.format_value(consts.REGISTERED_TRANSFORM_FIELD, True)
+        multiple = ser.format_value(consts.INPUT_CONCEPT_ID_FIELD, '10' + consts.NEWLINE + 'a')
+        single = ser.format_value(consts.INPUT_CONCEPT_ID_FIELD, '10')
+        date = ser.format_value(consts.DATE_REQUESTED_FIELD, '5/29/2019')
+        time = ser.format_value(consts.MODIFIED_TIME_FIELD, '2020-02-05T20:25:10.000Z')
+        listed = ser.format_value('notes', 'one' + consts.NEWLINE + 'two')
+        text = ser.format_value('notes', 'one')
+        missing = ser.format_value('notes', None)
+
+        # post conditions
+        self.assertEqual(integer, '1585250\n')
+        self.assertEqual(boolean, 'True\n')
+        self.assertEqual(multiple, "[10, 'a']\n")
+        self.assertEqual(single, '10\n')
+        self.assertEqual(date, '2019-05-29\n')
+        self.assertEqual(time, '2020-02-05 20:25:10\n')
+        self.assertEqual(listed, "['one', 'two']\n")
+        self.assertEqual(text, "'one'\n")
+        self.assertEqual(missing, 'None\n')
+
+    def test_format_item(self):
+        # pre conditions
+        fields = ['relevant_omop_table', 'concept_id', 'notes']
+        value_dict = {'relevant_omop_table': ['observation'],
+                      'concept_id': ['1585250'],
+                      'notes': ['']}
+
+        # test
+        item = ser.format_item(fields, value_dict, 1, gen._process_value)
+
+        # post conditions
+        expected = ('      - \n'
+                    '        concept_id:  1585250\n'
+                    "        relevant_omop_table:  'observation'\n"
+                    '        notes:  \n'
+                    '\n')
+        self.assertEqual(item, expected)
+        self.assertEqual(item, ''.join(ser.item_parts(fields, value_dict, 1,
+                                                      gen._process_value)))
+
+    def test_tab_plan_matches_format_item(self):
+        # pre conditions
+        fields = [consts.CONCEPT_ID_FIELD, consts.INPUT_CONCEPT_ID_FIELD,
+                  consts.DATE_REQUESTED_FIELD, consts.CREATED_TIME_FIELD,
+                  consts.REGISTERED_TRANSFORM_FIELD, 'notes']
+        cells = ['', 'no', 'Yes', '12', '12\n13', "Donor\u2019s\nname", '5/29/2019',
+                 '2019-01-15 18:38:57', u'caf\u00e9']
+        rows = []
+        for offset, _ in enumerate(cells):
+            row = {}
+            for index, field in enumerate(fields):
+                row[field] = [cells[(offset + index) % len(cells)]]
+            # a default field that is not in the header
+            row['additional_notes'] = ['']
+            rows.append(row)
+
+        for index, _ in enumerate(fields):
+            plan = ser.TabPlan(fields, index, gen._process_value)
+            for row in rows:
+                # test
+                try:
+                    expected = ser.format_item(fields, row, index, gen._process_value)
+                except ValueError:
+                    self.assertRaises(ValueError, plan.format_item, row)
+                    continue
+
+                # post conditions
+                self.assertEqual(plan.format_item(row), expected)
+
+    def test_chunked_writer(self):
+        # pre conditions
+        stream = io.BytesIO()
+        writer = ser.ChunkedWriter(stream, chunk_size=10)
+
+        # test
+        writer.write(u'café ')
+        self.assertEqual(stream.getvalue(), b'')
+        writer.write(u'au lait')
+        writer.write(u'!')
+        writer.flush()
+
+        # post conditions
+        self.assertEqual(stream.getvalue(), u'café au lait!'.encode('utf-8'))
+        self.assertEqual(writer.chunks_written, 2)